@@ -0,0 +1,162 @@
+import threading
+
+from app import clock, metrics
+from app.coinex_api import get_balances as fetch_balances
+from app.market_meta import get_market
+from app.singleflight import SingleFlight
+from app.logger import get_logger
+from app.config import BALANCE_CACHE_TTL, BALANCE_REFRESH_INTERVAL
+
+log = get_logger("balances")
+
+
+# ======================================================
+# CACHÉ DE SALDOS POR USUARIO
+# ======================================================
+# Snapshot {asset: {"available", "frozen"}} por usuario con TTL corto.
+# Nuestras propias órdenes lo ajustan al instante (optimista) y un
+# refresco del exchange lo corrige: periódico para los usuarios con
+# ajustes pendientes, o apply_snapshot() desde un feed privado.
+
+# user_id → {"balances": dict, "fetched_at": float, "dirty": bool}
+_entries = {}
+_lock = threading.Lock()
+
+# Refrescos concurrentes del mismo usuario comparten la petición
+_flight = SingleFlight()
+
+
+def apply_snapshot(user_id, balances):
+    """Guarda un saldo autoritativo (REST o WebSocket privado)."""
+    with _lock:
+        _entries[user_id] = {
+            "balances": {a: dict(v) for a, v in balances.items()},
+            "fetched_at": clock.monotonic(),
+            "dirty": False
+        }
+
+
+def refresh(user_id):
+    """Pide el saldo a CoinEx y actualiza la caché. None si falla."""
+    balances = _flight.do(user_id, lambda: fetch_balances(user_id))
+
+    if balances is None:
+        metrics.incr("balances.refresh_errors")
+        return None
+
+    metrics.incr("balances.refreshes")
+    apply_snapshot(user_id, balances)
+    return balances
+
+
+def get_balances(user_id, max_age=BALANCE_CACHE_TTL):
+    """
+    Saldos del usuario; solo va al exchange si el snapshot tiene más
+    de `max_age` segundos. Si el exchange falla se devuelve el último
+    snapshot (o None si nunca hubo).
+    """
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry and clock.monotonic() - entry["fetched_at"] <= max_age:
+            metrics.incr("balances.hits")
+            return {a: dict(v) for a, v in entry["balances"].items()}
+
+    metrics.incr("balances.misses")
+    balances = refresh(user_id)
+
+    if balances is None and entry:
+        return {a: dict(v) for a, v in entry["balances"].items()}
+
+    return balances
+
+
+def get_available(user_id, asset="USDT", max_age=BALANCE_CACHE_TTL):
+    balances = get_balances(user_id, max_age)
+
+    if balances is None:
+        return None
+
+    return balances.get(asset, {}).get("available", 0.0)
+
+
+# ======================================================
+# AJUSTES OPTIMISTAS POR NUESTRAS ÓRDENES
+# ======================================================
+
+def _assets(symbol):
+    info = get_market(symbol) or {}
+    base = info.get("base_ccy") or (symbol[:-4] if symbol.endswith("USDT") else symbol)
+    return base, info.get("quote_ccy") or "USDT", info.get("taker_fee_rate", 0.0)
+
+
+def apply_fill(user_id, symbol, side, qty, price):
+    """
+    Ajusta el snapshot con una ejecución propia (compra: -USDT +base;
+    venta: -base +USDT, con la comisión taker del mercado). Marca el
+    usuario para refrescar en el siguiente ciclo de corrección.
+    """
+    base, quote, fee = _assets(symbol)
+    value = qty * price
+
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry is None:
+            return
+
+        balances = entry["balances"]
+        b = balances.setdefault(base, {"available": 0.0, "frozen": 0.0})
+        q = balances.setdefault(quote, {"available": 0.0, "frozen": 0.0})
+
+        if side == "buy":
+            q["available"] -= value * (1 + fee)
+            b["available"] += qty
+        else:
+            b["available"] = max(b["available"] - qty, 0.0)
+            q["available"] += value * (1 - fee)
+
+        entry["dirty"] = True
+
+
+def invalidate(user_id):
+    with _lock:
+        _entries.pop(user_id, None)
+
+
+def reset():
+    """Borra los snapshots de todos los usuarios (benchmarks entre corridas)."""
+    with _lock:
+        _entries.clear()
+
+
+# ======================================================
+# CORRECCIÓN PERIÓDICA
+# ======================================================
+
+def refresh_dirty(min_age=BALANCE_REFRESH_INTERVAL):
+    """Refresca los usuarios con ajustes optimistas de hace > min_age s."""
+    now = clock.monotonic()
+
+    with _lock:
+        due = [
+            user_id for user_id, entry in _entries.items()
+            if entry["dirty"] and now - entry["fetched_at"] >= min_age
+        ]
+
+    for user_id in due:
+        refresh(user_id)
+
+    return len(due)
+
+
+def _refresher(stop_event, interval):
+    while not clock.wait(stop_event, interval):
+        try:
+            refresh_dirty(interval)
+        except Exception as e:
+            log.error("balances.refresh_error", "❌ Error refrescando saldos: %s", e, rate=1)
+
+
+def start_refresher(interval=BALANCE_REFRESH_INTERVAL):
+    stop_event = threading.Event()
+    threading.Thread(target=_refresher, args=(stop_event, interval), daemon=True).start()
+    return stop_event
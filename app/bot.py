@@ -17,14 +17,17 @@ from app.database import (
     get_user,
     save_api_keys,
     save_user_capital,
+    set_trading_mode,
+    count_open_positions,
     user_is_ready
 )
 
-# API V2 OFICIAL
-from app.coinex_api import get_balance
+# Saldos (snapshot compartido con el motor)
+from app.balance_cache import get_available, invalidate as invalidate_balances
 
-from app.config import TELEGRAM_BOT_TOKEN
+from app.config import TELEGRAM_BOT_TOKEN, ADMIN_USER_IDS
 from app.trading_engine import trading_cycle
+from app import perf
 from app.encryption import decrypt_text
 
 
@@ -105,6 +108,55 @@ async def verapikey(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 
+# ======================================================
+# /PAPER — MODO SIMULADO
+# ======================================================
+
+async def paper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    user = get_user(user_id)
+
+    if not user:
+        await update.message.reply_text("❌ Usa /start primero.")
+        return
+
+    arg = context.args[0].lower() if context.args else ""
+
+    if arg not in ("on", "off"):
+        mode = user.get("trading_mode", "live")
+        await update.message.reply_text(
+            f"🧪 Modo actual: *{'PAPER' if mode == 'paper' else 'REAL'}*\n"
+            "Usa `/paper on` para operar en el exchange simulado "
+            "o `/paper off` para volver a CoinEx real.",
+            parse_mode="Markdown"
+        )
+        return
+
+    mode = "paper" if arg == "on" else "live"
+
+    # Las salidas de una posición van al exchange del modo actual del
+    # usuario: cambiarlo con posiciones abiertas las mandaría al otro
+    if mode != user.get("trading_mode", "live") and count_open_positions(user_id):
+        await update.message.reply_text(
+            "⚠️ Tienes posiciones abiertas. Espera a que se cierren "
+            "antes de cambiar de modo."
+        )
+        return
+
+    set_trading_mode(user_id, mode)
+
+    # El snapshot de saldos es del exchange anterior: sin esto el ciclo
+    # dimensionaría entradas con el saldo del otro modo hasta que caduque
+    invalidate_balances(user_id)
+
+    await update.message.reply_text(
+        "🧪 Modo PAPER activado: las órdenes van al exchange simulado."
+        if arg == "on" else
+        "💱 Modo REAL activado: las órdenes van a CoinEx."
+    )
+
+
+
 # ======================================================
 # MENÚ CALLBACKS
 # ======================================================
@@ -160,7 +212,7 @@ async def menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
 
-        balance = get_balance(user_id)
+        balance = get_available(user_id)
 
         if balance is None:
             await query.edit_message_text(
@@ -255,19 +307,58 @@ async def message_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 
+# ======================================================
+# /PERF — ESTADO DEL SISTEMA (SOLO ADMINS)
+# ======================================================
+
+async def perf_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Solo métricas en memoria: sin CoinEx ni Mongo
+    if update.effective_user.id not in ADMIN_USER_IDS:
+        await update.message.reply_text("⛔ Comando solo para administradores.")
+        return
+
+    snapshot, age = perf.get_snapshot()
+
+    await update.message.reply_text(perf.render(snapshot, age))
+
+
+
 # ======================================================
 # RUN BOT
 # ======================================================
 
-def run_bot():
+_application = None
+
+
+def build_application():
+    """
+    Construye la aplicación de Telegram una sola vez (al primer uso).
+    """
+    global _application
+
+    if _application is not None:
+        return _application
+
+    if not TELEGRAM_BOT_TOKEN:
+        raise ValueError("❌ ERROR FATAL: Falta TELEGRAM_BOT_TOKEN en variables de entorno.")
+
     application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("verapikey", verapikey))
+    application.add_handler(CommandHandler("paper", paper))
+    application.add_handler(CommandHandler("perf", perf_command))
     application.add_handler(CallbackQueryHandler(menu_handler))
     application.add_handler(
         MessageHandler(filters.TEXT & ~filters.COMMAND, message_router)
     )
 
+    _application = application
+    return application
+
+
+def run_bot():
+    application = build_application()
+
     print("🤖 TradingX está corriendo en Telegram...")
     application.run_polling()
@@ -0,0 +1,85 @@
+import threading
+
+from app import clock, metrics
+from app.logger import get_logger
+
+log = get_logger("coinex")
+
+
+# ======================================================
+# CIRCUIT BREAKER POR ENDPOINT
+# ======================================================
+
+class CircuitBreaker:
+    """
+    closed    → todo pasa; `failure_threshold` fallos seguidos lo abren
+    open      → falla rápido durante `reset_timeout` segundos
+    half_open → deja pasar 1 petición de prueba; si va bien se cierra
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=15.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+
+            if self.state == "open":
+                if clock.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._trial_in_flight = False
+
+            # half_open: una sola petición de prueba a la vez
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                log.info("breaker.closed", "✅ Circuito %s cerrado de nuevo", self.name, breaker=self.name)
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    log.warning("breaker.open", "🚧 Circuito %s abierto tras %d fallos",
+                                self.name, self.failures, breaker=self.name)
+                    metrics.incr("coinex.breaker_open")
+                self.state = "open"
+                self.opened_at = clock.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, **kwargs):
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name, **kwargs))
+    return breaker
+
+
+def breaker_states():
+    """Estado de cada breaker (para /perf)."""
+    with _breakers_lock:
+        breakers = list(_breakers.items())
+    return {name: b.state for name, b in breakers}
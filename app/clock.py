@@ -0,0 +1,215 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+# ======================================================
+# RELOJ INYECTABLE (REAL / VIRTUAL)
+# ======================================================
+# Scheduler, monitores, firma y cachés piden la hora y duermen a
+# través de este módulo. En producción es el reloj del sistema; en
+# simulaciones un VirtualClock permite avanzar horas en segundos.
+
+
+class RealClock:
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event, timeout):
+        """Como event.wait(timeout). True si el evento se activó."""
+        return event.wait(timeout)
+
+
+class VirtualClock:
+    """
+    Reloj simulado. El tiempo solo avanza con advance()/fast_forward():
+    los hilos que llaman sleep() quedan en cola hasta su instante de
+    despertar, y fast_forward() salta de despertar en despertar,
+    dejando que cada hilo despertado corra hasta volver a dormir (o
+    terminar) antes de seguir.
+    """
+
+    def __init__(self, start=None, settle_timeout=2.0, settle_quiet=0.2):
+        self._now = time.time() if start is None else float(start)
+        self._base = self._now
+        self.settle_timeout = settle_timeout
+        self.settle_quiet = settle_quiet
+        self._changes = 0            # entradas/salidas de sueño, para _settle
+
+        self._cond = threading.Condition()
+        self._sleepers = []          # heap de (despertar, seq, ident)
+        self._sleeping = set()       # idents dormidos ahora
+        self._cancelled = set()      # seq de esperas cortadas por un evento
+        self._seq = itertools.count()
+
+    # ---------- lectura ----------
+
+    def time(self):
+        return self._now
+
+    def monotonic(self):
+        return self._now - self._base
+
+    # ---------- dormir ----------
+
+    def sleep(self, seconds):
+        self._sleep_until(self._now + max(seconds, 0), None)
+
+    def wait(self, event, timeout):
+        if timeout is None:
+            return event.wait()
+        return self._sleep_until(self._now + max(timeout, 0), event)
+
+    def _sleep_until(self, wake_at, event):
+        ident = threading.get_ident()
+        seq = next(self._seq)
+
+        with self._cond:
+            heapq.heappush(self._sleepers, (wake_at, seq, ident))
+            self._sleeping.add(ident)
+            self._changes += 1
+            self._cond.notify_all()
+
+            try:
+                while self._now < wake_at:
+                    if event is not None and event.is_set():
+                        self._cancelled.add(seq)
+                        return True
+                    # Sondeo real corto: event.set() no avisa a esta condición
+                    self._cond.wait(0.05 if event is not None else None)
+            finally:
+                self._sleeping.discard(ident)
+                self._changes += 1
+                self._cond.notify_all()
+
+        return event.is_set() if event is not None else None
+
+    def wait_sleeping(self, thread, timeout=2.0):
+        """
+        Espera (en tiempo real) a que `thread` duerma en este reloj, p. ej.
+        antes del primer fast_forward() tras arrancarlo. False si no llega.
+        """
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            while thread.ident not in self._sleeping:
+                if not thread.is_alive() or time.monotonic() >= deadline:
+                    return False
+                self._cond.wait(0.01)
+        return True
+
+    # ---------- avanzar ----------
+
+    def advance(self, seconds):
+        """Avanza el tiempo de golpe y despierta a quien toque."""
+        with self._cond:
+            self._now += seconds
+            self._drop_due()
+            self._cond.notify_all()
+
+    def _drop_due(self):
+        while self._sleepers and self._sleepers[0][0] <= self._now:
+            self._cancelled.discard(heapq.heappop(self._sleepers)[1])
+
+    def _settle(self, woken, before):
+        """
+        Espera (en tiempo real, hasta settle_timeout) a que los hilos
+        despertados y los que estos crearon vuelvan a dormir o terminen.
+        Un hilo bloqueado en un lock cuyo dueño duerme en este reloj no
+        dormirá nunca: si en settle_quiet s nadie entra ni sale de un
+        sueño, se da por asentado y el tiempo sigue avanzando.
+        """
+        deadline = time.monotonic() + self.settle_timeout
+        me = threading.get_ident()
+
+        with self._cond:
+            changes, changed_at = self._changes, time.monotonic()
+
+            while time.monotonic() < deadline:
+                alive = {t.ident for t in threading.enumerate()}
+                watched = (woken | (alive - before)) - {me}
+                if all(i not in alive or i in self._sleeping for i in watched):
+                    return
+
+                if self._changes != changes:
+                    changes, changed_at = self._changes, time.monotonic()
+                elif time.monotonic() - changed_at >= self.settle_quiet:
+                    return
+
+                self._cond.wait(0.01)
+
+    def fast_forward(self, seconds):
+        """
+        Avanza `seconds` de tiempo virtual procesando cada despertar en
+        orden. Devuelve cuántos despertares se procesaron.
+        """
+        target = self._now + seconds
+        processed = 0
+
+        while True:
+            with self._cond:
+                while self._sleepers and self._sleepers[0][1] in self._cancelled:
+                    self._cancelled.discard(heapq.heappop(self._sleepers)[1])
+
+                if not self._sleepers or self._sleepers[0][0] > target:
+                    self._now = max(self._now, target)
+                    self._cond.notify_all()
+                    return processed
+
+                wake_at = self._sleepers[0][0]
+                woken = set()
+                while self._sleepers and self._sleepers[0][0] <= wake_at:
+                    _, seq, ident = heapq.heappop(self._sleepers)
+                    if seq in self._cancelled:
+                        self._cancelled.discard(seq)
+                    else:
+                        woken.add(ident)
+                        # Ya no cuenta como dormido aunque aún no haya corrido
+                        self._sleeping.discard(ident)
+
+                before = {t.ident for t in threading.enumerate()}
+                self._now = max(self._now, wake_at)
+                self._cond.notify_all()
+
+            processed += len(woken)
+            self._settle(woken, before)
+
+
+# ======================================================
+# RELOJ ACTIVO
+# ======================================================
+
+_clock = RealClock()
+
+
+def set_clock(clock):
+    global _clock
+    _clock = clock
+
+
+def get_clock():
+    return _clock
+
+
+def now():
+    return _clock.time()
+
+
+def monotonic():
+    return _clock.monotonic()
+
+
+def sleep(seconds):
+    _clock.sleep(seconds)
+
+
+def wait(event, timeout):
+    return _clock.wait(event, timeout)
@@ -1,16 +1,175 @@
 import time
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import requests
+from requests.adapters import HTTPAdapter
 from app.database import get_api_keys
+from app.klines import Klines, decode_klines, loads
+from app.circuit_breaker import get_breaker
+from app.singleflight import SingleFlight
+from app.logger import get_logger
+from app import clock, metrics, traffic_log, lanes
+from app.config import (
+    COINEX_TIMEOUT,
+    HEDGE_ENABLED,
+    HEDGE_MIN_DELAY,
+    HEDGE_MAX_DELAY,
+    BREAKER_FAILURES,
+    BREAKER_RESET_SECONDS,
+    TIME_SYNC_INTERVAL,
+    MARKET_DATA_MICRO_TTL,
+    PAPER_EXCHANGE_URL,
+    PAPER_START_BALANCE
+)
 
 COINEX_BASE_URL = "https://api.coinex.com/v2"
 
+log = get_logger("coinex")
+
+
+# ======================================================
+# TRANSPORTE (HTTP REAL O EXCHANGE SIMULADO)
+# ======================================================
+class HttpTransport:
+    """
+    Envía peticiones HTTP a una API con el formato de CoinEx V2.
+    Cada carril (app.lanes) usa su propia sesión y pool de conexiones.
+    """
+
+    def __init__(self, base_url, name="coinex"):
+        self.base_url = base_url
+        self.name = name
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session(self, lane):
+        session = self._sessions.get(lane)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(lane)
+                if session is None:
+                    size = lanes.get_lane(lane).connections if lane else 10
+                    session = requests.Session()
+                    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=size))
+                    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=size))
+                    self._sessions[lane] = session
+        return session
+
+    def send(self, method, endpoint, params, headers, lane=None):
+        """Devuelve (status_http, json). Lanza excepción si no hay respuesta."""
+        url = self.base_url + endpoint
+        session = self._session(lane)
+
+        if method == "GET":
+            res = session.get(url, params=params, headers=headers, timeout=COINEX_TIMEOUT)
+        else:
+            res = session.post(url, json=params, headers=headers, timeout=COINEX_TIMEOUT)
+
+        return res.status_code, loads(res.content)
+
+
+_transport = HttpTransport(COINEX_BASE_URL)
+_paper_transport = None
+_paper_lock = threading.Lock()
+
+
+def set_transport(transport):
+    """Cambia el transporte por defecto (simulador, replay, etc.)."""
+    global _transport
+    _transport = transport
+
+
+def get_transport():
+    return _transport
+
+
+def set_paper_transport(transport):
+    global _paper_transport
+    _paper_transport = transport
+
+
+def get_paper_transport():
+    """
+    Transporte de los usuarios en modo paper: PAPER_EXCHANGE_URL si
+    está definido; si no, un exchange simulado en proceso con precios
+    reales de CoinEx.
+    """
+    global _paper_transport
+
+    if _paper_transport is None:
+        with _paper_lock:
+            if _paper_transport is None:
+                if PAPER_EXCHANGE_URL:
+                    _paper_transport = HttpTransport(PAPER_EXCHANGE_URL, name="paper")
+                else:
+                    from app.sim_exchange import SimExchange, SimTransport, LiveFeed
+                    # El simulador pide el precio dentro de una petición
+                    # paper que ya ocupa un carril: sin carril, para no
+                    # esperar un segundo hueco con el primero tomado
+                    sim = SimExchange(LiveFeed(lambda symbol: get_price(symbol, lane=None)),
+                                      start_balance=PAPER_START_BALANCE)
+                    _paper_transport = SimTransport(sim, name="paper")
+
+    return _paper_transport
+
+# Hilos para peticiones con cobertura (hedged). Cada envío del pool
+# ocupa una conexión de carril hasta que termina (también el que
+# pierde), así que nunca hay más envíos que conexiones
+_hedge_pool = ThreadPoolExecutor(max_workers=lanes.total_connections(), thread_name_prefix="coinex-hedge")
+
+# GET públicos idénticos en vuelo comparten una sola llamada
+_market_data_flight = SingleFlight(ttl=MARKET_DATA_MICRO_TTL)
+
+
+def reset_market_data():
+    """Vacía la micro-caché de datos de mercado (benchmarks entre corridas)."""
+    _market_data_flight.clear()
+
+
+# ======================================================
+# HORA DEL SERVIDOR (OFFSET CACHEADO)
+# ======================================================
+# Las peticiones firmadas usan la hora de CoinEx para que no se
+# rechacen por desfase de reloj del dyno.
+
+_time_offset_ms = 0
+_time_synced_at = 0.0
+_time_lock = threading.Lock()
+
+
+def sync_server_time():
+    global _time_offset_ms, _time_synced_at
+
+    sent = clock.now() * 1000
+    # Sin carril: la piden las peticiones firmadas antes de ocupar el suyo
+    r = make_request("GET", "/time", lane=None)
+    received = clock.now() * 1000
+
+    with _time_lock:
+        _time_synced_at = clock.monotonic()
+
+        if not r or r.get("code") != 0:
+            return _time_offset_ms
+
+        server_ms = int(r["data"]["timestamp"])
+        _time_offset_ms = int(server_ms - (sent + received) / 2)
+
+    metrics.set_gauge("coinex.time_offset_ms", _time_offset_ms)
+    return _time_offset_ms
+
+
+def server_time_ms():
+    if not _time_synced_at or clock.monotonic() - _time_synced_at > TIME_SYNC_INTERVAL:
+        sync_server_time()
+    return int(clock.now() * 1000) + _time_offset_ms
+
 
 # ======================================================
 # FIRMA OFICIAL COINEX V2
 # ======================================================
 def sign_request(secret_key: str, method: str, endpoint: str, params: dict):
-    timestamp = str(int(time.time() * 1000))
+    timestamp = str(server_time_ms())
 
     sorted_params = "&".join(
         f"{k}={params[k]}" for k in sorted(params)
@@ -23,42 +182,206 @@ def sign_request(secret_key: str, method: str, endpoint: str, params: dict):
     return signature, timestamp
 
 
+# ======================================================
+# ENVÍO (1 INTENTO)
+# ======================================================
+def _send(transport, method, endpoint, params, headers, lane=None):
+    return transport.send(method, endpoint, params, headers, lane=lane)
+
+
+def _shape_metric(metric, params):
+    """
+    Serie de latencia por forma de la petición: un ticker de un mercado
+    y el ticker de todo el spot comparten endpoint pero no tiempos.
+    """
+    shape = ",".join(sorted(params))
+    if any("," in str(v) for v in params.values()):
+        shape += "*"
+    return f"{metric}?{shape}"
+
+
+def _hedge_delay(metric):
+    """Retardo antes del duplicado: p95 observado de esa forma de petición, acotado."""
+    p95 = metrics.percentile(metric, 95, default=HEDGE_MAX_DELAY)
+    return min(max(p95, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+
+def _send_hedged(transport, method, endpoint, params, headers, slot, metric):
+    """
+    Lanza la petición; si no responde en el p95 de `metric`, lanza un
+    duplicado y se queda con la primera respuesta válida.
+    Solo para GET idempotentes de market data. La conexión `slot` pasa
+    al envío principal; el duplicado necesita otra del mismo carril y,
+    si no la hay al instante, no se lanza.
+    """
+    lane = slot.name
+    primary = _hedge_pool.submit(_send, transport, method, endpoint, params, headers, lane)
+    primary.add_done_callback(lambda _: lanes.release(slot))
+    done, _ = wait([primary], timeout=_hedge_delay(metric))
+
+    if done:
+        return primary.result()
+
+    backup_slot = lanes.acquire(lane, timeout=0)
+    if backup_slot is None:
+        metrics.incr("coinex.hedge_skipped")
+        return primary.result(timeout=COINEX_TIMEOUT)
+
+    metrics.incr("coinex.hedged")
+    backup = _hedge_pool.submit(_send, transport, method, endpoint, params, headers, lane)
+    backup.add_done_callback(lambda _: lanes.release(backup_slot))
+    pending = {primary, backup}
+    deadline = time.monotonic() + COINEX_TIMEOUT
+    error = None
+
+    while pending:
+        done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0),
+                             return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                if future is backup:
+                    metrics.incr("coinex.hedge_wins")
+                return future.result()
+            error = future.exception()
+
+    raise error or TimeoutError(f"Sin respuesta de CoinEx en {endpoint}")
+
+
 # ======================================================
 # REQUEST GENERAL
 # ======================================================
-def make_request(method, endpoint, api_key=None, secret_key=None, params=None):
+_DEFAULT_LANE = object()
+
+
+def make_request(method, endpoint, api_key=None, secret_key=None, params=None, transport=None,
+                 lane=_DEFAULT_LANE):
+    """
+    `lane`: carril de prioridad (app.lanes). Por defecto "entry" si es
+    firmada y "scan" si es pública; None = sin carril.
+    """
     if params is None:
         params = {}
 
-    url = COINEX_BASE_URL + endpoint
+    if transport is None:
+        transport = _transport
+
+    if lane is _DEFAULT_LANE:
+        lane = "entry" if api_key and secret_key else "scan"
+
+    # Market data pública: coalescer peticiones idénticas concurrentes
+    # (por carril, para que un poll no espere a una petición de scan)
+    if method == "GET" and not (api_key and secret_key):
+        key = (transport.name, lane, endpoint, tuple(sorted(params.items())))
+        return _market_data_flight.do(
+            key,
+            lambda: _request(transport, method, endpoint, None, None, params, lane)
+        )
+
+    return _request(transport, method, endpoint, api_key, secret_key, params, lane)
+
+
+def _request(transport, method, endpoint, api_key, secret_key, params, lane=None):
+    traffic = traffic_log.get_log()
+
+    # Replay: la respuesta sale del log grabado, sin red
+    if traffic is not None and traffic.replaying:
+        metrics.incr("coinex.replayed")
+        return traffic.replay(method, endpoint, params)[1]
+
+    metric = transport.name + endpoint
+    signed = bool(api_key and secret_key)
+    hedged = HEDGE_ENABLED and method == "GET" and not signed and lane is not None
+    latency_metric = _shape_metric(metric, params) if hedged else metric
+
+    # Un circuito por endpoint y carril: las compras fallidas no cortan
+    # las ventas del mismo endpoint ni los escaneos cortan los polls
+    breaker = get_breaker(
+        f"{metric}[{lane}]" if lane else metric,
+        failure_threshold=BREAKER_FAILURES,
+        reset_timeout=BREAKER_RESET_SECONDS
+    )
+
     headers = {"Content-Type": "application/json"}
 
-    if api_key and secret_key:
+    # Sincronizar la hora antes de ocupar el carril (usa otra petición)
+    if signed:
+        server_time_ms()
+
+    slot = None
+    if lane is not None:
+        slot = lanes.acquire(lane)
+        if slot is None:
+            log.warning("coinex.lane_timeout", "⚠️ Carril %s saturado: %s", lane, endpoint,
+                        rate=1, lane=lane, endpoint=endpoint)
+            return None
+
+    # CoinEx degradado: fallar rápido en lugar de esperar el timeout.
+    # Con el carril ya ocupado: si allow() concede la prueba de
+    # half_open, la petición sale seguro y registra éxito o fallo.
+    # Las salidas (ventas, stops, cancelaciones) nunca se rechazan:
+    # un stop-loss se intenta aunque el circuito esté abierto
+    if lane != "exit" and not breaker.allow():
+        if slot is not None:
+            lanes.release(slot)
+        metrics.incr("coinex.breaker_rejects")
+        return None
+
+    if signed:
         signature, timestamp = sign_request(secret_key, method, endpoint, params)
         headers["X-COINEX-KEY"] = api_key
         headers["X-COINEX-SIGN"] = signature
         headers["X-COINEX-TIMESTAMP"] = timestamp
 
+    started = time.time()
+    start = time.monotonic()
+    metrics.incr("coinex.requests")
+
     try:
-        if method == "GET":
-            res = requests.get(url, params=params, headers=headers, timeout=10)
+        if hedged:
+            # La conexión la suelta el envío principal al terminar
+            owned, slot = slot, None
+            status, data = _send_hedged(transport, method, endpoint, params, headers, owned, latency_metric)
         else:
-            res = requests.post(url, json=params, headers=headers, timeout=10)
+            status, data = _send(transport, method, endpoint, params, headers, lane)
 
-        return res.json()
     except Exception as e:
-        print("❌ Error CoinEx:", e)
+        breaker.record_failure()
+        metrics.incr("coinex.errors")
+        log.error("coinex.error", "❌ Error CoinEx: %s", e, rate=5, endpoint=endpoint)
+        if traffic is not None:
+            traffic.record(method, endpoint, params, 0, None, started, time.monotonic() - start)
         return None
 
+    finally:
+        if slot is not None:
+            lanes.release(slot)
+
+    elapsed = time.monotonic() - start
+    metrics.record_latency(latency_metric, elapsed)
+
+    if traffic is not None:
+        traffic.record(method, endpoint, params, status, data, started, elapsed)
+
+    # 5xx / 429 cuentan como degradación; errores de negocio no
+    if status >= 500 or status == 429:
+        breaker.record_failure()
+        metrics.incr("coinex.errors")
+    else:
+        breaker.record_success()
+
+    return data
+
 
 # ======================================================
 # PRECIO SPOT
 # ======================================================
-def get_price(symbol):
+def get_price(symbol, lane="poll"):
     endpoint = "/spot/market/ticker"
     params = {"market": symbol}
 
-    r = make_request("GET", endpoint, None, None, params)
+    r = make_request("GET", endpoint, None, None, params, lane=lane)
 
     if not r or r.get("code") != 0:
         return None
@@ -66,109 +389,223 @@ def get_price(symbol):
     return float(r["data"][0]["last"])
 
 
+# ======================================================
+# TICKERS DE TODOS LOS MERCADOS (1 SOLA LLAMADA)
+# ======================================================
+def get_tickers():
+    """
+    Devuelve {market: {"last", "open", "volume", "value"}} para todo
+    el spot en una sola respuesta. "value" es el volumen 24h en quote.
+    """
+    endpoint = "/spot/market/ticker"
+
+    r = make_request("GET", endpoint)
+
+    if not r or r.get("code") != 0:
+        return {}
+
+    tickers = {}
+
+    for t in r["data"]:
+        try:
+            last = float(t["last"])
+            volume = float(t.get("volume") or 0)
+            tickers[t["market"]] = {
+                "last": last,
+                "open": float(t.get("open") or 0),
+                "volume": volume,
+                "value": float(t.get("value") or 0) or volume * last
+            }
+        except (KeyError, TypeError, ValueError):
+            continue
+
+    return tickers
+
+
 # ======================================================
 # KLINES (VELAS)
 # ======================================================
 def get_candles(symbol, timeframe="1min", limit=50):
+    """
+    Devuelve Klines (arrays tipados, orden ascendente).
+    Vacío si CoinEx no responde.
+    """
     endpoint = "/spot/market/kline"
     params = {"market": symbol, "limit": limit, "period": timeframe}
 
     r = make_request("GET", endpoint, None, None, params)
 
     if not r or r.get("code") != 0:
-        return []
+        return Klines()
+
+    data = r["data"]
 
-    return r["data"]["klines"]
+    # V2 devuelve la lista directamente; V1 dentro de "klines"
+    rows = data.get("klines") if isinstance(data, dict) else data
+
+    return decode_klines(rows)
 
 
 # ======================================================
-# LISTA DE PARES SPOT
+# PROFUNDIDAD DEL LIBRO
 # ======================================================
-def get_spot_pairs():
-    endpoint = "/spot/market/list"
+def get_depth(symbol, limit=20, lane="entry"):
+    """
+    (asks, bids) como listas [(precio, cantidad)] desde el mejor nivel.
+    None si CoinEx no responde.
+    """
+    endpoint = "/spot/market/depth"
+    params = {"market": symbol, "limit": limit, "interval": "0"}
 
-    r = make_request("GET", endpoint)
+    r = make_request("GET", endpoint, None, None, params, lane=lane)
 
     if not r or r.get("code") != 0:
-        return []
+        return None
+
+    depth = r["data"].get("depth", {})
 
-    return [m["name"] for m in r["data"]]
+    try:
+        asks = [(float(p), float(q)) for p, q in depth.get("asks", [])]
+        bids = [(float(p), float(q)) for p, q in depth.get("bids", [])]
+    except (TypeError, ValueError):
+        return None
+
+    return asks, bids
 
 
 # ======================================================
-# BALANCE SPOT REAL
+# PETICIÓN FIRMADA GENÉRICA POR USUARIO
 # ======================================================
-def get_balance(user_id, asset="USDT"):
+def _user_route(user_id):
+    """
+    Claves del usuario y transporte según su modo:
+    live → CoinEx real, paper → exchange simulado.
+    """
     keys = get_api_keys(user_id)
     if not keys:
-        print("❌ No API Keys.")
-        return 0
+        return None, None
 
-    api_key = keys["api_key"]
-    secret_key = keys["api_secret"]
+    if keys.get("mode") != "paper":
+        return keys, None
 
-    endpoint = "/spot/balance/query"
-    params = {}
+    transport = get_paper_transport()
+    if hasattr(transport, "ensure_account"):
+        transport.ensure_account(keys["api_key"], keys["api_secret"])
 
-    r = make_request("POST", endpoint, api_key, secret_key, params)
+    return keys, transport
 
-    if not r or r.get("code") != 0:
-        print("❌ Error balance:", r)
-        return 0
 
-    balances = r["data"]["balances"]
+def restore_paper_holdings(user_id, holdings):
+    """
+    El exchange paper en proceso arranca vacío en cada reinicio: abona
+    al usuario las monedas de sus posiciones abiertas persistidas
+    ({asset: cantidad}). False si el usuario opera en real o el exchange
+    paper es externo (PAPER_EXCHANGE_URL conserva su estado).
+    """
+    keys, transport = _user_route(user_id)
+    if not keys or not hasattr(transport, "credit"):
+        return False
+
+    for asset, amount in holdings.items():
+        transport.credit(keys["api_key"], keys["api_secret"], asset, amount)
+    return True
+
+
+def signed_request(user_id, method, endpoint, params, label, lane="entry"):
+    keys, transport = _user_route(user_id)
+    if not keys:
+        log.error("coinex.no_keys", "❌ No API Keys", user_id=user_id)
+        return None
 
-    if asset not in balances:
-        return 0
+    r = make_request(method, endpoint, keys["api_key"], keys["api_secret"], params, transport, lane=lane)
 
-    info = balances[asset]
+    if not r or r.get("code") != 0:
+        log.error("coinex.rejected", "❌ Error %s: %s", label, r, user_id=user_id, endpoint=endpoint)
+        return None
 
-    return float(info.get("available", 0) or info.get("available_balance", 0) or 0)
+    return r["data"]
 
 
 # ======================================================
-# MARKET BUY
+# BALANCE SPOT REAL
 # ======================================================
-def place_market_buy(user_id, symbol, quantity):
-    keys = get_api_keys(user_id)
-    if not keys:
-        print("❌ No API Keys")
+def get_balances(user_id):
+    """
+    Todos los saldos del usuario en UNA petición firmada:
+    {asset: {"available": float, "frozen": float}}.
+    None si CoinEx no responde.
+    """
+    data = signed_request(user_id, "POST", "/spot/balance/query", {}, "balance")
+
+    if data is None:
         return None
 
-    api_key = keys["api_key"]
-    secret_key = keys["api_secret"]
+    raw = data.get("balances", data) if isinstance(data, dict) else data
 
-    endpoint = "/spot/order/put_market"
-    params = {"market": symbol, "side": "buy", "amount": quantity}
+    # Formato dict {asset: info} o lista [{"ccy": asset, ...}]
+    items = raw.items() if isinstance(raw, dict) else ((b.get("ccy"), b) for b in raw)
 
-    r = make_request("POST", endpoint, api_key, secret_key, params)
+    balances = {}
+    for asset, info in items:
+        balances[asset] = {
+            "available": float(info.get("available", 0) or info.get("available_balance", 0) or 0),
+            "frozen": float(info.get("frozen", 0) or 0)
+        }
 
-    if not r or r.get("code") != 0:
-        print("❌ Error BUY:", r)
-        return None
+    return balances
 
-    return r["data"]
+
+# ======================================================
+# MARKET BUY
+# ======================================================
+def place_market_buy(user_id, symbol, quantity):
+    params = {"market": symbol, "side": "buy", "amount": quantity}
+    return signed_request(user_id, "POST", "/spot/order/put_market", params, "BUY")
 
 
 # ======================================================
 # MARKET SELL
 # ======================================================
 def place_market_sell(user_id, symbol, quantity):
-    keys = get_api_keys(user_id)
-    if not keys:
-        print("❌ No API Keys")
-        return None
-
-    api_key = keys["api_key"]
-    secret_key = keys["api_secret"]
-
-    endpoint = "/spot/order/put_market"
     params = {"market": symbol, "side": "sell", "amount": quantity}
+    return signed_request(user_id, "POST", "/spot/order/put_market", params, "SELL", lane="exit")
 
-    r = make_request("POST", endpoint, api_key, secret_key, params)
 
-    if not r or r.get("code") != 0:
-        print("❌ Error SELL:", r)
+# ======================================================
+# STOP-LOSS EN EL EXCHANGE
+# ======================================================
+def place_stop_sell(user_id, symbol, quantity, trigger_price):
+    """Stop-loss: venta a mercado que CoinEx dispara en trigger_price."""
+    params = {
+        "market": symbol,
+        "market_type": "SPOT",
+        "side": "sell",
+        "type": "market",
+        "amount": quantity,
+        "trigger_price": trigger_price
+    }
+    return signed_request(user_id, "POST", "/spot/stop-order", params, "SL STOP", lane="exit")
+
+
+def get_finished_orders(user_id, symbol, side=None, limit=10):
+    """Órdenes terminadas del par, la más reciente primero. None si CoinEx falla."""
+    params = {"market": symbol, "market_type": "SPOT", "page": 1, "limit": limit}
+    if side:
+        params["side"] = side
+    return signed_request(user_id, "GET", "/spot/finished-order", params, "FINISHED ORDERS", lane="exit")
+
+
+def get_pending_stop_ids(user_id, symbol):
+    """Ids de stop-orders aún sin disparar. None si CoinEx falla."""
+    params = {"market": symbol, "market_type": "SPOT"}
+    data = signed_request(user_id, "GET", "/spot/pending-stop-order", params, "PENDING STOP", lane="poll")
+
+    if data is None:
         return None
 
-    return r["data"]
+    return {str(o.get("stop_id")) for o in data}
+
+
+def cancel_stop_order(user_id, symbol, stop_id):
+    params = {"market": symbol, "market_type": "SPOT", "stop_id": stop_id}
+    return signed_request(user_id, "POST", "/spot/cancel-stop-order", params, "CANCEL STOP", lane="exit")
@@ -7,12 +7,69 @@ import os
 # Token del bot de Telegram
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
+# Usuarios de Telegram con acceso a /perf ("123,456")
+ADMIN_USER_IDS = {int(x) for x in os.getenv("ADMIN_USER_IDS", "").split(",") if x.strip().isdigit()}
+
+# Cada cuánto se rehace la foto de /perf (s)
+PERF_SNAPSHOT_TTL = float(os.getenv("PERF_SNAPSHOT_TTL", 5))
+
 # ===============================
 # CONFIGURACIÓN DE COINEX (V2 OFICIAL)
 # ===============================
 # Las API Keys se obtienen desde MongoDB por usuario.
 COINEX_BASE_URL = "https://api.coinex.com/v2"
 
+# Timeout por intento (s)
+COINEX_TIMEOUT = float(os.getenv("COINEX_TIMEOUT", 10))
+
+# GET públicos con cobertura: duplicado tras el p95 del endpoint,
+# acotado entre HEDGE_MIN_DELAY y HEDGE_MAX_DELAY segundos
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "True") == "True"
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", 0.05))
+HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", 1.0))
+
+# Circuit breaker por endpoint
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", 5))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", 15))
+
+# GET públicos idénticos comparten respuesta durante este tiempo (s)
+MARKET_DATA_MICRO_TTL = float(os.getenv("MARKET_DATA_MICRO_TTL", 0.5))
+
+# Cada cuánto se re-sincroniza la hora del servidor (s)
+TIME_SYNC_INTERVAL = int(os.getenv("TIME_SYNC_INTERVAL", 300))
+
+# Carriles de prioridad (ver app/lanes.py): exit > entry > poll > scan.
+# Límite total de peticiones/s, parte reservada y conexiones por carril
+COINEX_RATE_LIMIT = float(os.getenv("COINEX_RATE_LIMIT", 40))
+COINEX_LANE_SHARES = os.getenv("COINEX_LANE_SHARES", "exit=2,entry=2,poll=3,scan=3")
+COINEX_LANE_CONNECTIONS = os.getenv("COINEX_LANE_CONNECTIONS", "exit=4,entry=8,poll=8,scan=16")
+
+# Grabación / reproducción del tráfico (ver app/traffic_log.py)
+# off | record | replay; velocidad 0 = lo más rápido posible
+COINEX_TRAFFIC_MODE = os.getenv("COINEX_TRAFFIC_MODE", "off")
+COINEX_TRAFFIC_LOG = os.getenv("COINEX_TRAFFIC_LOG", "coinex_traffic.jsonl")
+COINEX_REPLAY_SPEED = float(os.getenv("COINEX_REPLAY_SPEED", 1))
+
+# ===============================
+# PAPER TRADING (EXCHANGE SIMULADO)
+# ===============================
+# Usuarios con trading_mode="paper" envían sus órdenes al simulador:
+# el servidor de PAPER_EXCHANGE_URL o, si no hay, uno en proceso.
+PAPER_EXCHANGE_URL = os.getenv("PAPER_EXCHANGE_URL")
+PAPER_START_BALANCE = float(os.getenv("PAPER_START_BALANCE", 1000))
+
+# ===============================
+# LOGS (ver app/logger.py)
+# ===============================
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# json | text
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Registros en cola como máximo; si se llena, se descartan
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# "evento=por_segundo,..." y "evento=fracción,..." (p. ej. monitor.poll=0.01)
+LOG_RATE_LIMITS = os.getenv("LOG_RATE_LIMITS", "")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
 # ===============================
 # CONFIGURACIÓN DE MONGO DB
 # ===============================
@@ -34,6 +91,14 @@ BREAKOUT_MIN_VOLUME = 15000
 BREAKOUT_CANDLE_BODY = 0.60
 BREAKOUT_STRENGTH_THRESHOLD = 0.75
 
+# Contexto por símbolo (app.indicators): ventana de velas cerradas
+INDICATOR_WINDOW = int(os.getenv("INDICATOR_WINDOW", 20))
+INDICATOR_MAX_STATES = int(os.getenv("INDICATOR_MAX_STATES", 4096))
+
+# Filtros opcionales contra el historial propio del símbolo
+BREAKOUT_REQUIRE_RANGE_BREAK = os.getenv("BREAKOUT_REQUIRE_RANGE_BREAK", "False") == "True"
+BREAKOUT_MIN_VOLUME_ZSCORE = float(os.getenv("BREAKOUT_MIN_VOLUME_ZSCORE", "-inf"))
+
 TP_MIN = 0.03   # 3%
 TP_MAX = 0.08   # 8%
 
@@ -46,13 +111,106 @@ SL_MAX = 0.018  # 1.8%
 # ===============================
 
 SCAN_INTERVAL = int(os.getenv("SCAN_INTERVAL", 8))
+
+# Alinear ticks al cierre de vela de 1 min (+ offset) en lugar de
+# usar SCAN_INTERVAL. El offset da tiempo a CoinEx a cerrar la vela.
+SCAN_ALIGN_TO_CANDLE = os.getenv("SCAN_ALIGN_TO_CANDLE", "True") == "True"
+SCAN_CANDLE_SECONDS = int(os.getenv("SCAN_CANDLE_SECONDS", 60))
+SCAN_CANDLE_OFFSET_MS = int(os.getenv("SCAN_CANDLE_OFFSET_MS", 300))
+# Posiciones abiertas máximas por usuario (y oportunidades por escaneo)
 MAX_ACTIVE_PAIRS = int(os.getenv("MAX_ACTIVE_PAIRS", 5))
 
+# Límites de riesgo globales (app/exposure.py), en USDT nocional
+# de las posiciones abiertas de todos los usuarios; 0 = sin límite
+EXPOSURE_MAX_SYMBOL_USDT = float(os.getenv("EXPOSURE_MAX_SYMBOL_USDT", 0))
+EXPOSURE_MAX_TOTAL_USDT = float(os.getenv("EXPOSURE_MAX_TOTAL_USDT", 0))
+EXPOSURE_MAX_POSITIONS = int(os.getenv("EXPOSURE_MAX_POSITIONS", 0))
+
+# Reparto del capital entre posiciones:
+# "slots" (igual por hueco libre) o "strength" (según la fuerza)
+ALLOCATION_MODE = os.getenv("ALLOCATION_MODE", "slots")
+
+# Pre-filtro con el ticker masivo: solo los TOP_K mercados
+# (por volumen 24h en USDT y cambio reciente) piden velas.
+PRESCREEN_TOP_K = int(os.getenv("PRESCREEN_TOP_K", 30))
+PRESCREEN_MIN_QUOTE_VOLUME = float(os.getenv("PRESCREEN_MIN_QUOTE_VOLUME", 50000))
+
+# Escaneo por niveles: HOT cada tick, WARM cada N ticks, COLD cada M.
+# Máximo SCAN_REQUEST_BUDGET peticiones de velas por tick.
+SCAN_REQUEST_BUDGET = int(os.getenv("SCAN_REQUEST_BUDGET", 15))
+SCAN_HOT_SIZE = int(os.getenv("SCAN_HOT_SIZE", 5))
+SCAN_WARM_SIZE = int(os.getenv("SCAN_WARM_SIZE", 10))
+SCAN_WARM_EVERY = int(os.getenv("SCAN_WARM_EVERY", 3))
+SCAN_COLD_EVERY = int(os.getenv("SCAN_COLD_EVERY", 10))
+
+# Memo por (símbolo, timeframe) de la última vela cerrada evaluada
+EVAL_MEMO_MAX_ENTRIES = int(os.getenv("EVAL_MEMO_MAX_ENTRIES", 4096))
+EVAL_MEMO_TTL = float(os.getenv("EVAL_MEMO_TTL", 900))
+
+# Usuarios del mismo tick comparten el resultado del escaneo (s máx.)
+SCAN_SHARE_TTL = float(os.getenv("SCAN_SHARE_TTL", 30))
+
+
+# ===============================
+# ÓRDENES
+# ===============================
+
+# Nocional mínimo por orden (USDT)
+MIN_ORDER_USDT = float(os.getenv("MIN_ORDER_USDT", 5))
+
+# Salidas: "client" (monitor por precio) o "exchange" (SL stop en CoinEx,
+# TP por precio)
+EXIT_MODE = os.getenv("EXIT_MODE", "client")
+
+# Cada cuánto se consulta el precio en modo exchange (s)
+EXIT_STATUS_INTERVAL = float(os.getenv("EXIT_STATUS_INTERVAL", 5))
+# El stop solo se consulta cuando el precio está fuera de [SL, TP) o,
+# como red por si se disparó entre dos consultas, cada tantos segundos
+EXIT_STOP_CHECK_INTERVAL = float(os.getenv("EXIT_STOP_CHECK_INTERVAL", 60))
+
+# Venta de salida fallida: reintento con espera exponencial (s) hasta
+# SELL_RETRY_MAX; cada SELL_RETRY_CHECK fallos se mira si las monedas
+# siguen en la cuenta
+SELL_RETRY_BASE = float(os.getenv("SELL_RETRY_BASE", 2))
+SELL_RETRY_MAX = float(os.getenv("SELL_RETRY_MAX", 60))
+SELL_RETRY_CHECK = int(os.getenv("SELL_RETRY_CHECK", 3))
+
+# Libro de órdenes (app/depth_cache.py): niveles, validez (s) y
+# peticiones en paralelo al refrescar varios símbolos
+DEPTH_LIMIT = int(os.getenv("DEPTH_LIMIT", 20))
+DEPTH_TTL = float(os.getenv("DEPTH_TTL", 2))
+DEPTH_FETCH_WORKERS = int(os.getenv("DEPTH_FETCH_WORKERS", 8))
+
+# Deslizamiento máximo estimado de una compra a mercado vs el precio
+# de entrada del plan; si se supera: "cap" (reducir) o "skip" (no operar)
+MAX_SLIPPAGE = float(os.getenv("MAX_SLIPPAGE", 0.003))
+SLIPPAGE_MODE = os.getenv("SLIPPAGE_MODE", "cap")
+
+# Segundos de validez de la caché de mercados (precisión, mínimos, fees)
+MARKET_META_TTL = int(os.getenv("MARKET_META_TTL", 3600))
+
+# Snapshot de saldos por usuario (app/balance_cache.py): validez (s) y
+# cada cuánto se corrigen los ajustados por nuestras órdenes. La
+# validez por defecto es 1,5 ticks: con una menor que el tick, cada
+# ciclo encontraría el snapshot caducado y pediría el saldo igual
+_TICK_SECONDS = SCAN_CANDLE_SECONDS if SCAN_ALIGN_TO_CANDLE else SCAN_INTERVAL
+BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", _TICK_SECONDS * 1.5))
+BALANCE_REFRESH_INTERVAL = float(os.getenv("BALANCE_REFRESH_INTERVAL", 30))
+
+
+# ===============================
+# EXPORTACIÓN PARA ANÁLISIS (app/export_trades.py)
+# ===============================
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 5000))
+# Solo se exportan documentos con marca anterior a ahora - este margen:
+# los timestamps los pone cada hilo con su reloj, y uno más viejo puede
+# confirmarse después de otro más nuevo ya exportado
+EXPORT_SAFETY_LAG = float(os.getenv("EXPORT_SAFETY_LAG", 300))
+
 
 # ===============================
 # CONFIGURACIÓN GENERAL
 # ===============================
 
 DEBUG_MODE = os.getenv("DEBUG_MODE", "True") == "True"
-
-print("⚙️ Configuración CoinEx V2 cargada correctamente desde config.py")
@@ -1,18 +1,83 @@
-from pymongo import MongoClient
+import threading
 from app.config import MONGO_URI
 from app.encryption import encrypt_text, decrypt_text
 import datetime
 
 
 # ======================================================
-# CONEXIÓN A MONGO DB
+# CONEXIÓN A MONGO DB (PEREZOSA)
 # ======================================================
+# Importar este módulo NO abre conexiones: el cliente se crea
+# en init() o en el primer acceso a una colección.
 
-client = MongoClient(MONGO_URI)
-db = client["TradingX_Database"]
+DB_NAME = "TradingX_Database"
 
-users_col = db["users"]
-trades_col = db["trades"]
+_client = None
+_db = None
+_init_lock = threading.Lock()
+
+
+def init(client=None):
+    """
+    Crea el cliente MongoDB una sola vez y devuelve la base de datos.
+    Se puede pasar un cliente ya construido (p. ej. un stand-in local).
+    """
+    global _client, _db
+
+    with _init_lock:
+        if client is None and _db is not None:
+            return _db
+
+        if client is None:
+            from pymongo import MongoClient
+            client = MongoClient(MONGO_URI)
+
+        _client = client
+        _db = client[DB_NAME]
+
+    return _db
+
+
+def get_db():
+    if _db is None:
+        return init()
+    return _db
+
+
+def get_users_col():
+    return get_db()["users"]
+
+
+def get_trades_col():
+    return get_db()["trades"]
+
+
+def get_positions_col():
+    return get_db()["positions"]
+
+
+def ensure_indexes():
+    """Índices usados por las consultas masivas del arranque."""
+    get_positions_col().create_index([("status", 1), ("user_id", 1)])
+    get_users_col().create_index("user_id")
+    # Recorrido incremental de app.export_trades
+    get_trades_col().create_index([("timestamp", 1), ("_id", 1)])
+    get_positions_col().create_index([("updated_at", 1), ("_id", 1)])
+
+
+def __getattr__(name):
+    # Compatibilidad: database.users_col / database.trades_col siguen
+    # funcionando, pero solo conectan cuando se usan.
+    if name == "users_col":
+        return get_users_col()
+    if name == "trades_col":
+        return get_trades_col()
+    if name == "db":
+        return get_db()
+    if name == "client":
+        get_db()
+        return _client
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ======================================================
@@ -20,7 +85,7 @@ trades_col = db["trades"]
 # ======================================================
 
 def create_user(user_id, username):
-    user = users_col.find_one({"user_id": user_id})
+    user = get_users_col().find_one({"user_id": user_id})
 
     if user:
         return user
@@ -36,7 +101,7 @@ def create_user(user_id, username):
         "updated_at": datetime.datetime.utcnow()
     }
 
-    users_col.insert_one(new_user)
+    get_users_col().insert_one(new_user)
     return new_user
 
 
@@ -48,7 +113,7 @@ def save_api_keys(user_id, api_key, api_secret):
     encrypted_key = encrypt_text(api_key)
     encrypted_secret = encrypt_text(api_secret)
 
-    users_col.update_one(
+    get_users_col().update_one(
         {"user_id": user_id},
         {
             "$set": {
@@ -66,7 +131,7 @@ def save_api_keys(user_id, api_key, api_secret):
 # ======================================================
 
 def get_api_keys(user_id):
-    user = users_col.find_one({"user_id": user_id})
+    user = get_users_col().find_one({"user_id": user_id})
 
     if not user or not user.get("api_key"):
         return None
@@ -74,12 +139,13 @@ def get_api_keys(user_id):
     try:
         return {
             "api_key": decrypt_text(user["api_key"]),
-            "api_secret": decrypt_text(user["api_secret"])
+            "api_secret": decrypt_text(user["api_secret"]),
+            "mode": user.get("trading_mode", "live")
         }
 
     except Exception:
         # Si falla desencriptación, borrar para evitar API corrupta
-        users_col.update_one(
+        get_users_col().update_one(
             {"user_id": user_id},
             {"$set": {"api_key": None, "api_secret": None}}
         )
@@ -91,7 +157,7 @@ def get_api_keys(user_id):
 # ======================================================
 
 def save_user_capital(user_id, capital):
-    users_col.update_one(
+    get_users_col().update_one(
         {"user_id": user_id},
         {
             "$set": {
@@ -108,7 +174,7 @@ def save_user_capital(user_id, capital):
 # ======================================================
 
 def get_user_capital(user_id):
-    user = users_col.find_one({"user_id": user_id})
+    user = get_users_col().find_one({"user_id": user_id})
     if not user:
         return 0.0
 
@@ -123,7 +189,7 @@ def get_user_capital(user_id):
 # ======================================================
 
 def activate_trading(user_id):
-    users_col.update_one(
+    get_users_col().update_one(
         {"user_id": user_id},
         {
             "$set": {
@@ -136,7 +202,7 @@ def activate_trading(user_id):
 
 
 def deactivate_trading(user_id):
-    users_col.update_one(
+    get_users_col().update_one(
         {"user_id": user_id},
         {
             "$set": {
@@ -148,12 +214,38 @@ def deactivate_trading(user_id):
     return True
 
 
+# ======================================================
+# MODO DE TRADING (LIVE / PAPER)
+# ======================================================
+
+def get_trading_mode(user_id):
+    user = get_users_col().find_one({"user_id": user_id}, {"trading_mode": 1})
+    return (user or {}).get("trading_mode", "live")
+
+
+def set_trading_mode(user_id, mode):
+    """'live' → CoinEx real, 'paper' → exchange simulado."""
+    if mode not in ("live", "paper"):
+        raise ValueError(f"Modo de trading inválido: {mode}")
+
+    get_users_col().update_one(
+        {"user_id": user_id},
+        {
+            "$set": {
+                "trading_mode": mode,
+                "updated_at": datetime.datetime.utcnow()
+            }
+        }
+    )
+    return True
+
+
 # ======================================================
 # OBTENER USUARIO COMPLETO
 # ======================================================
 
 def get_user(user_id):
-    return users_col.find_one({"user_id": user_id})
+    return get_users_col().find_one({"user_id": user_id})
 
 
 # ======================================================
@@ -195,16 +287,108 @@ def register_trade(user_id, symbol, entry_price, exit_price, qty, result):
         "timestamp": datetime.datetime.utcnow()
     }
 
-    trades_col.insert_one(trade)
+    get_trades_col().insert_one(trade)
     return trade
 
 
+# ======================================================
+# POSICIONES ABIERTAS (PERSISTENTES)
+# ======================================================
+# Una posición se guarda al ejecutarse la compra y se cierra al
+# salir, así un reinicio del dyno puede retomar su monitoreo.
+
+POSITION_FIELDS = {
+    "user_id": 1,
+    "symbol": 1,
+    "entry_price": 1,
+    "qty": 1,
+    "tp_price": 1,
+    "sl_price": 1,
+    "opened_at": 1,
+    "exit_mode": 1,
+    "sl_order_id": 1,
+    "mode": 1
+}
+
+
+def create_position(position):
+    """Guarda la posición como 'open' y devuelve su id."""
+    now = datetime.datetime.utcnow()
+
+    doc = {
+        **{k: position[k] for k in POSITION_FIELDS if k in position},
+        "status": "open",
+        "opened_at": now,
+        "updated_at": now
+    }
+
+    return get_positions_col().insert_one(doc).inserted_id
+
+
+# Cierre y marcado solo sobre posiciones aún abiertas: al arrancar, la
+# reconciliación y el monitor retomado pueden actuar sobre la misma.
+# True solo para quien la cambió.
+
+def close_position(position_id, exit_price, result):
+    r = get_positions_col().update_one(
+        {"_id": position_id, "status": "open"},
+        {
+            "$set": {
+                "status": "closed",
+                "exit_price": exit_price,
+                "result": result,
+                "closed_at": datetime.datetime.utcnow(),
+                "updated_at": datetime.datetime.utcnow()
+            }
+        }
+    )
+    return r.modified_count == 1
+
+
+def update_position(position_id, **fields):
+    get_positions_col().update_one(
+        {"_id": position_id},
+        {"$set": {**fields, "updated_at": datetime.datetime.utcnow()}}
+    )
+    return True
+
+
+def mark_position(position_id, status, **fields):
+    r = get_positions_col().update_one(
+        {"_id": position_id, "status": "open"},
+        {
+            "$set": {
+                "status": status,
+                **fields,
+                "updated_at": datetime.datetime.utcnow()
+            }
+        }
+    )
+    return r.modified_count == 1
+
+
+def count_open_positions(user_id):
+    return get_positions_col().count_documents({"status": "open", "user_id": user_id})
+
+
+def get_open_positions():
+    """Todas las posiciones abiertas en UNA consulta."""
+    cursor = get_positions_col().find({"status": "open"}, POSITION_FIELDS)
+
+    positions = []
+    for doc in cursor:
+        doc["position_id"] = doc.pop("_id")
+        positions.append(doc)
+
+    return positions
+
+
 # ======================================================
 # HISTORIAL
 # ======================================================
 
 def get_user_trades(user_id):
-    return list(trades_col.find({"user_id": user_id}).sort("timestamp", -1))
+    return list(get_trades_col().find({"user_id": user_id}).sort("timestamp", -1))
 
 
 # ======================================================
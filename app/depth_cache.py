@@ -0,0 +1,166 @@
+import threading
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+
+from app import clock, metrics
+from app.coinex_api import get_depth
+from app.config import DEPTH_LIMIT, DEPTH_TTL, DEPTH_FETCH_WORKERS
+
+
+# ======================================================
+# LIBRO DE ÓRDENES (ACUMULADOS PRECALCULADOS)
+# ======================================================
+
+class OrderBook:
+    """
+    Lado comprador de una compra a mercado: asks con cantidad y coste
+    acumulados, para estimar el precio medio de una orden con una
+    búsqueda binaria (sin recorrer niveles).
+    """
+
+    __slots__ = ("symbol", "best_ask", "best_bid", "prices", "cum_qty", "cum_cost", "fetched_at")
+
+    def __init__(self, symbol, asks, bids):
+        self.symbol = symbol
+        self.best_ask = asks[0][0] if asks else None
+        self.best_bid = bids[0][0] if bids else None
+        self.prices = array("d")
+        self.cum_qty = array("d")
+        self.cum_cost = array("d")
+        self.fetched_at = clock.monotonic()
+
+        qty = cost = 0.0
+        for price, amount in asks:
+            qty += amount
+            cost += amount * price
+            self.prices.append(price)
+            self.cum_qty.append(qty)
+            self.cum_cost.append(cost)
+
+    def estimate_buy(self, usdt):
+        """
+        (cantidad, precio_medio, completa) al gastar `usdt` a mercado.
+        completa=False si el libro conocido no alcanza.
+        """
+        if not self.prices or usdt <= 0:
+            return 0.0, None, False
+
+        i = bisect_left(self.cum_cost, usdt)
+
+        if i >= len(self.prices):
+            return self.cum_qty[-1], self.cum_cost[-1] / self.cum_qty[-1], False
+
+        prev_qty = self.cum_qty[i - 1] if i else 0.0
+        prev_cost = self.cum_cost[i - 1] if i else 0.0
+        qty = prev_qty + (usdt - prev_cost) / self.prices[i]
+        return qty, usdt / qty, True
+
+    def max_buy_notional(self, max_avg_price):
+        """USDT máximos cuyo precio medio no supera `max_avg_price`."""
+        if not self.prices or self.prices[0] > max_avg_price:
+            return 0.0
+
+        # El precio medio crece con el tamaño: último nivel aún válido
+        lo, hi = 0, len(self.prices) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.cum_cost[mid] <= max_avg_price * self.cum_qty[mid]:
+                lo = mid
+            else:
+                hi = mid - 1
+
+        if lo == len(self.prices) - 1:
+            return self.cum_cost[lo]
+
+        # Parte del siguiente nivel: (C + p·q) / (Q + q) = max_avg_price
+        price = self.prices[lo + 1]
+        q = (max_avg_price * self.cum_qty[lo] - self.cum_cost[lo]) / (price - max_avg_price)
+        return self.cum_cost[lo] + price * max(q, 0.0)
+
+
+# ======================================================
+# CACHÉ CON TTL CORTO
+# ======================================================
+
+_books = {}
+_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=DEPTH_FETCH_WORKERS, thread_name_prefix="depth")
+
+
+def _fresh(symbol, max_age):
+    book = _books.get(symbol)
+    if book is not None and clock.monotonic() - book.fetched_at <= max_age:
+        return book
+    return None
+
+
+def _fetch(symbol):
+    depth = get_depth(symbol, DEPTH_LIMIT)
+
+    if depth is None:
+        metrics.incr("depth.errors")
+        return None
+
+    book = OrderBook(symbol, *depth)
+    with _lock:
+        _books[symbol] = book
+    return book
+
+
+def get_book(symbol, max_age=DEPTH_TTL):
+    """Libro del símbolo; se pide a CoinEx si tiene más de max_age s."""
+    book = _fresh(symbol, max_age)
+    if book is not None:
+        metrics.incr("depth.hits")
+        return book
+
+    metrics.incr("depth.misses")
+    return _fetch(symbol)
+
+
+def reset():
+    """Borra los libros en caché (benchmarks entre corridas)."""
+    with _lock:
+        _books.clear()
+
+
+def prefetch(symbols, max_age=DEPTH_TTL):
+    """
+    Refresca en paralelo los libros caducados de varios símbolos
+    (p. ej. las oportunidades de un ciclo) y espera a que lleguen.
+    """
+    stale = [s for s in dict.fromkeys(symbols) if _fresh(s, max_age) is None]
+
+    for future in [_pool.submit(_fetch, s) for s in stale]:
+        future.result()
+
+    return len(stale)
+
+
+# ======================================================
+# DESLIZAMIENTO ESTIMADO
+# ======================================================
+
+def check_buy(symbol, usdt, reference_price, max_slippage):
+    """
+    Estima la compra de `usdt` contra el libro en caché:
+    {"usdt": importe dentro del presupuesto (≤ usdt), "avg_price",
+     "slippage": del importe pedido vs reference_price}.
+    None si no hay libro disponible.
+    """
+    book = get_book(symbol)
+
+    if book is None or not book.prices:
+        return None
+
+    qty, avg_price, complete = book.estimate_buy(usdt)
+    slippage = avg_price / reference_price - 1 if complete else float("inf")
+
+    allowed = usdt
+    if slippage > max_slippage:
+        allowed = min(usdt, book.max_buy_notional(reference_price * (1 + max_slippage)))
+        if allowed > 0:
+            _, avg_price, _ = book.estimate_buy(allowed)
+
+    return {"usdt": allowed, "avg_price": avg_price, "slippage": slippage}
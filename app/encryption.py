@@ -1,26 +1,54 @@
-from cryptography.fernet import Fernet
 import os
+import threading
 
 # =======================================
-# CARGAR CLAVE DE ENCRIPTACIÓN DESDE ENV
+# CLAVE DE ENCRIPTACIÓN (CARGA PEREZOSA)
 # =======================================
+# La clave se valida en init() o en el primer encrypt/decrypt,
+# así importar este módulo nunca falla ni toca el entorno.
 
-SECRET_ENCRYPTION_KEY = os.getenv("SECRET_ENCRYPTION_KEY")
+_cipher = None
+_init_lock = threading.Lock()
 
-if not SECRET_ENCRYPTION_KEY:
-    raise ValueError(
-        "❌ ERROR FATAL: Falta SECRET_ENCRYPTION_KEY en variables de entorno.\n"
-        "Debes generar una clave con Fernet.generate_key() y ponerla en Railway."
-    )
 
-try:
-    # Cargar clave Fernet válida
-    cipher = Fernet(SECRET_ENCRYPTION_KEY.encode("utf-8"))
-except Exception:
-    raise ValueError(
-        "❌ ERROR FATAL: SECRET_ENCRYPTION_KEY no es válida.\n"
-        "Debe ser una clave generada por Fernet.generate_key()."
-    )
+def init():
+    """
+    Carga y valida SECRET_ENCRYPTION_KEY una sola vez.
+    Lanza ValueError si falta o no es una clave Fernet válida.
+    """
+    global _cipher
+
+    with _init_lock:
+        if _cipher is not None:
+            return _cipher
+
+        secret_key = os.getenv("SECRET_ENCRYPTION_KEY")
+
+        if not secret_key:
+            raise ValueError(
+                "❌ ERROR FATAL: Falta SECRET_ENCRYPTION_KEY en variables de entorno.\n"
+                "Debes generar una clave con Fernet.generate_key() y ponerla en Railway."
+            )
+
+        from cryptography.fernet import Fernet
+
+        try:
+            # Cargar clave Fernet válida
+            _cipher = Fernet(secret_key.encode("utf-8"))
+        except Exception:
+            raise ValueError(
+                "❌ ERROR FATAL: SECRET_ENCRYPTION_KEY no es válida.\n"
+                "Debe ser una clave generada por Fernet.generate_key()."
+            )
+
+    return _cipher
+
+
+def get_cipher():
+    if _cipher is None:
+        return init()
+    return _cipher
+
 
 # =======================================
 # FUNCIONES DE ENCRIPTACIÓN
@@ -33,7 +61,7 @@ def encrypt_text(text: str) -> str:
     """
     if not isinstance(text, str):
         text = str(text)
-    return cipher.encrypt(text.encode("utf-8")).decode("utf-8")
+    return get_cipher().encrypt(text.encode("utf-8")).decode("utf-8")
 
 
 def decrypt_text(encrypted_text: str) -> str:
@@ -41,4 +69,4 @@ def decrypt_text(encrypted_text: str) -> str:
     Desencripta texto previamente encriptado.
     Devuelve siempre un string normal.
     """
-    return cipher.decrypt(encrypted_text.encode("utf-8")).decode("utf-8")
+    return get_cipher().decrypt(encrypted_text.encode("utf-8")).decode("utf-8")
@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+
+from app import clock
+from app.config import EVAL_MEMO_MAX_ENTRIES, EVAL_MEMO_TTL
+
+
+# ======================================================
+# MEMO DE EVALUACIONES POR VELA CERRADA
+# ======================================================
+
+class EvaluationMemo:
+    """
+    Última vela cerrada evaluada por (símbolo, timeframe) y sus
+    métricas. Si la vela no ha cambiado no hace falta pedir velas ni
+    recalcular, y una vela con señal no vuelve a darla.
+    LRU con `max_entries` y expiración a los `ttl` segundos.
+    """
+
+    def __init__(self, max_entries=EVAL_MEMO_MAX_ENTRIES, ttl=EVAL_MEMO_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, symbol, timeframe):
+        """(candle_ts, metrics, signaled) o None si no hay / expiró."""
+        key = (symbol, timeframe)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if clock.monotonic() - entry[3] > self.ttl:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return entry[:3]
+
+    def put(self, symbol, timeframe, candle_ts, metrics, signaled):
+        """
+        Guarda la evaluación. Devuelve True si es la primera para esta
+        vela (solo entonces se puede emitir la señal). Una vela anterior
+        a la guardada (respuesta atrasada) no cuenta ni retrocede el memo.
+        """
+        key = (symbol, timeframe)
+
+        with self._lock:
+            previous = self._entries.get(key)
+            first = previous is None or candle_ts > previous[0]
+
+            if previous is not None and candle_ts < previous[0]:
+                return False
+
+            # Una vela que ya dio señal la conserva aunque se reevalúe
+            if not first:
+                signaled = signaled or previous[2]
+
+            self._entries[key] = (candle_ts, metrics, signaled, clock.monotonic())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return first
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+eval_memo = EvaluationMemo()
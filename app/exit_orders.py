@@ -0,0 +1,141 @@
+from app.coinex_api import (
+    place_stop_sell,
+    get_pending_stop_ids,
+    get_finished_orders,
+    cancel_stop_order
+)
+from app.market_meta import quantize_price, get_market
+from app import balance_cache
+from app.logger import get_logger
+
+log = get_logger("exits")
+
+# Fracción de la cantidad que puede quedar en saldo (fees, polvo)
+# para dar por vendida la posición
+FILL_TOLERANCE = 0.02
+
+
+# ======================================================
+# SALIDAS EN EL EXCHANGE (SL STOP + TP POR PRECIO)
+# ======================================================
+# En modo "exchange" el SL queda en CoinEx como stop justo después de
+# la compra: protege la posición aunque el bot se caiga. El TP se
+# vigila por precio y se ejecuta cancelando el stop y vendiendo a
+# mercado. Solo hay UNA orden de salida sobre las monedas: un TP
+# límite congelaría el saldo y el stop no podría vender al dispararse.
+# El monitor por precio (modo "client") queda como respaldo si CoinEx
+# rechaza el stop.
+
+def place_exit_orders(position):
+    """
+    Coloca el SL stop en CoinEx. Devuelve los campos a guardar en la
+    posición: sl_order_id y exit_mode.
+    """
+    user_id = position["user_id"]
+    symbol = position["symbol"]
+
+    sl = place_stop_sell(user_id, symbol, position["qty"], quantize_price(symbol, position["sl_price"]))
+
+    fields = {"sl_order_id": str(sl["stop_id"]) if sl else None}
+    fields["exit_mode"] = "exchange" if fields["sl_order_id"] else "client"
+
+    if fields["exit_mode"] == "exchange":
+        log.info(
+            "exits.placed", "🏦 SL en CoinEx para %s | stop: %s | TP por precio: %s",
+            symbol, fields["sl_order_id"], position["tp_price"],
+            symbol=symbol, user_id=user_id
+        )
+    else:
+        log.warning("exits.rejected", "⚠️ CoinEx rechazó el SL de %s, se usa monitoreo por precio.",
+                    symbol, symbol=symbol, user_id=user_id)
+
+    return fields
+
+
+def _base_held(position):
+    """Monedas del par en la cuenta (disponibles + congeladas). None si CoinEx falla."""
+    symbol = position["symbol"]
+    info = get_market(symbol) or {}
+    base = info.get("base_ccy") or (symbol[:-4] if symbol.endswith("USDT") else symbol)
+
+    balances = balance_cache.refresh(position["user_id"])
+    if balances is None:
+        return None
+
+    held = balances.get(base, {})
+    return held.get("available", 0.0) + held.get("frozen", 0.0)
+
+
+def confirm_sold(position):
+    """
+    True si el saldo confirma que las monedas ya no están, False si
+    siguen en la cuenta y None si no se pudo consultar.
+    """
+    held = _base_held(position)
+    if held is None:
+        return None
+    return held < position["qty"] * FILL_TOLERANCE
+
+
+def stop_fill_price(position):
+    """
+    Precio medio al que vendió el stop, desde el historial de órdenes:
+    la venta terminada más reciente del par (el usuario no tiene otra
+    posición en el mismo par). None si CoinEx falla o no aparece.
+    """
+    orders = get_finished_orders(position["user_id"], position["symbol"], side="sell")
+
+    for order in orders or ():
+        try:
+            filled = float(order.get("filled_amount") or 0)
+            value = float(order.get("filled_value") or 0)
+        except (TypeError, ValueError):
+            continue
+        if filled >= position["qty"] * (1 - FILL_TOLERANCE):
+            return value / filled
+
+    return None
+
+
+def check_exit_orders(position):
+    """
+    Consulta el stop. Devuelve:
+    - ("sl_hit", precio medio) si ya no está pendiente y el saldo
+      confirma la venta; el precio sale del historial de órdenes (o
+      sl_price si CoinEx no lo da)
+    - ("sl_lost", None) si el stop desapareció sin vender (cancelado o
+      rechazado al dispararse): hay que vigilar el SL por precio
+    - None si el stop sigue vivo o CoinEx no respondió
+    """
+    user_id = position["user_id"]
+    symbol = position["symbol"]
+
+    sl_id = position.get("sl_order_id")
+    if not sl_id:
+        return None
+
+    pending = get_pending_stop_ids(user_id, symbol)
+    if pending is None or sl_id in pending:
+        return None
+
+    # Que no esté pendiente no prueba que vendiera: se mira el saldo
+    sold = confirm_sold(position)
+    if sold is None:
+        return None
+    if not sold:
+        return "sl_lost", None
+
+    price = stop_fill_price(position)
+    if price is None:
+        log.warning("exits.fill_unknown", "⚠️ Sin precio de ejecución del stop de %s, se registra el SL",
+                    symbol, symbol=symbol, user_id=user_id)
+        price = position["sl_price"]
+
+    return "sl_hit", price
+
+
+def cancel_stop(position):
+    """Cancela el stop si sigue en CoinEx. None si CoinEx lo rechaza."""
+    if not position.get("sl_order_id"):
+        return None
+    return cancel_stop_order(position["user_id"], position["symbol"], position["sl_order_id"])
@@ -0,0 +1,292 @@
+"""
+Exportación incremental de trades y posiciones a archivos columnares.
+
+Uso:
+    python -m app.export_trades [--out exports/] [--batch 5000]
+        [--collections trades,positions] [--format parquet|csv] [--full]
+
+Salida particionada por fecha (UTC):
+    exports/trades/date=2024-05-01/part-<run>-00000.parquet
+    exports/positions/date=2024-05-01/part-<run>-00000.parquet
+Parquet si pyarrow está instalado; si no, CSV con las mismas columnas.
+
+Cada corrida continúa desde la marca (timestamp, _id) guardada en
+exports/_state.json, leyendo con un cursor por lotes ordenado por ese
+índice: la memoria es la de un lote, sea cual sea el tamaño de la
+colección. La marca se guarda tras escribir cada archivo.
+
+Los timestamps los asigna el cliente (datetime.utcnow() en cada hilo),
+así que un documento con marca más vieja puede confirmarse después de
+uno más nuevo. Por eso solo se exportan documentos anteriores a
+ahora - EXPORT_SAFETY_LAG, leyendo del primario con read concern
+majority: lo que queda por debajo de la marca ya no puede aparecer.
+
+Las posiciones cambian de estado, así que se exportan por updated_at:
+una posición puede aparecer en varias corridas; la fila válida es la
+de updated_at más reciente para cada _id.
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import os
+import uuid
+
+from bson import ObjectId
+from pymongo import ReadPreference
+from pymongo.read_concern import ReadConcern
+
+from app.database import get_trades_col, get_positions_col
+from app.config import EXPORT_DIR, EXPORT_BATCH_SIZE, EXPORT_SAFETY_LAG
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+# ======================================================
+# ESQUEMAS
+# ======================================================
+# (columna, tipo): str | int | float | ts
+
+SCHEMAS = {
+    "trades": {
+        "collection": get_trades_col,
+        "watermark": "timestamp",
+        "columns": [
+            ("_id", "str"),
+            ("user_id", "int"),
+            ("symbol", "str"),
+            ("entry_price", "float"),
+            ("exit_price", "float"),
+            ("qty", "float"),
+            ("profit_usdt", "float"),
+            ("result", "str"),
+            ("timestamp", "ts")
+        ]
+    },
+    "positions": {
+        "collection": get_positions_col,
+        "watermark": "updated_at",
+        "columns": [
+            ("_id", "str"),
+            ("user_id", "int"),
+            ("symbol", "str"),
+            ("status", "str"),
+            ("exit_mode", "str"),
+            ("entry_price", "float"),
+            ("qty", "float"),
+            ("tp_price", "float"),
+            ("sl_price", "float"),
+            ("exit_price", "float"),
+            ("result", "str"),
+            ("opened_at", "ts"),
+            ("closed_at", "ts"),
+            ("updated_at", "ts")
+        ]
+    }
+}
+
+
+def _convert(value, kind):
+    if value is None:
+        return None
+    try:
+        if kind == "str":
+            return str(value)
+        if kind == "int":
+            return int(value)
+        if kind == "float":
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if isinstance(value, datetime.datetime) else None
+
+
+def _row(doc, columns):
+    return {name: _convert(doc.get(name), kind) for name, kind in columns}
+
+
+# ======================================================
+# MARCA DE AGUA (ESTADO ENTRE CORRIDAS)
+# ======================================================
+
+def _state_path(out_dir):
+    return os.path.join(out_dir, "_state.json")
+
+
+def load_state(out_dir):
+    try:
+        with open(_state_path(out_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(out_dir, state):
+    path = _state_path(out_dir)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _query(field, mark, cutoff):
+    """
+    Documentos estrictamente posteriores a (field, _id) de la marca y
+    anteriores al corte.
+    """
+    if not mark:
+        return {field: {"$ne": None, "$lt": cutoff}}
+
+    ts = datetime.datetime.fromisoformat(mark["ts"])
+    last_id = ObjectId(mark["id"])
+
+    return {"$and": [
+        {field: {"$lt": cutoff}},
+        {"$or": [
+            {field: {"$gt": ts}},
+            {field: ts, "_id": {"$gt": last_id}}
+        ]}
+    ]}
+
+
+# ======================================================
+# ESCRITURA DE ARCHIVOS
+# ======================================================
+
+_ARROW_TYPES = {
+    "str": lambda: pa.string(),
+    "int": lambda: pa.int64(),
+    "float": lambda: pa.float64(),
+    "ts": lambda: pa.timestamp("ms")
+}
+
+
+def _write_part(path, rows, columns, fmt):
+    """Escribe a .tmp y renombra: no quedan archivos a medias."""
+    tmp = path + ".tmp"
+
+    if fmt == "parquet":
+        schema = pa.schema([(name, _ARROW_TYPES[kind]()) for name, kind in columns])
+        table = pa.Table.from_pylist(rows, schema=schema)
+        pq.write_table(table, tmp)
+    else:
+        with open(tmp, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=[name for name, _ in columns])
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({
+                    k: v.isoformat() if isinstance(v, datetime.datetime) else v
+                    for k, v in row.items()
+                })
+
+    os.replace(tmp, path)
+
+
+# ======================================================
+# EXPORTAR UNA COLECCIÓN
+# ======================================================
+
+def export_collection(name, out_dir, state, batch_size=EXPORT_BATCH_SIZE, fmt="parquet", run_id=None,
+                      now=None):
+    """
+    Recorre lo nuevo desde la marca en orden (field, _id) hasta
+    now - EXPORT_SAFETY_LAG y escribe un archivo por lote y fecha.
+    Devuelve el número de documentos.
+    """
+    spec = SCHEMAS[name]
+    field = spec["watermark"]
+    columns = spec["columns"]
+    run_id = run_id or uuid.uuid4().hex[:8]
+    cutoff = (now or datetime.datetime.utcnow()) - datetime.timedelta(seconds=EXPORT_SAFETY_LAG)
+
+    # Primario y majority: un secundario atrasado dejaría huecos bajo la marca
+    collection = spec["collection"]().with_options(
+        read_preference=ReadPreference.PRIMARY,
+        read_concern=ReadConcern("majority")
+    )
+
+    cursor = (
+        collection
+        .find(_query(field, state.get(name), cutoff), {c: 1 for c, _ in columns})
+        .sort([(field, 1), ("_id", 1)])
+        .batch_size(batch_size)
+    )
+
+    buffer = []
+    current_date = None
+    last_doc = None
+    exported = 0
+    part = 0
+
+    def flush():
+        nonlocal buffer, part
+        if not buffer:
+            return
+
+        directory = os.path.join(out_dir, name, f"date={current_date}")
+        os.makedirs(directory, exist_ok=True)
+        ext = "parquet" if fmt == "parquet" else "csv"
+        _write_part(os.path.join(directory, f"part-{run_id}-{part:05d}.{ext}"), buffer, columns, fmt)
+        part += 1
+
+        state[name] = {"ts": last_doc[field].isoformat(), "id": str(last_doc["_id"])}
+        save_state(out_dir, state)
+        buffer = []
+
+    for doc in cursor:
+        date = doc[field].date().isoformat()
+
+        if buffer and (date != current_date or len(buffer) >= batch_size):
+            flush()
+
+        current_date = date
+        buffer.append(_row(doc, columns))
+        last_doc = doc
+        exported += 1
+
+    flush()
+    return exported
+
+
+def export_all(out_dir=EXPORT_DIR, collections=("trades", "positions"), batch_size=EXPORT_BATCH_SIZE,
+               fmt=None, full=False, now=None):
+    fmt = fmt or ("parquet" if pa is not None else "csv")
+    if fmt == "parquet" and pa is None:
+        raise RuntimeError("pyarrow no está instalado: use --format csv")
+
+    os.makedirs(out_dir, exist_ok=True)
+    state = {} if full else load_state(out_dir)
+    run_id = uuid.uuid4().hex[:8]
+
+    return {
+        name: export_collection(name, out_dir, state, batch_size, fmt, run_id, now)
+        for name in collections
+    }
+
+
+# ======================================================
+# CLI
+# ======================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportación incremental de trades/posiciones")
+    parser.add_argument("--out", default=EXPORT_DIR)
+    parser.add_argument("--batch", type=int, default=EXPORT_BATCH_SIZE, help="Documentos por lote/archivo")
+    parser.add_argument("--collections", default="trades,positions")
+    parser.add_argument("--format", choices=("parquet", "csv"), default=None,
+                        help="Por defecto parquet si hay pyarrow, si no csv")
+    parser.add_argument("--full", action="store_true", help="Ignorar la marca y exportar todo")
+    args = parser.parse_args()
+
+    counts = export_all(args.out, args.collections.split(","), args.batch, args.format, args.full)
+
+    for name, count in counts.items():
+        print(f"📦 {name}: {count} documentos exportados")
+
+
+if __name__ == "__main__":
+    main()
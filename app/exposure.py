@@ -0,0 +1,142 @@
+import itertools
+import threading
+
+from app import metrics
+from app.config import (
+    MAX_ACTIVE_PAIRS,
+    EXPOSURE_MAX_SYMBOL_USDT,
+    EXPOSURE_MAX_TOTAL_USDT,
+    EXPOSURE_MAX_POSITIONS
+)
+
+
+# ======================================================
+# ÍNDICE DE EXPOSICIÓN EN MEMORIA
+# ======================================================
+# Nocional abierto por símbolo, por usuario y total, actualizado al
+# abrir y cerrar posiciones. Los límites se comprueban y reservan en
+# la misma operación (O(1), bajo un lock), así dos usuarios del mismo
+# tick no pueden pasar los dos el límite de un símbolo.
+# Límite 0 = sin límite.
+#
+# Cada modo ("live" / "paper") lleva sus propios acumulados y límites:
+# las operaciones simuladas no ocupan el cupo del dinero real.
+
+MODES = ("live", "paper")
+
+# clave → (user_id, symbol, notional, mode)
+_positions = {}
+# (mode, symbol) → nocional
+_by_symbol = {}
+_by_user = {}
+_user_counts = {}
+# mode → nocional / nº de posiciones
+_total = dict.fromkeys(MODES, 0.0)
+_mode_counts = dict.fromkeys(MODES, 0)
+
+_lock = threading.Lock()
+_keys = itertools.count(1)
+
+
+def _mode(mode):
+    return mode if mode in MODES else "live"
+
+
+def _add(key, user_id, symbol, notional, mode):
+    _positions[key] = (user_id, symbol, notional, mode)
+    _by_symbol[mode, symbol] = _by_symbol.get((mode, symbol), 0.0) + notional
+    _by_user[user_id] = _by_user.get(user_id, 0.0) + notional
+    _user_counts[user_id] = _user_counts.get(user_id, 0) + 1
+    _total[mode] += notional
+    _mode_counts[mode] += 1
+
+
+def _check(user_id, symbol, notional, mode):
+    """Motivo del rechazo o None si la operación cabe en los límites."""
+    if _user_counts.get(user_id, 0) >= MAX_ACTIVE_PAIRS:
+        return f"usuario con {MAX_ACTIVE_PAIRS} posiciones abiertas"
+
+    if EXPOSURE_MAX_POSITIONS and _mode_counts[mode] >= EXPOSURE_MAX_POSITIONS:
+        return f"{EXPOSURE_MAX_POSITIONS} posiciones abiertas en total"
+
+    if EXPOSURE_MAX_SYMBOL_USDT and _by_symbol.get((mode, symbol), 0.0) + notional > EXPOSURE_MAX_SYMBOL_USDT:
+        return f"exposición en {symbol} > {EXPOSURE_MAX_SYMBOL_USDT:g} USDT"
+
+    if EXPOSURE_MAX_TOTAL_USDT and _total[mode] + notional > EXPOSURE_MAX_TOTAL_USDT:
+        return f"exposición total > {EXPOSURE_MAX_TOTAL_USDT:g} USDT"
+
+    return None
+
+
+def reserve(user_id, symbol, notional, mode="live"):
+    """
+    Comprueba los límites del modo y, si caben, reserva el nocional.
+    Devuelve (clave, None) o (None, motivo).
+    """
+    mode = _mode(mode)
+
+    with _lock:
+        reason = _check(user_id, symbol, notional, mode)
+        if reason:
+            metrics.incr("exposure.rejects")
+            return None, reason
+
+        key = ("r", next(_keys))
+        _add(key, user_id, symbol, notional, mode)
+
+    return key, None
+
+
+def release(key):
+    """Quita la posición del índice (cierre, compra fallida, huérfana)."""
+    with _lock:
+        entry = _positions.pop(key, None)
+        if entry is None:
+            return
+
+        user_id, symbol, notional, mode = entry
+        _total[mode] -= notional
+        _mode_counts[mode] -= 1
+
+        _by_symbol[mode, symbol] -= notional
+        if _by_symbol[mode, symbol] <= 1e-9:
+            del _by_symbol[mode, symbol]
+
+        _by_user[user_id] -= notional
+        _user_counts[user_id] -= 1
+        if not _user_counts[user_id]:
+            del _by_user[user_id], _user_counts[user_id]
+
+
+def rebuild(positions):
+    """
+    Reconstruye el índice desde las posiciones abiertas persistidas
+    (la consulta masiva del arranque). Las posiciones sin modo son
+    anteriores al modo paper: real. Devuelve la exposición real total.
+    """
+    with _lock:
+        _positions.clear()
+        _by_symbol.clear()
+        _by_user.clear()
+        _user_counts.clear()
+        for mode in MODES:
+            _total[mode] = 0.0
+            _mode_counts[mode] = 0
+
+        for position in positions:
+            key = position.get("position_id")
+            position["exposure_key"] = key
+            _add(key, position["user_id"], position["symbol"], position["entry_price"] * position["qty"],
+                 _mode(position.get("mode")))
+
+        return _total["live"]
+
+
+def totals(mode="live"):
+    """(total, posiciones, símbolo con más exposición y su nocional) del modo."""
+    with _lock:
+        top = max(
+            ((symbol, notional) for (m, symbol), notional in _by_symbol.items() if m == mode),
+            key=lambda item: item[1], default=(None, 0.0)
+        )
+        return _total[mode], _mode_counts[mode], top
@@ -0,0 +1,244 @@
+import math
+import threading
+from array import array
+from collections import OrderedDict, deque
+
+from app.config import INDICATOR_WINDOW, INDICATOR_MAX_STATES
+
+
+# ======================================================
+# INDICADORES INCREMENTALES (O(1) POR VELA)
+# ======================================================
+
+class EMA:
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, period):
+        self.alpha = 2 / (period + 1)
+        self.value = None
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class ATR:
+    """ATR de Wilder."""
+
+    __slots__ = ("period", "value", "prev_close", "count")
+
+    def __init__(self, period):
+        self.period = period
+        self.value = None
+        self.prev_close = None
+        self.count = 0
+
+    def update(self, high, low, close):
+        if self.prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+        self.prev_close = close
+        self.count += 1
+
+        if self.value is None:
+            self.value = tr
+        elif self.count <= self.period:
+            # Media simple hasta tener `period` velas
+            self.value += (tr - self.value) / self.count
+        else:
+            self.value += (tr - self.value) / self.period
+        return self.value
+
+
+class RollingStats:
+    """Media y desviación sobre una ventana fija (buffer circular)."""
+
+    __slots__ = ("window", "buf", "pos", "count", "total", "total_sq")
+
+    def __init__(self, window):
+        self.window = window
+        self.buf = array("d", bytes(8 * window))
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, x):
+        if self.count == self.window:
+            old = self.buf[self.pos]
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.count += 1
+
+        self.buf[self.pos] = x
+        self.pos = (self.pos + 1) % self.window
+        self.total += x
+        self.total_sq += x * x
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return 0.0
+        var = self.total_sq / self.count - self.mean ** 2
+        return math.sqrt(var) if var > 0 else 0.0
+
+    def zscore(self, x):
+        std = self.std
+        return (x - self.mean) / std if std > 0 else 0.0
+
+
+class Donchian:
+    """Máximo / mínimo de la ventana con colas monótonas (O(1) amortizado)."""
+
+    __slots__ = ("window", "n", "highs", "lows")
+
+    def __init__(self, window):
+        self.window = window
+        self.n = 0
+        self.highs = deque()
+        self.lows = deque()
+
+    def update(self, high, low):
+        i = self.n
+        self.n += 1
+
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((i, high))
+
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((i, low))
+
+        start = self.n - self.window
+        if self.highs[0][0] < start:
+            self.highs.popleft()
+        if self.lows[0][0] < start:
+            self.lows.popleft()
+
+    @property
+    def high(self):
+        return self.highs[0][1] if self.highs else None
+
+    @property
+    def low(self):
+        return self.lows[0][1] if self.lows else None
+
+
+class RollingVWAP:
+    __slots__ = ("pv", "vol")
+
+    def __init__(self, window):
+        self.pv = RollingStats(window)
+        self.vol = RollingStats(window)
+
+    def update(self, high, low, close, volume):
+        typical = (high + low + close) / 3
+        self.pv.update(typical * volume)
+        self.vol.update(volume)
+
+    @property
+    def value(self):
+        return self.pv.total / self.vol.total if self.vol.total > 0 else None
+
+
+# ======================================================
+# ESTADO POR (SÍMBOLO, TIMEFRAME)
+# ======================================================
+
+class IndicatorState:
+    """
+    Indicadores de las velas CERRADAS de un símbolo. La vela más
+    reciente (posiblemente en curso) nunca se incorpora: se compara
+    contra este estado.
+    """
+
+    __slots__ = ("window", "last_ts", "ema", "atr", "volume", "donchian", "vwap", "lock")
+
+    def __init__(self, window=INDICATOR_WINDOW):
+        self.window = window
+        self.last_ts = None
+        self.ema = EMA(window)
+        self.atr = ATR(window)
+        self.volume = RollingStats(window)
+        self.donchian = Donchian(window)
+        self.vwap = RollingVWAP(window)
+        self.lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.volume.count >= self.window
+
+    def update(self, ts, close, high, low, volume):
+        if self.last_ts is not None and ts <= self.last_ts:
+            return False
+
+        self.last_ts = ts
+        self.ema.update(close)
+        self.atr.update(high, low, close)
+        self.volume.update(volume)
+        self.donchian.update(high, low)
+        self.vwap.update(high, low, close, volume)
+        return True
+
+    def update_klines(self, klines, upto):
+        """Incorpora las velas [0, upto) de un Klines que sean nuevas."""
+        ts, close, high, low, vol = klines.timestamp, klines.close, klines.high, klines.low, klines.volume
+        with self.lock:
+            for i in range(upto):
+                self.update(ts[i], close[i], high[i], low[i], vol[i])
+
+    def missing_candles(self, now_ms, period_ms):
+        """Velas que faltan desde la última incorporada (para pedir solo esas)."""
+        if self.last_ts is None:
+            return self.window + 1
+        return max(int((now_ms - self.last_ts) // period_ms), 1) + 1
+
+    def snapshot(self, volume):
+        """Contexto para comparar una vela nueva con su historial."""
+        return {
+            "ready": self.ready,
+            "ema": self.ema.value,
+            "atr": self.atr.value,
+            "range_high": self.donchian.high,
+            "range_low": self.donchian.low,
+            "vwap": self.vwap.value,
+            "volume_mean": self.volume.mean,
+            "volume_z": self.volume.zscore(volume)
+        }
+
+
+_states = OrderedDict()
+_states_lock = threading.Lock()
+
+
+def get_state(symbol, timeframe):
+    """Estado compartido por (símbolo, timeframe), con límite LRU."""
+    key = (symbol, timeframe)
+
+    with _states_lock:
+        state = _states.get(key)
+        if state is None:
+            state = _states[key] = IndicatorState()
+            while len(_states) > INDICATOR_MAX_STATES:
+                _states.popitem(last=False)
+        else:
+            _states.move_to_end(key)
+
+    return state
+
+
+def reset():
+    """Borra los estados de todos los símbolos (benchmarks entre corridas)."""
+    with _states_lock:
+        _states.clear()
@@ -0,0 +1,126 @@
+from array import array
+
+try:
+    # Parser JSON rápido opcional (pip install orjson)
+    import orjson
+
+    def loads(content):
+        return orjson.loads(content)
+
+except ImportError:
+    import json
+
+    def loads(content):
+        if isinstance(content, (bytes, bytearray)):
+            content = content.decode("utf-8")
+        return json.loads(content)
+
+
+# ======================================================
+# DURACIÓN DE CADA TIMEFRAME (SEGUNDOS)
+# ======================================================
+
+TIMEFRAME_SECONDS = {
+    "1min": 60,
+    "3min": 180,
+    "5min": 300,
+    "15min": 900,
+    "30min": 1800,
+    "1hour": 3600,
+    "4hour": 14400,
+    "1day": 86400,
+}
+
+
+# ======================================================
+# VELAS EN ARRAYS TIPADOS
+# ======================================================
+
+class Klines:
+    """
+    Velas en columnas compactas:
+    timestamp (int64, ms) y open/close/high/low/volume (float64).
+    Siempre ordenadas por timestamp ascendente.
+    """
+
+    __slots__ = ("timestamp", "open", "close", "high", "low", "volume")
+
+    def __init__(self):
+        self.timestamp = array("q")
+        self.open = array("d")
+        self.close = array("d")
+        self.high = array("d")
+        self.low = array("d")
+        self.volume = array("d")
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def append(self, ts, open_price, close_price, high_price, low_price, volume):
+        self.timestamp.append(ts)
+        self.open.append(open_price)
+        self.close.append(close_price)
+        self.high.append(high_price)
+        self.low.append(low_price)
+        self.volume.append(volume)
+
+    def columns(self):
+        return (self.timestamp, self.open, self.close, self.high, self.low, self.volume)
+
+    def take(self, order):
+        """Devuelve nuevas Klines con las filas en el orden indicado."""
+        out = Klines()
+        for src, dst in zip(self.columns(), out.columns()):
+            dst.extend(src[i] for i in order)
+        return out
+
+
+def _normalize_ts(ts):
+    # CoinEx V1 usa segundos, V2 milisegundos
+    ts = int(ts)
+    return ts * 1000 if ts < 10_000_000_000 else ts
+
+
+def decode_klines(rows):
+    """
+    Convierte la lista `klines` de CoinEx en Klines.
+
+    Acepta ambos formatos:
+    - V2: {"created_at", "open", "close", "high", "low", "volume", ...}
+    - V1: [timestamp, open, close, high, low, volume, ...]
+
+    Las filas inválidas se descartan.
+    """
+    out = Klines()
+
+    if not rows:
+        return out
+
+    for row in rows:
+        try:
+            if isinstance(row, dict):
+                out.append(
+                    _normalize_ts(row["created_at"]),
+                    float(row["open"]),
+                    float(row["close"]),
+                    float(row["high"]),
+                    float(row["low"]),
+                    float(row["volume"])
+                )
+            else:
+                out.append(
+                    _normalize_ts(row[0]),
+                    float(row[1]),
+                    float(row[2]),
+                    float(row[3]),
+                    float(row[4]),
+                    float(row[5])
+                )
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue
+
+    ts = out.timestamp
+    if any(ts[i] > ts[i + 1] for i in range(len(ts) - 1)):
+        out = out.take(sorted(range(len(ts)), key=ts.__getitem__))
+
+    return out
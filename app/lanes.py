@@ -0,0 +1,178 @@
+import threading
+
+from app import clock, metrics
+from app.config import COINEX_RATE_LIMIT, COINEX_LANE_SHARES, COINEX_LANE_CONNECTIONS, COINEX_TIMEOUT
+
+
+# ======================================================
+# CARRILES DE PRIORIDAD HACIA COINEX
+# ======================================================
+# Cada petición va por un carril: exit > entry > poll > scan. Cada
+# carril tiene su propio cupo de conexiones (semáforo + pool HTTP) y
+# su parte reservada del límite de peticiones por segundo. Un carril
+# sin fichas puede tomar prestadas de los de MENOR prioridad, nunca
+# al revés: un stop-loss no espera detrás de cientos de velas.
+
+LANES = ("exit", "entry", "poll", "scan")
+
+# Sondeo de conexión libre con un reloj virtual (s virtuales)
+SLOT_POLL_SECONDS = 0.01
+
+
+def _parse_map(raw):
+    result = {}
+    for item in filter(None, (raw or "").split(",")):
+        name, _, value = item.partition("=")
+        try:
+            result[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return result
+
+
+class _Bucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = clock.monotonic()
+
+    def take(self, now):
+        # max(): el cubo se crea al importar; si luego se cambia de reloj
+        # (VirtualClock) el instante puede quedar por detrás de `updated`
+        self.tokens = min(self.capacity, self.tokens + max(now - self.updated, 0) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def next_token_in(self):
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 0.05
+
+
+class Lane:
+    __slots__ = ("name", "priority", "connections", "bucket", "slots", "queued")
+
+    def __init__(self, name, priority, connections, rate):
+        self.name = name
+        self.priority = priority
+        self.connections = connections
+        self.bucket = _Bucket(rate)
+        self.slots = threading.BoundedSemaphore(connections)
+        self.queued = 0
+
+
+_lanes = {}
+_tokens_lock = threading.Lock()
+
+
+def _build():
+    shares = _parse_map(COINEX_LANE_SHARES)
+    connections = _parse_map(COINEX_LANE_CONNECTIONS)
+    total = sum(shares.get(name, 0) for name in LANES) or 1
+
+    for priority, name in enumerate(LANES):
+        _lanes[name] = Lane(
+            name,
+            priority,
+            max(int(connections.get(name, 4)), 1),
+            COINEX_RATE_LIMIT * shares.get(name, 0) / total
+        )
+
+
+_build()
+
+
+def get_lane(name):
+    return _lanes[name]
+
+
+def reset():
+    """Cubos llenos y al día con el reloj actual (benchmarks entre corridas)."""
+    with _tokens_lock:
+        for lane in _lanes.values():
+            lane.bucket = _Bucket(lane.bucket.rate)
+
+
+def total_connections():
+    """Conexiones de todos los carriles: tope de peticiones en vuelo."""
+    return sum(lane.connections for lane in _lanes.values())
+
+
+def _take_token(lane):
+    """Ficha propia o, si no hay, prestada de un carril de menor prioridad."""
+    with _tokens_lock:
+        now = clock.monotonic()
+
+        if lane.bucket.take(now):
+            return True, 0.0
+
+        for other in LANES[lane.priority + 1:]:
+            if _lanes[other].bucket.take(now):
+                metrics.incr(f"lane.{lane.name}.borrowed")
+                return True, 0.0
+
+        return False, lane.bucket.next_token_in()
+
+
+def _wait_slot(lane, deadline):
+    """
+    Conexión libre en el carril antes de `deadline`. Con el reloj real
+    es una espera bloqueante del semáforo; con uno virtual se sondea
+    durmiendo en ese reloj, para que fast_forward() vea el hilo dormido
+    y pueda avanzar el tiempo hasta que quien tiene la conexión la suelte.
+    """
+    if isinstance(clock.get_clock(), clock.RealClock):
+        return lane.slots.acquire(timeout=max(deadline - clock.monotonic(), 0))
+
+    while not lane.slots.acquire(blocking=False):
+        if clock.monotonic() >= deadline:
+            return False
+        clock.sleep(SLOT_POLL_SECONDS)
+    return True
+
+
+def acquire(name, timeout=COINEX_TIMEOUT):
+    """
+    Espera conexión y ficha en el carril. Devuelve el Lane (para
+    release) o None si no hubo hueco en `timeout` segundos.
+    """
+    lane = _lanes[name]
+    start = clock.monotonic()
+    deadline = start + timeout
+
+    with _tokens_lock:
+        lane.queued += 1
+        metrics.set_gauge(f"lane.{name}.queued", lane.queued)
+
+    try:
+        if not _wait_slot(lane, deadline):
+            metrics.incr(f"lane.{name}.timeouts")
+            return None
+
+        while True:
+            ok, retry_in = _take_token(lane)
+            if ok:
+                break
+
+            remaining = deadline - clock.monotonic()
+            if remaining <= 0:
+                lane.slots.release()
+                metrics.incr(f"lane.{name}.timeouts")
+                return None
+
+            clock.sleep(min(max(retry_in, 0.001), remaining))
+
+    finally:
+        with _tokens_lock:
+            lane.queued -= 1
+
+    metrics.record_latency(f"lane.{name}.wait", clock.monotonic() - start)
+    return lane
+
+
+def release(lane):
+    lane.slots.release()
@@ -0,0 +1,254 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from app import metrics
+from app.config import LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_RATE_LIMITS, LOG_SAMPLE_RATES
+
+
+# ======================================================
+# LOG ESTRUCTURADO NO BLOQUEANTE
+# ======================================================
+# Los hilos calientes solo encolan el registro (put_nowait); un hilo
+# aparte lo formatea (JSON o texto) y escribe en stdout. Si la cola
+# está llena el registro se descarta: el trading nunca espera al log.
+#
+#   log = get_logger("scanner")
+#   log.info("scan.tick", "🗂 Tick %d: escaneando %d pares", tick, n, pairs=n)
+#
+# Cada evento admite muestreo (sample=0.1 → 1 de cada 10) y límite
+# por segundo (rate=2); también por entorno en LOG_SAMPLE_RATES /
+# LOG_RATE_LIMITS ("evento=valor,evento=valor").
+
+CONTEXT_FIELDS = ("user_id", "symbol", "cycle_id")
+
+_context = threading.local()
+
+
+def bind(**fields):
+    """Campos de contexto del hilo actual (user_id, symbol, cycle_id...)."""
+    current = dict(getattr(_context, "fields", {}))
+    current.update(fields)
+    _context.fields = current
+
+
+@contextmanager
+def context(**fields):
+    previous = getattr(_context, "fields", {})
+    bind(**fields)
+    try:
+        yield
+    finally:
+        _context.fields = previous
+
+
+# ======================================================
+# MUESTREO Y LÍMITE POR EVENTO
+# ======================================================
+
+class _Limiter:
+    __slots__ = ("rate", "sample", "tokens", "updated", "seen", "suppressed", "lock")
+
+    def __init__(self, rate, sample):
+        self.rate = rate
+        self.sample = sample
+        self.tokens = rate or 0
+        self.updated = time.monotonic()
+        self.seen = 0
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Devuelve (emitir, suprimidos_desde_el_último)."""
+        with self.lock:
+            self.seen += 1
+
+            # Muestreo: el primero y luego 1 de cada 1/sample
+            if self.sample and self.sample < 1:
+                every = max(int(round(1 / self.sample)), 1)
+                if (self.seen - 1) % every:
+                    self.suppressed += 1
+                    return False, 0
+
+            if self.rate:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens < 1:
+                    self.suppressed += 1
+                    return False, 0
+                self.tokens -= 1
+
+            suppressed, self.suppressed = self.suppressed, 0
+            return True, suppressed
+
+
+def _parse_map(raw):
+    result = {}
+    for item in filter(None, (raw or "").split(",")):
+        name, _, value = item.partition("=")
+        try:
+            result[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return result
+
+
+_rate_overrides = _parse_map(LOG_RATE_LIMITS)
+_sample_overrides = _parse_map(LOG_SAMPLE_RATES)
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter(event, rate, sample):
+    limiter = _limiters.get(event)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(event)
+            if limiter is None:
+                limiter = _limiters[event] = _Limiter(
+                    _rate_overrides.get(event, rate),
+                    _sample_overrides.get(event, sample)
+                )
+    return limiter
+
+
+# ======================================================
+# FORMATO
+# ======================================================
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "msg": record.getMessage()
+        }
+        for name in CONTEXT_FIELDS:
+            entry[name] = None
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = record.getMessage()
+        suppressed = getattr(record, "fields", {}).get("suppressed")
+        if suppressed:
+            text += f" (+{suppressed} omitidos)"
+        return text
+
+
+class _DropQueueHandler(logging.handlers.QueueHandler):
+    """Encola sin bloquear; descarta y cuenta si la cola está llena."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.incr("log.dropped")
+
+    def prepare(self, record):
+        # El formateo (y el JSON) se hace en el hilo del listener
+        return record
+
+
+# ======================================================
+# LOGGER CON EVENTOS
+# ======================================================
+
+class EventLogger:
+    __slots__ = ("logger",)
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def log(self, level, event, msg, *args, sample=None, rate=None, exc_info=None, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+
+        if _listener is None:
+            setup()
+
+        suppressed = 0
+        if sample is not None or rate is not None or event in _rate_overrides or event in _sample_overrides:
+            allowed, suppressed = _limiter(event, rate, sample).allow()
+            if not allowed:
+                metrics.incr("log.suppressed")
+                return
+
+        ctx = getattr(_context, "fields", None)
+        if ctx:
+            fields = {**ctx, **fields}
+        if suppressed:
+            fields["suppressed"] = suppressed
+
+        self.logger.log(level, msg, *args, exc_info=exc_info,
+                        extra={"event": event, "fields": fields})
+
+    def debug(self, event, msg, *args, **kw):
+        self.log(logging.DEBUG, event, msg, *args, **kw)
+
+    def info(self, event, msg, *args, **kw):
+        self.log(logging.INFO, event, msg, *args, **kw)
+
+    def warning(self, event, msg, *args, **kw):
+        self.log(logging.WARNING, event, msg, *args, **kw)
+
+    def error(self, event, msg, *args, **kw):
+        self.log(logging.ERROR, event, msg, *args, **kw)
+
+
+# ======================================================
+# CONFIGURACIÓN (PEREZOSA, UNA VEZ)
+# ======================================================
+
+_listener = None
+_setup_lock = threading.Lock()
+_root = logging.getLogger("tradingx")
+_root.setLevel(LOG_LEVEL)
+
+
+def setup(stream=None):
+    """Arranca el hilo de escritura (al primer mensaje, no al importar)."""
+    global _listener
+
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _root.handlers[:] = [_DropQueueHandler(log_queue)]
+        _root.setLevel(LOG_LEVEL)
+        _root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+        _listener.start()
+        atexit.register(shutdown)
+
+
+def shutdown():
+    """Vacía la cola y detiene el hilo de escritura."""
+    global _listener
+
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def get_logger(name):
+    return EventLogger(_root.getChild(name))
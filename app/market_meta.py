@@ -0,0 +1,125 @@
+import threading
+from decimal import Decimal, ROUND_DOWN
+
+from app import clock
+from app.coinex_api import make_request
+from app.logger import get_logger
+from app.config import MARKET_META_TTL, MIN_ORDER_USDT
+
+
+# ======================================================
+# CACHÉ DE METADATOS DE MERCADO (PRECISIÓN, MÍNIMOS, FEES)
+# ======================================================
+# Una sola llamada a /spot/market/list por TTL alimenta la lista
+# de pares del scanner y la validación local de órdenes.
+
+_markets = {}
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+log = get_logger("markets")
+
+
+def _parse_market(m):
+    return {
+        "market": m.get("market") or m["name"],
+        "base_ccy": m.get("base_ccy"),
+        "quote_ccy": m.get("quote_ccy"),
+        "amount_precision": int(m.get("base_ccy_precision", 6)),
+        "price_precision": int(m.get("quote_ccy_precision", 6)),
+        "min_amount": float(m.get("min_amount") or 0),
+        "maker_fee_rate": float(m.get("maker_fee_rate") or 0),
+        "taker_fee_rate": float(m.get("taker_fee_rate") or 0)
+    }
+
+
+def refresh_markets():
+    """
+    Descarga la lista de mercados y reemplaza la caché.
+    Si CoinEx falla se conserva la caché anterior.
+    """
+    global _markets, _loaded_at
+
+    # Se necesita al validar entradas: no debe esperar detrás del escaneo
+    r = make_request("GET", "/spot/market/list", lane="entry")
+
+    if not r or r.get("code") != 0:
+        log.warning("markets.refresh_failed", "⚠️ No se pudo refrescar metadatos de mercados: %s", r, rate=1)
+        return _markets
+
+    markets = {}
+    for m in r["data"]:
+        try:
+            info = _parse_market(m)
+        except (KeyError, TypeError, ValueError):
+            continue
+        markets[info["market"]] = info
+
+    with _lock:
+        _markets = markets
+        _loaded_at = clock.now()
+
+    return markets
+
+
+def get_markets():
+    """Metadatos de todos los mercados, refrescados cada MARKET_META_TTL s."""
+    if not _markets or clock.now() - _loaded_at > MARKET_META_TTL:
+        return refresh_markets()
+    return _markets
+
+
+def get_market(symbol):
+    return get_markets().get(symbol)
+
+
+def reset():
+    """Olvida los mercados en caché (benchmarks entre corridas)."""
+    global _markets, _loaded_at
+
+    with _lock:
+        _markets = {}
+        _loaded_at = 0.0
+
+
+# ======================================================
+# CUANTIZAR Y VALIDAR ÓRDENES LOCALMENTE
+# ======================================================
+
+def _floor(value, precision):
+    step = Decimal(1).scaleb(-precision)
+    return float(Decimal(str(value)).quantize(step, rounding=ROUND_DOWN))
+
+
+def quantize_amount(symbol, amount):
+    """Trunca la cantidad a la precisión del mercado (nunca redondea hacia arriba)."""
+    info = get_market(symbol)
+    precision = info["amount_precision"] if info else 6
+    return _floor(amount, precision)
+
+
+def quantize_price(symbol, price):
+    info = get_market(symbol)
+    precision = info["price_precision"] if info else 6
+    return _floor(price, precision)
+
+
+def validate_order(symbol, amount, price):
+    """
+    Cuantiza y valida una orden antes de enviarla.
+    Devuelve (cantidad, None) o (0, motivo).
+    """
+    amount = quantize_amount(symbol, amount)
+
+    if amount <= 0:
+        return 0, "cantidad nula tras aplicar la precisión del mercado"
+
+    info = get_market(symbol)
+
+    if info and amount < info["min_amount"]:
+        return 0, f"cantidad {amount} < mínimo {info['min_amount']} de {symbol}"
+
+    if amount * price < MIN_ORDER_USDT:
+        return 0, f"nocional {amount * price:.4f} < mínimo {MIN_ORDER_USDT} USDT"
+
+    return amount, None
@@ -0,0 +1,75 @@
+import threading
+from collections import deque
+
+# ======================================================
+# MÉTRICAS EN MEMORIA (CONTADORES, GAUGES, LATENCIAS)
+# ======================================================
+# Todo es local al proceso y barato de actualizar desde hilos
+# calientes; nadie hace I/O aquí.
+
+# Muestras de latencia que se guardan por nombre
+LATENCY_SAMPLES = 1024
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_latencies = {}
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def record_latency(name, seconds):
+    with _lock:
+        samples = _latencies.get(name)
+        if samples is None:
+            samples = _latencies[name] = deque(maxlen=LATENCY_SAMPLES)
+        samples.append(seconds)
+
+
+def percentile(name, q, default=None):
+    """Percentil q (0-100) de las últimas latencias registradas."""
+    with _lock:
+        samples = _latencies.get(name)
+        if not samples:
+            return default
+        ordered = sorted(samples)
+
+    idx = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def snapshot():
+    """Copia consistente de todas las métricas."""
+    with _lock:
+        latencies = {name: sorted(s) for name, s in _latencies.items() if s}
+        data = {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+        }
+
+    data["latencies"] = {
+        name: {
+            "count": len(s),
+            "p50": s[len(s) // 2],
+            "p95": s[min(len(s) - 1, int(len(s) * 0.95))],
+            "p99": s[min(len(s) - 1, int(len(s) * 0.99))],
+        }
+        for name, s in latencies.items()
+    }
+    return data
+
+
+def reset():
+    """Borra todas las métricas (benchmarks entre corridas)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _latencies.clear()
@@ -0,0 +1,312 @@
+"""
+Búsqueda de parámetros del breakout sobre velas históricas locales.
+
+Uso:
+    python -m app.param_sweep --grid grid.json --data data/klines/ \
+        [--workers 8] [--horizon 60] [--fee 0.002] [--top 20] [--csv out.csv]
+
+grid.json: {"BREAKOUT_MIN_VOLUME": [10000, 15000], "TP_MIN": [0.02, 0.03], ...}
+Claves válidas: las de config (BREAKOUT_*, TP_MIN/TP_MAX, SL_MIN/SL_MAX).
+Como en open_trade, la salida usa TP_MIN como take-profit y SL_MAX
+como stop; TP_MAX y SL_MIN se aceptan pero no cambian el resultado.
+
+data/: un archivo por símbolo, *.json (respuesta kline de CoinEx o
+lista de velas) o *.csv (timestamp,open,close,high,low,volume).
+
+Las velas se cargan una vez en memoria compartida (solo lectura) y
+cada proceso del pool evalúa combinaciones sobre esa misma copia.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from app import config
+from app.klines import decode_klines, loads
+from app.strategy_breakout import breakout_strength, passes_breakout
+
+PARAM_KEYS = [
+    "BREAKOUT_MIN_VOLUME",
+    "BREAKOUT_CANDLE_BODY",
+    "BREAKOUT_STRENGTH_THRESHOLD",
+    "TP_MIN",
+    "TP_MAX",
+    "SL_MIN",
+    "SL_MAX",
+]
+
+# Columnas float64 en memoria compartida
+COLUMNS = ("timestamp", "close", "high", "low", "volume", "body_strength", "segment_end")
+
+
+# ======================================================
+# CARGA DE VELAS LOCALES
+# ======================================================
+
+def load_file(path):
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            rows = [r for r in csv.reader(f) if r and r[0][:1].isdigit()]
+        return decode_klines(rows)
+
+    with open(path, "rb") as f:
+        data = loads(f.read())
+
+    if isinstance(data, dict):
+        data = data.get("data", data)
+        if isinstance(data, dict):
+            data = data.get("klines", [])
+
+    return decode_klines(data)
+
+
+def load_dataset(directory):
+    """Devuelve {symbol: Klines} para cada archivo del directorio."""
+    dataset = {}
+
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith((".json", ".csv")):
+            continue
+        klines = load_file(os.path.join(directory, name))
+        if len(klines):
+            dataset[os.path.splitext(name)[0]] = klines
+
+    return dataset
+
+
+# ======================================================
+# MEMORIA COMPARTIDA
+# ======================================================
+
+def pack_shared(dataset, min_volume, min_body):
+    """
+    Copia las columnas de todos los símbolos a un único bloque de
+    memoria compartida. Devuelve (shm, n, candidates_shm, nc)
+    donde `candidates` son los índices de velas alcistas que pasan los
+    filtros más laxos del grid: solo esas pueden dar señal.
+    """
+    n = sum(len(k) for k in dataset.values())
+    shm = shared_memory.SharedMemory(create=True, size=max(n, 1) * 8 * len(COLUMNS))
+    cols = [shm.buf[i * n * 8:(i + 1) * n * 8].cast("d") for i in range(len(COLUMNS))]
+
+    candidates = array("q")
+    offset = 0
+
+    for k in dataset.values():
+        size = len(k)
+
+        for j in range(size):
+            i = offset + j
+            high, low = k.high[j], k.low[j]
+            total = high - low
+            body = abs(k.close[j] - k.open[j]) / total if total > 0 else 0.0
+
+            cols[0][i] = k.timestamp[j]
+            cols[1][i] = k.close[j]
+            cols[2][i] = high
+            cols[3][i] = low
+            cols[4][i] = k.volume[j]
+            cols[5][i] = body
+            cols[6][i] = offset + size
+
+            if k.close[j] > k.open[j] and k.volume[j] >= min_volume and body >= min_body:
+                candidates.append(i)
+
+        offset += size
+
+    for c in cols:
+        c.release()
+
+    cand_shm = shared_memory.SharedMemory(create=True, size=max(len(candidates), 1) * 8)
+    cand_view = cand_shm.buf[:len(candidates) * 8].cast("q")
+    cand_view[:] = candidates
+    cand_view.release()
+
+    return shm, n, cand_shm, len(candidates)
+
+
+_worker = {}
+
+
+def _init_worker(shm_name, n, cand_name, n_candidates, horizon, fee):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    cand_shm = shared_memory.SharedMemory(name=cand_name)
+
+    _worker["shm"] = shm
+    _worker["cand_shm"] = cand_shm
+    _worker["cols"] = {
+        name: shm.buf[i * n * 8:(i + 1) * n * 8].cast("d")
+        for i, name in enumerate(COLUMNS)
+    }
+    _worker["candidates"] = cand_shm.buf[:n_candidates * 8].cast("q")
+    _worker["horizon"] = horizon
+    _worker["fee"] = fee
+
+
+# ======================================================
+# EVALUAR UNA COMBINACIÓN
+# ======================================================
+
+def evaluate(params):
+    cols = _worker["cols"]
+    ts, close, high, low = cols["timestamp"], cols["close"], cols["high"], cols["low"]
+    volume, body = cols["volume"], cols["body_strength"]
+    ends = cols["segment_end"]
+    horizon = _worker["horizon"]
+    cost = 2 * _worker["fee"]
+
+    min_volume = params["BREAKOUT_MIN_VOLUME"]
+    min_body = params["BREAKOUT_CANDLE_BODY"]
+    threshold = params["BREAKOUT_STRENGTH_THRESHOLD"]
+    tp = params["TP_MIN"]
+    sl = params["SL_MAX"]
+
+    trades = []
+    busy_until = -1
+
+    for i in _worker["candidates"]:
+        # Una posición a la vez por símbolo
+        if i <= busy_until:
+            continue
+
+        strength = breakout_strength(body[i], volume[i], min_volume)
+        if not passes_breakout(body[i], volume[i], True, strength, min_volume, min_body, threshold):
+            continue
+
+        entry = close[i]
+        tp_price = entry * (1 + tp)
+        sl_price = entry * (1 - sl)
+        last = min(i + horizon, int(ends[i]) - 1)
+
+        if last <= i:
+            continue
+
+        ret = close[last] / entry - 1
+        exit_idx = last
+
+        for j in range(i + 1, last + 1):
+            # Conservador: si la vela toca ambos niveles, cuenta el SL
+            if low[j] <= sl_price:
+                ret, exit_idx = -sl, j
+                break
+            if high[j] >= tp_price:
+                ret, exit_idx = tp, j
+                break
+
+        trades.append((ts[i], ret - cost))
+        busy_until = exit_idx
+
+    trades.sort()
+
+    pnl = 0.0
+    peak = 0.0
+    max_dd = 0.0
+    wins = 0
+
+    for _, ret in trades:
+        pnl += ret
+        wins += ret > 0
+        peak = max(peak, pnl)
+        max_dd = max(max_dd, peak - pnl)
+
+    return {
+        **params,
+        "trades": len(trades),
+        "winrate": round(wins / len(trades) * 100, 2) if trades else 0.0,
+        "pnl_pct": round(pnl * 100, 4),
+        "max_dd_pct": round(max_dd * 100, 4),
+    }
+
+
+# ======================================================
+# GRID COMPLETO
+# ======================================================
+
+def expand_grid(grid):
+    unknown = set(grid) - set(PARAM_KEYS)
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos en el grid: {sorted(unknown)}")
+
+    values = [
+        grid.get(key, [getattr(config, key)])
+        for key in PARAM_KEYS
+    ]
+
+    return [dict(zip(PARAM_KEYS, combo)) for combo in itertools.product(*values)]
+
+
+def run_sweep(grid, dataset, workers=None, horizon=60, fee=0.0):
+    combos = expand_grid(grid)
+
+    if not dataset or not combos:
+        return []
+
+    min_volume = min(c["BREAKOUT_MIN_VOLUME"] for c in combos)
+    min_body = min(c["BREAKOUT_CANDLE_BODY"] for c in combos)
+
+    shm, n, cand_shm, n_candidates = pack_shared(dataset, min_volume, min_body)
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shm.name, n, cand_shm.name, n_candidates, horizon, fee)
+        ) as pool:
+            chunksize = max(1, len(combos) // ((workers or os.cpu_count() or 1) * 4))
+            results = list(pool.map(evaluate, combos, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+        cand_shm.close()
+        cand_shm.unlink()
+
+    results.sort(key=lambda r: (r["pnl_pct"], -r["max_dd_pct"]), reverse=True)
+    return results
+
+
+def print_table(results, top):
+    headers = PARAM_KEYS + ["trades", "winrate", "pnl_pct", "max_dd_pct"]
+    short = ["MIN_VOL", "BODY", "THRESH", "TP_MIN", "TP_MAX", "SL_MIN", "SL_MAX",
+             "trades", "win%", "pnl%", "maxDD%"]
+
+    print("#    " + "".join(f"{h:>10}" for h in short))
+    for rank, row in enumerate(results[:top], 1):
+        print(f"{rank:<5}" + "".join(f"{row[h]:>10g}" for h in headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Búsqueda de parámetros del breakout")
+    parser.add_argument("--grid", required=True, help="JSON con listas de valores por parámetro")
+    parser.add_argument("--data", required=True, help="Directorio con velas por símbolo")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--horizon", type=int, default=60, help="Velas máximas por operación")
+    parser.add_argument("--fee", type=float, default=0.0, help="Comisión por lado (p. ej. 0.002)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--csv", default=None, help="Guardar el ranking completo en CSV")
+    args = parser.parse_args()
+
+    with open(args.grid) as f:
+        grid = json.load(f)
+
+    dataset = load_dataset(args.data)
+    total = sum(len(k) for k in dataset.values())
+    print(f"📂 {len(dataset)} símbolos | {total} velas | {len(expand_grid(grid))} combinaciones")
+
+    results = run_sweep(grid, dataset, args.workers, args.horizon, args.fee)
+    print_table(results, args.top)
+
+    if args.csv and results:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"💾 Ranking guardado en {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
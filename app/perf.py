@@ -0,0 +1,162 @@
+import resource
+import sys
+import threading
+import time
+
+from app import metrics, trading_engine, exposure
+from app.circuit_breaker import breaker_states
+from app.lanes import LANES
+from app.config import PERF_SNAPSHOT_TTL
+
+
+# ======================================================
+# ESTADO DEL PROCESO PARA /perf
+# ======================================================
+# Solo lee métricas en memoria y registros del propio proceso: nunca
+# llama al exchange ni a Mongo. La foto se reconstruye como mucho
+# cada PERF_SNAPSHOT_TTL segundos, pida quien la pida.
+
+_STARTED = time.monotonic()
+
+_lock = threading.Lock()
+_snapshot = None
+_snapshot_at = 0.0
+
+# Contadores de la foto anterior, para tasas por ventana
+_previous = ({}, _STARTED)
+
+
+def rss_mb():
+    """RSS actual (Linux /proc); si no, el máximo de getrusage."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _collect():
+    global _previous
+
+    data = metrics.snapshot()
+    counters, gauges, latencies = data["counters"], data["gauges"], data["latencies"]
+    now = time.monotonic()
+
+    prev_counters, prev_at = _previous
+    _previous = (counters, now)
+    window = max(now - prev_at, 1e-9)
+
+    def delta(name):
+        return counters.get(name, 0) - prev_counters.get(name, 0)
+
+    requests = delta("coinex.requests")
+
+    # Latencias por endpoint: "<transporte>/spot/..." (el resto usa puntos)
+    endpoints = {
+        name: (lat["p50"], lat["p99"], lat["count"])
+        for name, lat in latencies.items() if "/" in name
+    }
+
+    total, positions, top = exposure.totals()
+
+    monitors, users_with_positions = trading_engine.monitor_stats()
+
+    open_breakers = sorted(name for name, state in breaker_states().items() if state != "closed")
+
+    return {
+        "uptime": now - _STARTED,
+        "window": window,
+        "tick_lag": gauges.get("scheduler.tick_lag"),
+        "tick_lag_p99": latencies.get("scheduler.tick_lag", {}).get("p99"),
+        "overruns": counters.get("scheduler.overruns", 0),
+        "user_overruns": counters.get("scheduler.overrun_users", 0),
+        "scan_duration": gauges.get("scan.duration"),
+        "scan_symbols": gauges.get("scan.symbols"),
+        "scan_pairs": gauges.get("scan.pairs"),
+        "endpoints": endpoints,
+        "monitors": monitors,
+        "users_with_positions": users_with_positions,
+        "exposure_total": total,
+        "exposure_positions": positions,
+        "exposure_top": top,
+        "requests_per_s": requests / window,
+        "error_rate": delta("coinex.errors") / requests if requests else 0.0,
+        "breaker_rejects": delta("coinex.breaker_rejects"),
+        "open_breakers": open_breakers,
+        "lane_timeouts": sum(delta(f"lane.{lane}.timeouts") for lane in LANES),
+        "cycle_errors": delta("scheduler.user_errors"),
+        "log_dropped": counters.get("log.dropped", 0),
+        "threads": threading.active_count(),
+        "rss_mb": rss_mb()
+    }
+
+
+def get_snapshot(max_age=PERF_SNAPSHOT_TTL):
+    global _snapshot, _snapshot_at
+
+    with _lock:
+        if _snapshot is None or time.monotonic() - _snapshot_at > max_age:
+            _snapshot = _collect()
+            _snapshot_at = time.monotonic()
+        return _snapshot, time.monotonic() - _snapshot_at
+
+
+# ======================================================
+# TEXTO PARA TELEGRAM
+# ======================================================
+
+def _ms(seconds):
+    if seconds is None:
+        return "—"
+    ms = seconds * 1000
+    return f"{ms:.1f} ms" if ms < 10 else f"{ms:.0f} ms"
+
+
+def _names(names, limit):
+    if not names:
+        return ""
+    return " (" + ", ".join(names[:limit]) + (", …)" if len(names) > limit else ")")
+
+
+def render(snapshot, age=0.0, max_endpoints=12, max_breakers=3):
+    s = snapshot
+    lines = [
+        f"⏱ Uptime: {s['uptime'] / 3600:.1f} h | foto de hace {age:.0f} s",
+        "",
+        "🗓 Scheduler",
+        f"  lag tick: {_ms(s['tick_lag'])} (p99 {_ms(s['tick_lag_p99'])}) | overruns: {s['overruns']}",
+        f"  usuarios saltados (ciclo anterior en curso): {s['user_overruns']}",
+        f"  último escaneo: {_ms(s['scan_duration'])} | "
+        f"{s['scan_symbols'] if s['scan_symbols'] is not None else '—'}/"
+        f"{s['scan_pairs'] if s['scan_pairs'] is not None else '—'} símbolos",
+        "",
+        f"📡 CoinEx ({s['requests_per_s']:.1f} req/s en {s['window']:.0f} s)",
+    ]
+
+    ranked = sorted(s["endpoints"].items(), key=lambda e: e[1][1], reverse=True)
+    for name, (p50, p99, count) in ranked[:max_endpoints]:
+        lines.append(f"  {name}: p50 {_ms(p50)} | p99 {_ms(p99)} | n={count}")
+    if not ranked:
+        lines.append("  sin peticiones registradas")
+
+    lines += [
+        "",
+        "⚠️ Errores (ventana)",
+        f"  CoinEx: {s['error_rate'] * 100:.1f}% | breaker: {s['breaker_rejects']} | "
+        f"carriles: {s['lane_timeouts']} | ciclos: {s['cycle_errors']}",
+        f"  breakers no cerrados: {len(s['open_breakers'])}" + _names(s["open_breakers"], max_breakers),
+        f"  logs descartados: {s['log_dropped']}",
+        "",
+        "📂 Posiciones",
+        f"  monitores abiertos: {s['monitors']} | usuarios con posición: {s['users_with_positions']}",
+        f"  exposición real: {s['exposure_total']:.2f} USDT en {s['exposure_positions']} posiciones"
+        + (f" | mayor: {s['exposure_top'][0]} {s['exposure_top'][1]:.2f}" if s["exposure_top"][0] else ""),
+        "",
+        f"🧠 Proceso: {s['rss_mb']:.0f} MB RSS | {s['threads']} hilos",
+    ]
+    return "\n".join(lines)
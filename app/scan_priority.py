@@ -0,0 +1,156 @@
+import threading
+
+from app.config import (
+    BREAKOUT_MIN_VOLUME,
+    BREAKOUT_STRENGTH_THRESHOLD,
+    SCAN_REQUEST_BUDGET,
+    SCAN_HOT_SIZE,
+    SCAN_WARM_SIZE,
+    SCAN_WARM_EVERY,
+    SCAN_COLD_EVERY
+)
+
+# Peso de cada observación nueva en la prioridad (EMA)
+PRIORITY_ALPHA = 0.3
+
+# Rango de vela (high-low)/close que se considera "muy volátil"
+VOLATILITY_REF = 0.02
+
+
+# ======================================================
+# PRIORIDAD DE ESCANEO POR SÍMBOLO
+# ======================================================
+
+class ScanPriority:
+    """
+    Planificador de escaneo por niveles:
+    - HOT  → cada tick
+    - WARM → cada `warm_every` ticks
+    - COLD → cada `cold_every` ticks
+    El nivel sale del ranking de prioridad; la prioridad se actualiza
+    de forma incremental (EMA) tras cada evaluación. Nunca se planifican
+    más de `budget` peticiones de velas por tick.
+    """
+
+    def __init__(
+        self,
+        budget=SCAN_REQUEST_BUDGET,
+        hot_size=SCAN_HOT_SIZE,
+        warm_size=SCAN_WARM_SIZE,
+        warm_every=SCAN_WARM_EVERY,
+        cold_every=SCAN_COLD_EVERY,
+        alpha=PRIORITY_ALPHA
+    ):
+        self.budget = budget
+        self.hot_size = hot_size
+        self.warm_size = warm_size
+        self.warm_every = warm_every
+        self.cold_every = cold_every
+        self.alpha = alpha
+
+        # symbol -> [prioridad, último tick escaneado]
+        self._state = {}
+        self._tick = 0
+        self._plan_tick = None
+        self._plan = []
+        self._lock = threading.Lock()
+
+    @property
+    def tick(self):
+        return self._tick
+
+    def advance_tick(self):
+        with self._lock:
+            self._tick += 1
+            return self._tick
+
+    def reset(self):
+        """Olvida prioridades y ticks (benchmarks entre corridas)."""
+        with self._lock:
+            self._state.clear()
+            self._tick = 0
+            self._plan_tick = None
+            self._plan = []
+
+    def seed(self, symbol, priority):
+        """Prioridad inicial (p. ej. desde el ticker) para símbolos nuevos."""
+        with self._lock:
+            if symbol not in self._state:
+                self._state[symbol] = [priority, None]
+
+    def update(self, symbol, volume, volatility, near_miss):
+        """
+        Mezcla una evaluación nueva en la prioridad del símbolo.
+        volume: volumen de la última vela
+        volatility: (high - low) / close
+        near_miss: fuerza / umbral de breakout (1.0 = señal)
+        """
+        observed = (
+            0.4 * min(volume / BREAKOUT_MIN_VOLUME, 2) / 2 +
+            0.3 * min(volatility / VOLATILITY_REF, 1) +
+            0.3 * min(near_miss, 1)
+        )
+
+        with self._lock:
+            state = self._state.setdefault(symbol, [observed, None])
+            state[0] += self.alpha * (observed - state[0])
+
+    def priority(self, symbol):
+        state = self._state.get(symbol)
+        return state[0] if state else 0.0
+
+    def plan(self, candidates):
+        """
+        Devuelve los símbolos a escanear en el tick actual.
+        Se calcula una vez por tick: todos los usuarios del mismo
+        ciclo reciben el mismo plan.
+        """
+        with self._lock:
+            if self._plan_tick == self._tick:
+                return list(self._plan)
+
+            tick = self._tick
+            ranked = sorted(
+                candidates,
+                key=lambda s: self._state.get(s, (0.0,))[0],
+                reverse=True
+            )
+
+            due = []
+            for rank, symbol in enumerate(ranked):
+                state = self._state.setdefault(symbol, [0.0, None])
+                last = state[1]
+
+                if rank < self.hot_size:
+                    every = 1
+                elif rank < self.hot_size + self.warm_size:
+                    every = self.warm_every
+                else:
+                    every = self.cold_every
+
+                if last is None:
+                    overdue = float("inf")
+                else:
+                    overdue = (tick - last) / every
+                    if overdue < 1:
+                        continue
+
+                due.append((overdue, state[0], symbol))
+
+            due.sort(reverse=True)
+            selected = [symbol for _, _, symbol in due[:self.budget]]
+
+            for symbol in selected:
+                self._state[symbol][1] = tick
+
+            self._plan_tick = tick
+            self._plan = selected
+            return list(selected)
+
+
+# Instancia compartida por scanner y scheduler
+scan_priority = ScanPriority()
+
+
+def near_miss_score(strength):
+    return strength / BREAKOUT_STRENGTH_THRESHOLD if BREAKOUT_STRENGTH_THRESHOLD else 0.0
@@ -1,6 +1,23 @@
-from app.coinex_api import get_spot_pairs, get_candles
+import threading
+
+from app import clock, metrics
+from app.coinex_api import get_candles, get_tickers
+from app.logger import get_logger
+from app.market_meta import get_markets
 from app.strategy_breakout import get_trade_signal
-from app.config import MAX_ACTIVE_PAIRS
+from app.scan_priority import scan_priority, near_miss_score
+from app.config import (
+    MAX_ACTIVE_PAIRS,
+    PRESCREEN_TOP_K,
+    PRESCREEN_MIN_QUOTE_VOLUME,
+    SCAN_SHARE_TTL
+)
+
+log = get_logger("scanner")
+
+# Último escaneo: (tick, instante, oportunidades)
+_last_scan = (None, 0.0, [])
+_scan_lock = threading.Lock()
 
 
 # ======================================================
@@ -10,48 +27,103 @@ from app.config import MAX_ACTIVE_PAIRS
 def fetch_pairs():
     """
     Obtiene pares Spot del endpoint oficial CoinEx V2.
-    Luego filtra pares en USDT y pares que tengan velas activas.
+    Luego filtra pares en USDT y pre-selecciona los más activos
+    con el ticker masivo (fallback: pares que tengan velas activas).
     """
 
-    raw = get_spot_pairs()
+    # Lista de mercados desde la caché de metadatos (1 petición por TTL)
+    all_pairs = list(get_markets())
 
-    if not raw:
-        print("❌ No se pudo obtener la lista de mercados desde CoinEx.")
+    if not all_pairs:
+        log.error("scan.no_markets", "❌ No se pudo obtener la lista de mercados desde CoinEx.", rate=1)
         return []
 
-    # CoinEx V2 devuelve:  [{ "name": "BTCUSDT", ... }, ... ]
-    try:
-        all_pairs = [m["name"] for m in raw]
-    except:
-        all_pairs = raw
-
     # Filtrar USDT
     usdt_pairs = [p for p in all_pairs if p.endswith("USDT")]
 
+    # Pre-filtro barato: 1 llamada al ticker masivo en lugar de
+    # pedir velas de cada mercado.
+    tickers = get_tickers()
+
+    if tickers:
+        candidates = prescreen_pairs(usdt_pairs, tickers)
+
+        # Prioridad inicial de símbolos nuevos según su puesto
+        for rank, symbol in enumerate(candidates):
+            scan_priority.seed(symbol, 1 - rank / len(candidates))
+
+        log.debug("scan.prescreen", "🔍 Pre-filtro ticker: %d/%d pares USDT",
+                  len(candidates), len(usdt_pairs), candidates=len(candidates), pairs=len(usdt_pairs))
+        return candidates
+
+    log.warning("scan.no_tickers", "⚠️ Ticker masivo no disponible, validando pares con velas...", rate=1)
+
     valid_pairs = []
 
     for symbol in usdt_pairs:
         try:
             candles = get_candles(symbol, timeframe="1min", limit=2)
 
-            # CoinEx devuelve velas → [timestamp, open, close, high, low, volume]
-            if isinstance(candles, list) and len(candles) > 0:
+            # get_candles devuelve Klines (arrays tipados)
+            if len(candles) > 0:
                 valid_pairs.append(symbol)
 
         except Exception as e:
-            print(f"⚠️ Error leyendo velas de {symbol}: {e}")
+            log.warning("scan.pair_error", "⚠️ Error leyendo velas de %s: %s", symbol, e, rate=5, symbol=symbol)
 
-    print(f"🔍 Pares USDT válidos con velas activas: {len(valid_pairs)}")
+    log.info("scan.valid_pairs", "🔍 Pares USDT válidos con velas activas: %d", len(valid_pairs), pairs=len(valid_pairs))
     return valid_pairs
 
 
+# ======================================================
+# PRE-FILTRO POR VOLUMEN 24H Y CAMBIO RECIENTE
+# ======================================================
+
+def prescreen_pairs(pairs, tickers, top_k=PRESCREEN_TOP_K):
+    """
+    Descarta mercados muertos y ordena el resto por:
+    - volumen 24h en USDT (60%)
+    - cambio de precio reciente (40%)
+    Ambos como percentil, para que ninguno domine por escala.
+    Devuelve los top_k símbolos.
+    """
+
+    rows = []
+
+    for symbol in pairs:
+        t = tickers.get(symbol)
+
+        if not t or t["last"] <= 0 or t["value"] < PRESCREEN_MIN_QUOTE_VOLUME:
+            continue
+
+        change = (t["last"] - t["open"]) / t["open"] if t["open"] > 0 else 0.0
+        rows.append((symbol, t["value"], change))
+
+    if not rows:
+        return []
+
+    n = len(rows)
+    score = {symbol: 0.0 for symbol, _, _ in rows}
+
+    for rank, row in enumerate(sorted(rows, key=lambda r: r[1])):
+        score[row[0]] += 0.6 * rank / max(n - 1, 1)
+
+    for rank, row in enumerate(sorted(rows, key=lambda r: r[2])):
+        score[row[0]] += 0.4 * rank / max(n - 1, 1)
+
+    ranked = sorted(score, key=score.get, reverse=True)
+
+    return ranked[:top_k]
+
+
 # ======================================================
 # ANALIZAR TODOS LOS PARES
 # ======================================================
 
 def evaluate_pairs(pairs):
     """
-    Evalúa cada par para ver si hay oportunidades (breakout).
+    Evalúa cada par para ver si hay oportunidades (breakout)
+    y actualiza su prioridad de escaneo con cada vela nueva.
     """
 
     opportunities = []
@@ -60,6 +132,17 @@ def evaluate_pairs(pairs):
         try:
             signal = get_trade_signal(symbol)
 
+            # Una vela cuenta una sola vez en la EMA de prioridad: en los
+            # aciertos del memo llegan las métricas de la vela ya contada
+            candle = signal.get("metrics")
+            if candle and signal.get("fresh"):
+                scan_priority.update(
+                    symbol,
+                    candle["volume"],
+                    candle["volatility"],
+                    near_miss_score(candle["strength"])
+                )
+
             if signal["signal"]:
                 opportunities.append({
                     "symbol": symbol,
@@ -68,7 +151,7 @@ def evaluate_pairs(pairs):
                 })
 
         except Exception as e:
-            print(f"⚠️ Error analizando {symbol}: {e}")
+            log.warning("scan.eval_error", "⚠️ Error analizando %s: %s", symbol, e, rate=5, symbol=symbol)
 
     return opportunities
 
@@ -85,7 +168,7 @@ def select_best_pairs(opportunities):
 
     best = sorted_ops[:MAX_ACTIVE_PAIRS]
 
-    print(f"⭐ Mejores pares seleccionados: {[p['symbol'] for p in best]}")
+    log.debug("scan.best", "⭐ Mejores pares seleccionados: %s", [p["symbol"] for p in best])
     return best
 
 
@@ -94,21 +177,60 @@ def select_best_pairs(opportunities):
 # ======================================================
 
 def scan_market():
-    print("🔎 Escaneando mercado Spot CoinEx...")
+    """
+    Un escaneo por tick compartido por todos los usuarios: el primer
+    hilo escanea y el resto espera y recibe las mismas oportunidades
+    (una vela con señal solo se evalúa una vez, ver eval_memo).
+    """
+    global _last_scan
+
+    with _scan_lock:
+        tick, scanned_at, best = _last_scan
+
+        if tick == scan_priority.tick and clock.monotonic() - scanned_at < SCAN_SHARE_TTL:
+            return list(best)
+
+        best = _scan_market()
+        _last_scan = (scan_priority.tick, clock.monotonic(), best)
+        return list(best)
+
+
+def reset():
+    """Olvida el último escaneo compartido (benchmarks entre corridas)."""
+    global _last_scan
+    with _scan_lock:
+        _last_scan = (None, 0.0, [])
+
+
+def _scan_market():
+    log.debug("scan.start", "🔎 Escaneando mercado Spot CoinEx...")
 
     pairs = fetch_pairs()
 
     if not pairs:
-        print("❌ No hay pares disponibles.")
+        log.warning("scan.no_pairs", "❌ No hay pares disponibles.", rate=1)
         return []
 
-    opportunities = evaluate_pairs(pairs)
+    # Solo los símbolos que tocan en este tick (HOT/WARM/COLD)
+    due = scan_priority.plan(pairs)
+    log.debug("scan.tick", "🗂 Tick %d: escaneando %d/%d pares",
+              scan_priority.tick, len(due), len(pairs), due=len(due), pairs=len(pairs))
+
+    started = clock.monotonic()
+    opportunities = evaluate_pairs(due)
+    elapsed = clock.monotonic() - started
+
+    # Para /perf: duración y tamaño del último escaneo
+    metrics.record_latency("scan.duration", elapsed)
+    metrics.set_gauge("scan.duration", elapsed)
+    metrics.set_gauge("scan.symbols", len(due))
+    metrics.set_gauge("scan.pairs", len(pairs))
 
     if not opportunities:
-        print("⚪ No se detectaron oportunidades en este ciclo.")
+        log.debug("scan.none", "⚪ No se detectaron oportunidades en este ciclo.")
         return []
 
     best = select_best_pairs(opportunities)
 
-    print(f"📈 Oportunidades finales: {[x['symbol'] for x in best]}")
+    log.info("scan.opportunities", "📈 Oportunidades finales: %s", [x["symbol"] for x in best])
     return best
@@ -2,11 +2,23 @@ import time
 import threading
 
 from app.database import (
-    users_col,
+    get_users_col,
     user_is_ready
 )
 
 from app.trading_engine import trading_cycle
+from app.scan_priority import scan_priority
+from app.tick_clock import TickClock
+from app.logger import get_logger, bind
+from app import metrics
+from app.config import (
+    SCAN_INTERVAL,
+    SCAN_ALIGN_TO_CANDLE,
+    SCAN_CANDLE_SECONDS,
+    SCAN_CANDLE_OFFSET_MS
+)
+
+log = get_logger("scheduler")
 
 
 # ======================================================
@@ -35,32 +47,35 @@ def is_thread_running(user_id):
 # EJECUTAR UN CICLO DE TRADING PARA UN USUARIO
 # ======================================================
 
-def run_trading_for_user(user_id):
+def run_trading_for_user(user_id, cycle_id=None):
     """
     Ejecuta 1 ciclo completo:
     - Verifica si el usuario está listo
     - Ejecuta trading_cycle()
     - Libera el hilo al terminar
     """
+    bind(user_id=user_id, cycle_id=cycle_id)
 
     try:
         if not user_is_ready(user_id):
-            print(f"⚠️ Usuario {user_id} NO está listo. Cancelando ciclo…")
+            log.warning("user.not_ready", "⚠️ Usuario %s NO está listo. Cancelando ciclo…", user_id)
             active_threads.pop(user_id, None)
             return
 
-        print(f"🚀 Ejecutando TradingX para usuario: {user_id}")
+        log.debug("user.cycle_start", "🚀 Ejecutando TradingX para usuario: %s", user_id)
 
         result = trading_cycle(user_id)
 
-        print(f"📊 Resultado final para {user_id}: {result}")
+        log.debug("user.cycle_end", "📊 Resultado final para %s: %s", user_id, result)
 
     except Exception as e:
-        print(f"❌ Error ejecutando trading para {user_id}: {e}")
+        metrics.incr("scheduler.user_errors")
+        log.error("user.cycle_error", "❌ Error ejecutando trading para %s: %s", user_id, e, exc_info=True)
 
     finally:
         # Siempre liberar bandera
         active_threads.pop(user_id, None)
+        metrics.incr("scheduler.user_cycles")
 
 
 # ======================================================
@@ -71,7 +86,7 @@ def scan_active_users():
     """
     Obtiene los usuarios con trading activo.
     """
-    active_users = users_col.find({"status": "active"})
+    active_users = get_users_col().find({"status": "active"})
     return [u["user_id"] for u in active_users]
 
 
@@ -79,22 +94,66 @@ def scan_active_users():
 # CICLO PRINCIPAL DEL SCHEDULER
 # ======================================================
 
-def scheduler_loop(interval_seconds=60):
+def build_tick_clock(interval_seconds=None):
+    """
+    Reloj del scheduler:
+    - intervalo explícito → cada interval_seconds
+    - SCAN_ALIGN_TO_CANDLE → cierre de vela + SCAN_CANDLE_OFFSET_MS
+    - si no → cada SCAN_INTERVAL
+    """
+    if interval_seconds is not None:
+        return TickClock(interval_seconds)
+
+    if SCAN_ALIGN_TO_CANDLE:
+        return TickClock(
+            SCAN_CANDLE_SECONDS,
+            offset=SCAN_CANDLE_OFFSET_MS / 1000,
+            align=True
+        )
+
+    return TickClock(SCAN_INTERVAL)
+
+
+def scheduler_loop(interval_seconds=None, stop_event=None):
     """
-    Cada X segundos:
+    En cada tick (sin deriva, ver TickClock):
     - Escanea usuarios activos
     - Lanza hilos si no están corriendo
+    - Cuenta como overrun a los usuarios cuyo ciclo anterior sigue
+      en marcha (el trabajo largo es trading_cycle, no este bucle)
+    Termina cuando se activa stop_event (si se pasa).
     """
-    print(f"⏱ Scheduler iniciado | Intervalo: {interval_seconds}s")
+    clock = build_tick_clock(interval_seconds)
+
+    if clock.align:
+        log.info(
+            "scheduler.start", "⏱ Scheduler iniciado | Cierre de vela %ds + %dms",
+            int(clock.period), int(clock.offset * 1000)
+        )
+    else:
+        log.info("scheduler.start", "⏱ Scheduler iniciado | Intervalo: %gs", clock.period)
+
+    while not (stop_event and stop_event.is_set()):
+        clock.wait(stop_event)
+
+        if stop_event and stop_event.is_set():
+            break
+
+        cycle_start = time.monotonic()
 
-    while True:
         try:
+            # Nuevo tick de escaneo (niveles HOT/WARM/COLD)
+            cycle_id = scan_priority.advance_tick()
+            bind(cycle_id=cycle_id)
+
             active_users = scan_active_users()
 
             if not active_users:
-                print("⚪ No hay usuarios activos.")
+                log.debug("scheduler.no_users", "⚪ No hay usuarios activos.")
             else:
-                print(f"🔎 Usuarios activos: {active_users}")
+                log.info("scheduler.tick", "🔎 Usuarios activos: %d", len(active_users), users=len(active_users))
+
+            overrun_users = []
 
             for user_id in active_users:
 
@@ -102,23 +161,33 @@ def scheduler_loop(interval_seconds=60):
                 if not user_is_ready(user_id):
                     continue
 
-                # Prevenir ejecuciones duplicadas
+                # Prevenir ejecuciones duplicadas: el ciclo del tick
+                # anterior no terminó a tiempo
                 if is_thread_running(user_id):
+                    overrun_users.append(user_id)
                     continue
 
                 # Crear hilo nuevo
                 th = threading.Thread(
                     target=run_trading_for_user,
-                    args=(user_id,),
+                    args=(user_id, cycle_id),
                     daemon=True
                 )
                 active_threads[user_id] = th
                 th.start()
 
+            if overrun_users:
+                metrics.incr("scheduler.overrun_users", len(overrun_users))
+                log.warning(
+                    "scheduler.user_overrun", "⚠️ %d usuario(s) con el ciclo anterior aún en curso, se saltan: %s",
+                    len(overrun_users), overrun_users[:10], users=len(overrun_users)
+                )
+
         except Exception as e:
-            print(f"❌ Error dentro del Scheduler: {e}")
+            log.error("scheduler.error", "❌ Error dentro del Scheduler: %s", e, exc_info=True)
 
-        time.sleep(interval_seconds)
+        metrics.record_latency("scheduler.cycle", time.monotonic() - cycle_start)
+        metrics.incr("scheduler.cycles")
 
 
 # ======================================================
@@ -129,6 +198,6 @@ def start_scheduler():
     """
     Inicia el scheduler en un hilo separado del bot Telegram.
     """
-    t = threading.Thread(target=scheduler_loop, args=(60,), daemon=True)
+    t = threading.Thread(target=scheduler_loop, daemon=True)
     t.start()
-    print("✅ Scheduler automático iniciado en segundo plano.")
+    log.info("scheduler.started", "✅ Scheduler automático iniciado en segundo plano.")
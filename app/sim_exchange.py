@@ -0,0 +1,820 @@
+"""
+Exchange simulado con la API de CoinEx V2 que usa coinex_api.
+
+Sirve para paper trading, pruebas de carga y benchmarks sin dinero
+real. Se usa en proceso (SimTransport) o como servidor HTTP local:
+
+    python -m app.sim_exchange --port 8765 --symbols BTCUSDT,ETHUSDT \
+        [--seed 1] [--replay DIR] [--latency 0.01,0.05] \
+        [--error-rate 0.01] [--rate-limit 50] [--accounts accounts.json]
+
+accounts.json: [{"api_key": "...", "secret": "...", "balance": 1000}, ...]
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from app import clock
+from app.klines import TIMEFRAME_SECONDS
+
+
+# ======================================================
+# FUENTES DE PRECIO
+# ======================================================
+
+class _Series:
+    __slots__ = ("price", "closed", "current", "last_time")
+
+    def __init__(self, price, now, maxlen):
+        self.price = price
+        self.closed = deque(maxlen=maxlen)
+        minute = int(now // 60) * 60
+        self.current = [minute * 1000, price, price, price, price, 0.0]
+        self.last_time = now
+
+
+class SyntheticFeed:
+    """
+    Camino aleatorio geométrico por símbolo, reproducible con `seed`.
+    `volatility` es la desviación por minuto; se generan pasos de
+    `step_seconds` y se agregan en velas de 1 minuto.
+    """
+
+    def __init__(self, symbols, seed=0, start_price=100.0, volatility=0.002,
+                 step_seconds=1.0, volume=20000.0, history=1440, start=None):
+        self.rng = random.Random(seed)
+        self.volatility = volatility
+        self.step = step_seconds
+        self.volume = volume
+        self.history = history
+        self.start_price = start_price
+        self.series = {}
+        self.lock = threading.Lock()
+
+        # start en el pasado → el primer advance() genera ese historial
+        for symbol in symbols:
+            self.add_symbol(symbol, now=start)
+
+    def add_symbol(self, symbol, price=None, now=None):
+        now = clock.now() if now is None else now
+        price = price or self.start_price * math.exp(self.rng.gauss(0, 0.5))
+        self.series[symbol] = _Series(price, now, self.history)
+
+    def symbols(self):
+        return list(self.series)
+
+    def advance(self, now):
+        sigma = self.volatility * math.sqrt(self.step / 60)
+        step_volume = self.volume * self.step / 60
+        max_steps = int(86400 / self.step)
+
+        with self.lock:
+            for symbol in sorted(self.series):
+                s = self.series[symbol]
+                steps = int((now - s.last_time) / self.step)
+
+                if steps <= 0:
+                    continue
+
+                if steps > max_steps:
+                    s.last_time = now - max_steps * self.step
+                    steps = max_steps
+
+                for _ in range(steps):
+                    s.last_time += self.step
+                    s.price *= math.exp(self.rng.gauss(0, sigma))
+                    self._add_tick(s, s.last_time, s.price, self.rng.expovariate(1 / step_volume))
+
+    def _add_tick(self, s, t, price, volume):
+        minute_ms = int(t // 60) * 60000
+        c = s.current
+
+        if minute_ms != c[0]:
+            s.closed.append(tuple(c))
+            s.current = c = [minute_ms, price, price, price, price, 0.0]
+
+        c[2] = price
+        c[3] = max(c[3], price)
+        c[4] = min(c[4], price)
+        c[5] += volume
+
+    def price(self, symbol):
+        s = self.series.get(symbol)
+        return s.price if s else None
+
+    def candles(self, symbol, limit):
+        s = self.series.get(symbol)
+        if not s:
+            return []
+        rows = list(itertools.islice(reversed(s.closed), max(limit - 1, 0)))[::-1]
+        rows.append(tuple(s.current))
+        return rows
+
+
+class ReplayFeed:
+    """
+    Reproduce velas grabadas ({symbol: Klines}). El minuto actual avanza
+    con el tiempo real multiplicado por `speed`; al final se queda en
+    la última vela.
+    """
+
+    def __init__(self, dataset, speed=1.0, start=None):
+        self.dataset = dataset
+        self.speed = speed
+        self.start = clock.now() if start is None else start
+        self.now = self.start
+
+    def symbols(self):
+        return list(self.dataset)
+
+    def advance(self, now):
+        self.now = now
+
+    def _index(self, symbol):
+        k = self.dataset.get(symbol)
+        if k is None or not len(k):
+            return None, None
+        idx = int((self.now - self.start) * self.speed // 60)
+        return k, min(max(idx, 0), len(k) - 1)
+
+    def price(self, symbol):
+        k, idx = self._index(symbol)
+        return k.close[idx] if k is not None else None
+
+    def candles(self, symbol, limit):
+        k, idx = self._index(symbol)
+        if k is None:
+            return []
+        start = max(0, idx - limit + 1)
+        return [
+            (k.timestamp[i], k.open[i], k.close[i], k.high[i], k.low[i], k.volume[i])
+            for i in range(start, idx + 1)
+        ]
+
+
+class LiveFeed:
+    """Precios reales (p. ej. coinex_api.get_price) para paper trading."""
+
+    def __init__(self, price_fn):
+        self.price_fn = price_fn
+
+    def symbols(self):
+        return []
+
+    def advance(self, now):
+        pass
+
+    def price(self, symbol):
+        return self.price_fn(symbol)
+
+    def candles(self, symbol, limit):
+        return []
+
+
+# ======================================================
+# LIMITADOR DE PETICIONES (TOKEN BUCKET)
+# ======================================================
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "lock")
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = clock.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = clock.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+# ======================================================
+# EXCHANGE SIMULADO
+# ======================================================
+
+def _error(code, message, status=200):
+    return status, {"code": code, "message": message, "data": {}}
+
+
+def _ok(data):
+    return 200, {"code": 0, "message": "OK", "data": data}
+
+
+class SimExchange:
+    """
+    Implementa los endpoints que usa coinex_api con cuentas, saldos,
+    órdenes a mercado, límite y stop, y verificación de firma.
+
+    latency: (mín, máx) segundos reales añadidos a cada petición
+    error_rate: probabilidad de responder 503
+    rate_limit: peticiones/s por API key (o por "public"); None = sin límite
+    depth_notional / depth_step: libro sintético alrededor del último
+    precio, con ~depth_notional USDT por nivel y niveles separados
+    depth_step (fracción). Las órdenes a mercado lo recorren.
+    order_history: órdenes cerradas que se recuerdan para order-status
+    y finished-order (las más viejas se olvidan)
+    """
+
+    def __init__(self, feed, start_balance=1000.0, fee_rate=0.002, latency=(0.0, 0.0),
+                 error_rate=0.0, rate_limit=None, seed=0, max_skew_ms=60000,
+                 amount_precision=8, price_precision=6, min_amount=0.0,
+                 depth_notional=5000.0, depth_step=0.0005, order_history=10000):
+        self.feed = feed
+        self.start_balance = start_balance
+        self.fee_rate = fee_rate
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.max_skew_ms = max_skew_ms
+        self.amount_precision = amount_precision
+        self.price_precision = price_precision
+        self.min_amount = min_amount
+        self.depth_notional = depth_notional
+        self.depth_step = depth_step
+        self.order_history = order_history
+        self.rng = random.Random(seed)
+
+        self.accounts = {}
+        # Historial acotado (por id, el más viejo primero) y, aparte,
+        # las límite abiertas: casar en cada petición solo recorre estas
+        self.orders = OrderedDict()
+        self.open_orders = {}
+        self.stop_orders = {}
+        self.buckets = {}
+        self.ids = itertools.count(1)
+        self.requests = 0
+        self.placed = 0
+        self.lock = threading.RLock()
+        # Precios de la petición en curso (pedidos fuera del lock)
+        self._prices = {}
+
+        self.routes = {
+            ("GET", "/time"): self._time,
+            ("GET", "/spot/market/list"): self._market_list,
+            ("GET", "/spot/market/ticker"): self._ticker,
+            ("GET", "/spot/market/kline"): self._kline,
+            ("GET", "/spot/market/depth"): self._depth,
+            ("POST", "/spot/balance/query"): self._balance,
+            ("POST", "/spot/order/put_market"): self._put_market,
+            ("POST", "/spot/order"): self._put_limit,
+            ("POST", "/spot/stop-order"): self._put_stop,
+            ("GET", "/spot/order-status"): self._order_status,
+            ("GET", "/spot/finished-order"): self._finished_orders,
+            ("GET", "/spot/pending-stop-order"): self._pending_stop,
+            ("POST", "/spot/cancel-order"): self._cancel_order,
+            ("POST", "/spot/cancel-stop-order"): self._cancel_stop,
+        }
+
+    # ---------- cuentas ----------
+
+    def ensure_account(self, api_key, secret, balance=None):
+        with self.lock:
+            account = self.accounts.get(api_key)
+            if account is None:
+                usdt = self.start_balance if balance is None else balance
+                account = self.accounts[api_key] = {
+                    "secret": secret,
+                    "balances": {"USDT": [float(usdt), 0.0]}
+                }
+            return account
+
+    def credit(self, api_key, secret, asset, amount):
+        """Abona `amount` disponible de `asset` a la cuenta (la crea si falta)."""
+        with self.lock:
+            self._asset(self.ensure_account(api_key, secret), asset)[0] += amount
+
+    def _asset(self, account, asset):
+        return account["balances"].setdefault(asset, [0.0, 0.0])
+
+    # ---------- entrada ----------
+
+    def handle(self, method, endpoint, params, headers):
+        """Devuelve (status_http, json) como lo haría CoinEx."""
+        self.requests += 1
+        now = clock.now()
+
+        lo, hi = self.latency
+        if hi > 0:
+            time.sleep(self.rng.uniform(lo, hi))
+
+        key = headers.get("X-COINEX-KEY") or "public"
+
+        if self.rate_limit:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets.setdefault(key, TokenBucket(self.rate_limit))
+            if not bucket.take():
+                return _error(4213, "rate limit exceeded", status=429)
+
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return _error(5000, "service unavailable", status=503)
+
+        route = self.routes.get((method, endpoint))
+        if route is None:
+            return _error(4004, f"unknown endpoint {method} {endpoint}", status=404)
+
+        account = None
+        if "X-COINEX-KEY" in headers:
+            account, error = self._authenticate(method, endpoint, params, headers, now)
+            if error:
+                return error
+
+        with self.lock:
+            self.feed.advance(now)
+            symbols = {o["market"] for o in self.open_orders.values()}
+            symbols.update(s["market"] for s in self.stop_orders.values())
+
+        # Con LiveFeed cada precio es una petición a CoinEx: se piden
+        # una vez por símbolo y sin el lock, que comparten todas las cuentas
+        market = params.get("market")
+        if market and "," not in str(market):
+            symbols.add(market)
+        prices = {symbol: self.feed.price(symbol) for symbol in symbols}
+
+        with self.lock:
+            self._prices = prices
+            try:
+                self._match_resting()
+                return route(params, account)
+            finally:
+                self._prices = {}
+
+    def _price(self, symbol):
+        if symbol in self._prices:
+            return self._prices[symbol]
+        return self.feed.price(symbol)
+
+    def _authenticate(self, method, endpoint, params, headers, now):
+        account = self.accounts.get(headers.get("X-COINEX-KEY"))
+        if account is None:
+            return None, _error(4001, "invalid api key")
+
+        timestamp = headers.get("X-COINEX-TIMESTAMP", "")
+        sorted_params = "&".join(f"{k}={params[k]}" for k in sorted(params)) if params else ""
+        raw = account["secret"] + method + endpoint + sorted_params + timestamp
+        expected = hashlib.md5(raw.encode()).hexdigest()
+
+        if headers.get("X-COINEX-SIGN") != expected:
+            return None, _error(4005, "invalid signature")
+
+        try:
+            skew = abs(int(timestamp) - now * 1000)
+        except ValueError:
+            skew = math.inf
+        if skew > self.max_skew_ms:
+            return None, _error(4006, "timestamp out of range")
+
+        return account, None
+
+    # ---------- market data ----------
+
+    def _time(self, params, account):
+        return _ok({"timestamp": int(clock.now() * 1000)})
+
+    def _market_list(self, params, account):
+        return _ok([
+            {
+                "market": symbol,
+                "base_ccy": symbol[:-4] if symbol.endswith("USDT") else symbol,
+                "quote_ccy": "USDT",
+                "base_ccy_precision": self.amount_precision,
+                "quote_ccy_precision": self.price_precision,
+                "min_amount": str(self.min_amount),
+                "maker_fee_rate": str(self.fee_rate),
+                "taker_fee_rate": str(self.fee_rate)
+            }
+            for symbol in self.feed.symbols()
+        ])
+
+    def _ticker(self, params, account):
+        wanted = params.get("market")
+        symbols = str(wanted).split(",") if wanted else self.feed.symbols()
+
+        data = []
+        for symbol in symbols:
+            last = self._price(symbol)
+            if last is None:
+                continue
+            day = self.feed.candles(symbol, 1440)
+            volume = sum(c[5] for c in day)
+            data.append({
+                "market": symbol,
+                "last": str(last),
+                "open": str(day[0][1] if day else last),
+                "high": str(max((c[3] for c in day), default=last)),
+                "low": str(min((c[4] for c in day), default=last)),
+                "volume": str(volume),
+                "value": str(sum(c[5] * c[2] for c in day)),
+                "period": 86400
+            })
+
+        if wanted and not data:
+            return _error(3639, "market not found")
+        return _ok(data)
+
+    def _kline(self, params, account):
+        symbol = params.get("market")
+        limit = int(params.get("limit", 100))
+        period = TIMEFRAME_SECONDS.get(params.get("period", "1min"), 60) // 60
+
+        minutes = self.feed.candles(symbol, limit * period)
+        if not minutes and self._price(symbol) is None:
+            return _error(3639, "market not found")
+
+        # Agregar velas de 1 min al periodo pedido
+        rows = []
+        for ts, o, c, h, l, v in minutes:
+            bucket = ts - ts % (period * 60000)
+            if rows and rows[-1][0] == bucket:
+                r = rows[-1]
+                r[2], r[3], r[4], r[5] = c, max(r[3], h), min(r[4], l), r[5] + v
+            else:
+                rows.append([bucket, o, c, h, l, v])
+
+        return _ok([
+            {
+                "market": symbol,
+                "created_at": r[0],
+                "open": str(r[1]),
+                "close": str(r[2]),
+                "high": str(r[3]),
+                "low": str(r[4]),
+                "volume": str(r[5]),
+                "value": str(r[5] * r[2])
+            }
+            for r in rows[-limit:]
+        ])
+
+    # ---------- cuenta y órdenes ----------
+
+    def _balance(self, params, account):
+        return _ok({
+            "balances": {
+                asset: {"available": str(b[0]), "frozen": str(b[1])}
+                for asset, b in account["balances"].items()
+            }
+        })
+
+    def _fill(self, account, symbol, side, amount, price):
+        base = symbol[:-4] if symbol.endswith("USDT") else symbol
+        usdt = self._asset(account, "USDT")
+        coin = self._asset(account, base)
+        value = amount * price
+
+        if side == "buy":
+            cost = value * (1 + self.fee_rate)
+            if usdt[0] < cost:
+                return False
+            usdt[0] -= cost
+            coin[0] += amount
+        else:
+            if coin[0] < amount - 1e-12:
+                return False
+            coin[0] -= amount
+            usdt[0] += value * (1 - self.fee_rate)
+
+        return True
+
+    def _new_order(self, account, symbol, side, kind, amount, price, status):
+        order_id = next(self.ids)
+        order = {
+            "order_id": order_id,
+            "market": symbol,
+            "side": side,
+            "type": kind,
+            "amount": str(amount),
+            "price": str(price),
+            "status": status,
+            "filled_amount": str(amount if status == "filled" else 0),
+            "filled_value": str(amount * price if status == "filled" else 0),
+            "_account": account
+        }
+        self.placed += 1
+        if status == "open":
+            self.open_orders[order_id] = order
+        self._remember(order)
+        return order
+
+    def _remember(self, order):
+        self.orders[order["order_id"]] = order
+        while len(self.orders) > self.order_history:
+            self.orders.popitem(last=False)
+
+    def _find_order(self, params, account):
+        try:
+            order_id = int(params.get("order_id", 0))
+        except (TypeError, ValueError):
+            return None
+        order = self.open_orders.get(order_id) or self.orders.get(order_id)
+        if not order or order["_account"] is not account:
+            return None
+        return order
+
+    @staticmethod
+    def _public(order):
+        return {k: v for k, v in order.items() if not k.startswith("_")}
+
+    def _book(self, symbol, limit):
+        """(asks, bids) sintéticos: [(precio, cantidad)] desde el mejor."""
+        last = self._price(symbol)
+        if last is None:
+            return None
+
+        asks, bids = [], []
+        for i in range(limit):
+            offset = self.depth_step * (i + 0.5)
+            # Más liquidez cuanto más lejos del precio
+            notional = self.depth_notional * (1 + 0.25 * i)
+            ask = round(last * (1 + offset), self.price_precision)
+            bid = round(last * (1 - offset), self.price_precision)
+            asks.append((ask, notional / ask))
+            bids.append((bid, notional / bid))
+        return asks, bids
+
+    def _depth(self, params, account):
+        symbol = params.get("market")
+        book = self._book(symbol, int(params.get("limit", 20)))
+
+        if book is None:
+            return _error(3639, "market not found")
+
+        asks, bids = book
+        return _ok({
+            "market": symbol,
+            "is_full": True,
+            "depth": {
+                "asks": [[str(p), str(q)] for p, q in asks],
+                "bids": [[str(p), str(q)] for p, q in bids],
+                "last": str(self._price(symbol)),
+                "updated_at": int(clock.now() * 1000)
+            }
+        })
+
+    def _market_fill_price(self, symbol, side, amount):
+        """Precio medio recorriendo el libro sintético (o el último precio)."""
+        book = self._book(symbol, 50)
+        if book is None:
+            return None
+
+        levels = book[0] if side == "buy" else book[1]
+        left, cost = amount, 0.0
+        for price, qty in levels:
+            take = min(left, qty)
+            cost += take * price
+            left -= take
+            if left <= 0:
+                break
+        # Lo que supere el libro, al peor nivel
+        cost += max(left, 0) * levels[-1][0]
+        return round(cost / amount, self.price_precision)
+
+    def _put_market(self, params, account):
+        symbol = params.get("market")
+        side = params.get("side")
+        amount = float(params.get("amount", 0))
+
+        if self._price(symbol) is None:
+            return _error(3639, "market not found")
+        if amount <= 0 or amount < self.min_amount:
+            return _error(3127, "amount too small")
+
+        price = self._market_fill_price(symbol, side, amount)
+        if not self._fill(account, symbol, side, amount, price):
+            return _error(3109, "balance not enough")
+
+        return _ok(self._public(self._new_order(account, symbol, side, "market", amount, price, "filled")))
+
+    def _put_limit(self, params, account):
+        symbol = params.get("market")
+        amount = float(params.get("amount", 0))
+        price = float(params.get("price", 0))
+        base = symbol[:-4] if symbol.endswith("USDT") else symbol
+
+        if params.get("side") != "sell":
+            return _error(3008, "only limit sell is simulated")
+
+        coin = self._asset(account, base)
+        if coin[0] < amount - 1e-12:
+            return _error(3109, "balance not enough")
+
+        coin[0] -= amount
+        coin[1] += amount
+        order = self._new_order(account, symbol, "sell", "limit", amount, price, "open")
+        return _ok(self._public(order))
+
+    def _put_stop(self, params, account):
+        symbol = params.get("market")
+        side = params.get("side")
+
+        try:
+            amount = float(params.get("amount", 0))
+            trigger_price = float(params.get("trigger_price", 0))
+        except (TypeError, ValueError):
+            return _error(3008, "invalid amount or trigger_price")
+
+        if self._price(symbol) is None:
+            return _error(3639, "market not found")
+        if side not in ("buy", "sell"):
+            return _error(3008, "invalid side")
+        if amount <= 0 or amount < self.min_amount:
+            return _error(3127, "amount too small")
+        if trigger_price <= 0:
+            return _error(3008, "invalid trigger_price")
+
+        stop_id = next(self.ids)
+        self.stop_orders[stop_id] = {
+            "stop_id": stop_id,
+            "market": symbol,
+            "side": side,
+            "amount": amount,
+            "trigger_price": trigger_price,
+            "_account": account
+        }
+        return _ok({"stop_id": stop_id})
+
+    def _match_resting(self):
+        for order_id in list(self.open_orders):
+            order = self.open_orders[order_id]
+            price = self._price(order["market"])
+            limit = float(order["price"])
+            if price is not None and price >= limit:
+                amount = float(order["amount"])
+                base = order["market"][:-4]
+                coin = self._asset(order["_account"], base)
+                coin[1] -= amount
+                self._asset(order["_account"], "USDT")[0] += amount * limit * (1 - self.fee_rate)
+                order.update(status="filled", filled_amount=str(amount), filled_value=str(amount * limit))
+                del self.open_orders[order_id]
+
+        for stop_id in list(self.stop_orders):
+            stop = self.stop_orders[stop_id]
+            price = self._price(stop["market"])
+            if price is None or price > stop["trigger_price"]:
+                continue
+            del self.stop_orders[stop_id]
+            account = stop["_account"]
+            if self._fill(account, stop["market"], stop["side"], stop["amount"], price):
+                self._new_order(account, stop["market"], stop["side"], "market", stop["amount"], price, "filled")
+
+    def _order_status(self, params, account):
+        order = self._find_order(params, account)
+        if not order:
+            return _error(3600, "order not found")
+        return _ok(self._public(order))
+
+    def _finished_orders(self, params, account):
+        symbol = params.get("market")
+        side = params.get("side")
+        limit = int(params.get("limit", 10))
+
+        data = []
+        for order in reversed(self.orders.values()):
+            if len(data) >= limit:
+                break
+            if (order["_account"] is not account or order["status"] == "open"
+                    or (symbol and order["market"] != symbol) or (side and order["side"] != side)):
+                continue
+            data.append(self._public(order))
+        return _ok(data)
+
+    def _pending_stop(self, params, account):
+        symbol = params.get("market")
+        return _ok([
+            {k: v for k, v in s.items() if not k.startswith("_")}
+            for s in self.stop_orders.values()
+            if s["_account"] is account and (not symbol or s["market"] == symbol)
+        ])
+
+    def _cancel_order(self, params, account):
+        order = self._find_order(params, account)
+        if not order:
+            return _error(3600, "order not found")
+        if order["status"] == "open":
+            amount = float(order["amount"])
+            coin = self._asset(account, order["market"][:-4])
+            coin[1] -= amount
+            coin[0] += amount
+            order["status"] = "canceled"
+            del self.open_orders[order["order_id"]]
+        return _ok(self._public(order))
+
+    def _cancel_stop(self, params, account):
+        stop = self.stop_orders.get(int(params.get("stop_id", 0)))
+        if not stop or stop["_account"] is not account:
+            return _error(3600, "stop order not found")
+        del self.stop_orders[stop["stop_id"]]
+        return _ok({})
+
+
+# ======================================================
+# ADAPTADORES: EN PROCESO Y SERVIDOR HTTP
+# ======================================================
+
+class SimTransport:
+    """Transporte en proceso para coinex_api (sin red)."""
+
+    def __init__(self, sim, name="sim"):
+        self.sim = sim
+        self.name = name
+
+    def send(self, method, endpoint, params, headers, lane=None):
+        status, body = self.sim.handle(method, endpoint, dict(params), headers)
+        # Igual que por HTTP: el cliente recibe una copia, no el estado interno
+        return status, json.loads(json.dumps(body))
+
+    def ensure_account(self, api_key, secret):
+        self.sim.ensure_account(api_key, secret)
+
+    def credit(self, api_key, secret, asset, amount):
+        self.sim.credit(api_key, secret, asset, amount)
+
+
+def make_handler(sim):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            self._reply(*sim.handle("GET", url.path, dict(parse_qsl(url.query)), dict(self.headers)))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+            self._reply(*sim.handle("POST", urlsplit(self.path).path, params, dict(self.headers)))
+
+    return Handler
+
+
+def serve(sim, host="127.0.0.1", port=8765):
+    """Arranca el servidor HTTP en un hilo y lo devuelve."""
+    server = ThreadingHTTPServer((host, port), make_handler(sim))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exchange simulado (API CoinEx V2)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--symbols", default="BTCUSDT,ETHUSDT")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", default=None, help="Directorio con velas grabadas")
+    parser.add_argument("--speed", type=float, default=1.0, help="Velocidad del replay")
+    parser.add_argument("--latency", default="0,0", help="mín,máx en segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None)
+    parser.add_argument("--accounts", default=None)
+    args = parser.parse_args()
+
+    if args.replay:
+        from app.param_sweep import load_dataset
+        feed = ReplayFeed(load_dataset(args.replay), speed=args.speed)
+    else:
+        feed = SyntheticFeed(args.symbols.split(","), seed=args.seed)
+
+    lo, hi = (float(x) for x in args.latency.split(","))
+    sim = SimExchange(feed, latency=(lo, hi), error_rate=args.error_rate,
+                      rate_limit=args.rate_limit, seed=args.seed)
+
+    if args.accounts:
+        with open(args.accounts) as f:
+            for acc in json.load(f):
+                sim.ensure_account(acc["api_key"], acc["secret"], acc.get("balance"))
+
+    server = serve(sim, args.host, args.port)
+    print(f"🧪 Exchange simulado en http://{args.host}:{args.port} | símbolos: {len(feed.symbols())}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
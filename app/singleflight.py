@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+from app import clock
+
+
+# ======================================================
+# SINGLE-FLIGHT + MICRO-CACHÉ
+# ======================================================
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Llamadas concurrentes con la misma clave comparten una sola
+    ejecución de `fn` y su resultado. Opcionalmente, el resultado se
+    guarda `ttl` segundos (micro-caché) con un máximo de `max_entries`.
+    Los resultados None no se cachean.
+    """
+
+    def __init__(self, ttl=0.0, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                expires, result = cached
+                if clock.monotonic() < expires:
+                    self.hits += 1
+                    return result
+                del self._cache[key]
+
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+                if self.ttl > 0 and call.error is None and call.result is not None:
+                    self._cache[key] = (clock.monotonic() + self.ttl, call.result)
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.max_entries:
+                        self._cache.popitem(last=False)
+
+            call.event.set()
+
+        return call.result
+
+    def clear(self):
+        """Vacía la micro-caché; las llamadas en vuelo siguen su curso."""
+        with self._lock:
+            self._cache.clear()
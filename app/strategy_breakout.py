@@ -1,8 +1,15 @@
+from app import clock, metrics as stats
 from app.coinex_api import get_candles
+from app.klines import TIMEFRAME_SECONDS
+from app.indicators import get_state
+from app.eval_memo import eval_memo
 from app.config import (
     BREAKOUT_MIN_VOLUME,
     BREAKOUT_CANDLE_BODY,
     BREAKOUT_STRENGTH_THRESHOLD,
+    BREAKOUT_REQUIRE_RANGE_BREAK,
+    BREAKOUT_MIN_VOLUME_ZSCORE,
+    INDICATOR_WINDOW,
     TP_MIN,
     TP_MAX,
     SL_MIN,
@@ -14,23 +21,20 @@ from app.config import (
 # ANALIZAR UNA VELA INDIVIDUAL
 # ======================================================
 
-def analyze_candle(candle):
+def analyze_candle(klines, i=-1):
     """
-    Formato esperado CoinEx V2:
-    [timestamp, open, close, high, low, volume]
+    Analiza la vela `i` de un Klines (arrays tipados) sin
+    construir estructuras por vela.
     """
 
-    if not isinstance(candle, list) or len(candle) < 6:
+    if len(klines) == 0:
         return None
 
-    try:
-        open_price = float(candle[1])
-        close_price = float(candle[2])
-        high_price = float(candle[3])
-        low_price = float(candle[4])
-        volume = float(candle[5])
-    except:
-        return None
+    open_price = klines.open[i]
+    close_price = klines.close[i]
+    high_price = klines.high[i]
+    low_price = klines.low[i]
+    volume = klines.volume[i]
 
     if open_price <= 0 or close_price <= 0 or high_price < low_price:
         return None
@@ -44,6 +48,7 @@ def analyze_candle(candle):
     direction = "bullish" if close_price > open_price else "bearish"
 
     return {
+        "timestamp": klines.timestamp[i],
         "open": open_price,
         "close": close_price,
         "high": high_price,
@@ -54,56 +59,136 @@ def analyze_candle(candle):
     }
 
 
+# ======================================================
+# REGLAS DEL BREAKOUT (PURAS, SIN I/O)
+# ======================================================
+# Compartidas por detect_breakout y por la búsqueda de parámetros
+# (app.param_sweep), para que ambos apliquen exactamente lo mismo.
+
+def breakout_strength(body_strength, volume, min_volume=BREAKOUT_MIN_VOLUME):
+    return (
+        body_strength * 0.6 +
+        min(volume / min_volume, 2) * 0.4
+    )
+
+
+def passes_breakout(
+    body_strength,
+    volume,
+    bullish,
+    strength,
+    min_volume=BREAKOUT_MIN_VOLUME,
+    min_body=BREAKOUT_CANDLE_BODY,
+    threshold=BREAKOUT_STRENGTH_THRESHOLD
+):
+    return (
+        volume >= min_volume and
+        body_strength >= min_body and
+        bullish and
+        strength >= threshold
+    )
+
+
 # ======================================================
 # DETECTAR BREAKOUT REAL
 # ======================================================
 
 def detect_breakout(symbol, timeframe="1min"):
+    """
+    Evalúa la última vela CERRADA. Si es la misma que la evaluación
+    anterior (memo) no se piden velas, y una vela solo da señal una vez.
+    "fresh" es True solo en la primera evaluación de cada vela.
+    """
 
-    candles = get_candles(symbol, timeframe, limit=5)
+    state = get_state(symbol, timeframe)
+    period_ms = TIMEFRAME_SECONDS.get(timeframe, 60) * 1000
+    now_ms = clock.now() * 1000
 
-    if not candles or len(candles) < 2:
-        return {"signal": False}
+    # Vela cerrada más reciente que puede existir ahora mismo
+    expected_ts = (now_ms // period_ms - 1) * period_ms
 
-    # Ordenar velas por timestamp por seguridad
-    try:
-        candles = sorted(candles, key=lambda x: x[0])
-    except:
-        pass
+    memo = eval_memo.get(symbol, timeframe)
+    if memo and memo[0] >= expected_ts:
+        stats.incr("scan.memo_hits")
+        return {"signal": False, "metrics": memo[1], "fresh": False}
 
-    last = analyze_candle(candles[-1])
+    stats.incr("scan.memo_misses")
 
-    if not last:
-        return {"signal": False}
+    # Una sola petición: las velas que faltan al estado (mín. 5)
+    limit = min(max(state.missing_candles(now_ms, period_ms), 5), INDICATOR_WINDOW + 2)
 
-    # FILTROS
-    if last["volume"] < BREAKOUT_MIN_VOLUME:
-        return {"signal": False}
+    # Klines ya viene ordenado por timestamp
+    candles = get_candles(symbol, timeframe, limit=limit)
 
-    if last["body_strength"] < BREAKOUT_CANDLE_BODY:
+    # La vela en curso (si viene) no se evalúa
+    closed = len(candles)
+    while closed and candles.timestamp[closed - 1] + period_ms > now_ms:
+        closed -= 1
+
+    if closed < 2:
         return {"signal": False}
 
-    if last["direction"] != "bullish":
+    # Velas cerradas anteriores → indicadores; la última se compara contra ellos
+    state.update_klines(candles, closed - 1)
+
+    last = analyze_candle(candles, closed - 1)
+
+    if not last:
         return {"signal": False}
 
+    # Esta vela (o una posterior) ya se evaluó: el exchange aún no
+    # publica la siguiente o la respuesta llegó atrasada
+    if memo and last["timestamp"] <= memo[0]:
+        stats.incr("scan.memo_hits")
+        return {"signal": False, "metrics": memo[1], "fresh": False}
+
+    context = state.snapshot(last["volume"])
+
     # FUERZA
-    strength = (
-        last["body_strength"] * 0.6 +
-        min(last["volume"] / BREAKOUT_MIN_VOLUME, 2) * 0.4
+    strength = breakout_strength(last["body_strength"], last["volume"])
+
+    # Métricas de la vela (también sin señal) para priorizar escaneos
+    metrics = {
+        "volume": last["volume"],
+        "volatility": (last["high"] - last["low"]) / last["close"],
+        "strength": strength,
+        "volume_z": context["volume_z"],
+        "range_break": context["range_high"] is not None and last["close"] > context["range_high"]
+    }
+
+    signal = passes_breakout(
+        last["body_strength"],
+        last["volume"],
+        last["direction"] == "bullish",
+        strength
     )
 
-    if strength < BREAKOUT_STRENGTH_THRESHOLD:
-        return {"signal": False}
+    # Contexto propio del símbolo (solo con historial suficiente)
+    if signal and context["ready"]:
+        if BREAKOUT_REQUIRE_RANGE_BREAK and not metrics["range_break"]:
+            signal = False
+        elif context["volume_z"] < BREAKOUT_MIN_VOLUME_ZSCORE:
+            signal = False
+
+    # Solo la primera evaluación de la vela puede dar señal
+    first = eval_memo.put(symbol, timeframe, last["timestamp"], metrics, signal)
+
+    if not (signal and first):
+        return {"signal": False, "metrics": metrics, "fresh": first}
 
     # Señal válida
     return {
         "signal": True,
         "strength": round(strength, 4),
         "close_price": last["close"],
+        # Cierre (epoch s) de la vela que dio la señal
+        "candle_close": last["timestamp"] / 1000 + TIMEFRAME_SECONDS.get(timeframe, 60),
         "tp_min": TP_MIN,
         "tp_max": TP_MAX,
         "sl_min": SL_MIN,
-        "sl_max": SL_MAX
+        "sl_max": SL_MAX,
+        "metrics": metrics,
+        "fresh": True
     }
 
 
@@ -122,7 +207,8 @@ def generate_trade_plan(symbol, breakout):
         "tp_max": round(entry * (1 + breakout["tp_max"]), 6),
         "sl_min": round(entry * (1 - breakout["sl_min"]), 6),
         "sl_max": round(entry * (1 - breakout["sl_max"]), 6),
-        "strength": breakout["strength"]
+        "strength": breakout["strength"],
+        "candle_close": breakout["candle_close"]
     }
 
 
@@ -134,9 +220,11 @@ def get_trade_signal(symbol):
     breakout = detect_breakout(symbol)
 
     if not breakout["signal"]:
-        return {"signal": False}
+        return {"signal": False, "metrics": breakout.get("metrics"), "fresh": breakout.get("fresh", False)}
 
     return {
         "signal": True,
-        "trade_plan": generate_trade_plan(symbol, breakout)
+        "trade_plan": generate_trade_plan(symbol, breakout),
+        "metrics": breakout["metrics"],
+        "fresh": True
   }
@@ -0,0 +1,74 @@
+import math
+
+from app import clock, metrics
+from app.logger import get_logger
+
+log = get_logger("scheduler")
+
+
+# ======================================================
+# RELOJ DE TICKS SIN DERIVA
+# ======================================================
+
+class TickClock:
+    """
+    Genera ticks en instantes absolutos (anchor + k * period), así el
+    tiempo de cada ciclo no se acumula como deriva.
+
+    - align=True: ticks en cada cierre de vela de `period` segundos
+      (múltiplos del epoch) + `offset` segundos.
+    - align=False: ticks cada `period` segundos desde el arranque.
+
+    Si un ciclo se pasa del siguiente tick se cuenta un overrun y se
+    saltan los ticks perdidos en lugar de encadenarlos.
+    """
+
+    def __init__(self, period, offset=0.0, align=False):
+        self.period = float(period)
+        self.offset = float(offset)
+        self.align = align
+        self.deadline = None
+        self.overruns = 0
+        self.skipped = 0
+
+    def _first_deadline(self, now):
+        if not self.align:
+            return now
+        k = math.floor((now - self.offset) / self.period) + 1
+        return k * self.period + self.offset
+
+    def wait(self, stop_event=None):
+        """
+        Duerme hasta el siguiente tick y devuelve el retraso (s) con el
+        que se despertó respecto al instante planificado.
+        Con stop_event, la espera se corta en cuanto se activa.
+        """
+        now = clock.now()
+
+        if self.deadline is None:
+            self.deadline = self._first_deadline(now)
+        else:
+            self.deadline += self.period
+
+            if now > self.deadline:
+                # Overrun: el ciclo anterior tardó más de un periodo
+                missed = math.floor((now - self.deadline) / self.period) + 1
+                self.overruns += 1
+                self.skipped += missed
+                self.deadline += missed * self.period
+                metrics.incr("scheduler.overruns")
+                metrics.incr("scheduler.ticks_skipped", missed)
+                log.warning("scheduler.overrun", "⚠️ Scheduler overrun: ciclo lento, se saltan %d tick(s)",
+                            missed, skipped=missed)
+
+        delay = self.deadline - clock.now()
+        if delay > 0:
+            if stop_event is not None:
+                clock.wait(stop_event, delay)
+            else:
+                clock.sleep(delay)
+
+        lag = clock.now() - self.deadline
+        metrics.set_gauge("scheduler.tick_lag", lag)
+        metrics.record_latency("scheduler.tick_lag", lag)
+        return lag
@@ -1,124 +1,634 @@
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from app.coinex_api import (
     place_market_buy,
     place_market_sell,
-    get_price
+    get_price,
+    restore_paper_holdings
 )
 
 from app.scanner import scan_market
+from app.market_meta import validate_order, get_market
+from app.exit_orders import place_exit_orders, check_exit_orders, cancel_stop, confirm_sold
+from app.config import (
+    MIN_ORDER_USDT,
+    EXIT_MODE,
+    EXIT_STATUS_INTERVAL,
+    EXIT_STOP_CHECK_INTERVAL,
+    SELL_RETRY_BASE,
+    SELL_RETRY_MAX,
+    SELL_RETRY_CHECK,
+    MAX_ACTIVE_PAIRS,
+    ALLOCATION_MODE,
+    MAX_SLIPPAGE,
+    SLIPPAGE_MODE
+)
+from app import clock, metrics, balance_cache, depth_cache, exposure
+from app.logger import get_logger, bind, context
 from app.database import (
     get_user_capital,
-    register_trade
+    get_trading_mode,
+    register_trade,
+    create_position,
+    close_position,
+    update_position,
+    mark_position,
+    get_open_positions
 )
 
 
 # ======================================================
-# CALCULAR CANTIDAD A COMPRAR
+# REGISTRO DE MONITORES ACTIVOS
 # ======================================================
 
-def calculate_quantity(usdt_amount, price):
-    """
-    Convierte capital USDT → cantidad del par.
-    CoinEx permite hasta 6 decimales.
-    """
-    if price <= 0:
-        return 0
-    qty = usdt_amount / price
-    return round(qty, 6)
+# position_id → {"position": dict, "stop": Event, "thread": Thread}
+open_monitors = {}
+_monitors_lock = threading.Lock()
+
+# Índice por usuario (mismo lock): user_id → {position_id: position}.
+# Los chequeos de capacidad y símbolos ya abiertos no tocan Mongo.
+_user_positions = {}
+
+# Margen sobre MIN_ORDER_USDT por posición: la cantidad se trunca a la
+# precisión del mercado y el nocional real queda algo por debajo
+ALLOCATION_MARGIN = 1.02
+
+# Órdenes de entrada de un mismo ciclo se envían en paralelo
+_entry_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="entry")
+
+# Tolerancia (fees) al comparar saldo real vs cantidad de la posición
+RECONCILE_TOLERANCE = 0.02
+
+log = get_logger("trading")
 
 
 # ======================================================
 # ABRIR OPERACIÓN REAL
 # ======================================================
 
-def open_trade(user_id, symbol, trade_plan):
+def open_trade(user_id, symbol, trade_plan, capital=None, mode=None):
     """
-    Ejecuta compra en mercado SPOT (API V2)
+    Ejecuta compra en mercado SPOT (API V2) por `capital` USDT
+    (por defecto todo el capital del usuario). `mode` ("live" /
+    "paper") elige el cupo de exposición; por defecto el del usuario.
     """
 
-    capital = get_user_capital(user_id)
+    if capital is None:
+        capital = get_user_capital(user_id)
+
+    if mode is None:
+        mode = get_trading_mode(user_id)
 
-    if capital < 5:
-        print("❌ Capital insuficiente (mínimo 5 USDT requeridos).")
+    if capital < MIN_ORDER_USDT:
+        log.warning("trade.low_capital", "❌ Capital insuficiente (mínimo %g USDT requeridos).", MIN_ORDER_USDT)
         return None
 
     entry_price = trade_plan["entry_price"]
-    qty = calculate_quantity(capital, entry_price)
+    fill_price = entry_price
+
+    # Precio medio estimado con el libro en caché: si la orden se
+    # desliza más de MAX_SLIPPAGE sobre la entrada, se reduce o se omite
+    quote = depth_cache.check_buy(symbol, capital, entry_price, MAX_SLIPPAGE)
+
+    if quote:
+        if quote["usdt"] < capital:
+            if SLIPPAGE_MODE == "skip" or quote["usdt"] < MIN_ORDER_USDT:
+                metrics.incr("trade.slippage_skips")
+                log.warning("trade.slippage_skip", "⚠️ %s: deslizamiento estimado %.2f%% > %.2f%%, se omite",
+                            symbol, quote["slippage"] * 100, MAX_SLIPPAGE * 100,
+                            symbol=symbol, slippage=quote["slippage"])
+                return None
+
+            metrics.incr("trade.slippage_caps")
+            log.info("trade.slippage_cap", "✂️ %s: orden reducida de %.2f a %.2f USDT por liquidez",
+                     symbol, capital, quote["usdt"], symbol=symbol, slippage=quote["slippage"])
+            capital = quote["usdt"]
+
+        fill_price = quote["avg_price"]
+
+    # Validación local (precisión, mínimo del mercado, nocional)
+    # para no gastar una petición firmada en una orden rechazada
+    qty, error = validate_order(symbol, capital / fill_price, fill_price)
+
+    if error:
+        log.warning("trade.invalid_order", "❌ Orden inválida en %s: %s", symbol, error, symbol=symbol)
+        return None
+
+    # Saldo desde el snapshot (sin petición en el caso común); si no
+    # hay forma de saberlo, que decida el exchange
+    available = balance_cache.get_available(user_id)
+
+    if available is not None and available < qty * fill_price:
+        log.warning("trade.insufficient_balance", "❌ Saldo insuficiente para %s: %.4f USDT disponibles",
+                    symbol, available, symbol=symbol, available=available)
+        return None
+
+    # Límites de riesgo globales (por símbolo, total, nº de posiciones):
+    # se comprueban y reservan a la vez, antes de la orden
+    exposure_key, reason = exposure.reserve(user_id, symbol, qty * fill_price, mode)
 
-    if qty <= 0:
-        print("❌ Cantidad inválida para la compra.")
+    if exposure_key is None:
+        log.warning("trade.risk_limit", "🛡 Orden en %s bloqueada: %s", symbol, reason, symbol=symbol, reason=reason)
         return None
 
-    print(f"🟢 Ejecutando COMPRA {symbol} | Cantidad: {qty} | Entrada: {entry_price}")
+    log.info("trade.buy", "🟢 Ejecutando COMPRA %s | Cantidad: %s | Entrada: %s",
+             symbol, qty, entry_price, symbol=symbol, qty=qty, entry_price=entry_price)
 
     order_data = place_market_buy(user_id, symbol, qty)
 
     if not order_data:
-        print(f"❌ Error ejecutando compra en {symbol}.")
+        exposure.release(exposure_key)
+        log.error("trade.buy_failed", "❌ Error ejecutando compra en %s.", symbol, symbol=symbol)
         return None
 
-    return {
+    balance_cache.apply_fill(user_id, symbol, "buy", qty, fill_price)
+
+    # Latencia señal → orden desde el cierre de la vela
+    candle_close = trade_plan.get("candle_close")
+    if candle_close:
+        latency = clock.now() - candle_close
+        metrics.record_latency("signal_to_order", latency)
+        log.info("trade.latency", "⏱ Latencia cierre de vela → orden: %.0f ms",
+                 latency * 1000, symbol=symbol, latency_ms=round(latency * 1000, 1))
+
+    position = {
         "user_id": user_id,
         "symbol": symbol,
         "entry_price": entry_price,
         "qty": qty,
         "tp_price": trade_plan["tp_min"],
-        "sl_price": trade_plan["sl_max"]
+        "sl_price": trade_plan["sl_max"],
+        "mode": mode,
+        "exposure_key": exposure_key
     }
 
+    # Persistir para poder retomar el monitoreo tras un reinicio
+    try:
+        position["position_id"] = create_position(position)
+    except Exception as e:
+        log.error("position.persist_failed", "⚠️ No se pudo persistir la posición %s: %s", symbol, e, symbol=symbol)
+
+    return position
+
 
 # ======================================================
 # MONITOREAR OPERACIÓN (NO BLOQUEA)
 # ======================================================
 
-def monitor_trade(position):
+def _finish_trade(position, exit_price, result):
     """
-    Monitorea operación hasta cumplir TP o SL.
-    EJECUTADO EN HILO PARA NO BLOQUEAR EL BOT.
+    Cierra la posición y registra el trade. Si otra ruta (la
+    reconciliación) ya la cerró o la marcó, no se registra nada.
     """
+    if position.get("position_id") is not None and not close_position(position["position_id"], exit_price, result):
+        log.warning("position.already_closed", "⚠️ La posición de %s ya no estaba abierta, no se registra el trade",
+                    position["symbol"], symbol=position["symbol"])
+        return False
+
+    balance_cache.apply_fill(position["user_id"], position["symbol"], "sell", position["qty"], exit_price)
+    register_trade(
+        position["user_id"], position["symbol"], position["entry_price"],
+        exit_price, position["qty"], result
+    )
+    return True
+
+
+def _sell_and_finish(position, exit_price, result):
+    """Venta a mercado + registro. False si la venta falló."""
+    if not place_market_sell(position["user_id"], position["symbol"], position["qty"]):
+        return False
+    _finish_trade(position, exit_price, result)
+    return True
 
-    user_id = position["user_id"]
+
+def _pause(stop_event, seconds):
+    """Espera del monitor (reloj inyectable); se corta si se detiene."""
+    if stop_event is not None:
+        clock.wait(stop_event, seconds)
+    else:
+        clock.sleep(seconds)
+
+
+def _sell_failed(position, result, failures, stop_event):
+    """
+    Venta de salida rechazada: espera con backoff antes del reintento.
+    Devuelve True si hay que dejar de monitorear (las monedas ya no
+    están en la cuenta: la posición se marca 'orphaned').
+    """
     symbol = position["symbol"]
-    entry = position["entry_price"]
-    qty = position["qty"]
+    delay = min(SELL_RETRY_BASE * 2 ** (failures - 1), SELL_RETRY_MAX)
+
+    metrics.incr("monitor.sell_retries")
+    log.error("monitor.sell_failed", "❌ Venta %s de %s fallida (intento %d), reintento en %.0f s",
+              result, symbol, failures, delay, result=result, failures=failures)
+
+    if failures % SELL_RETRY_CHECK == 0 and confirm_sold(position):
+        log.warning("monitor.handoff", "⚠️ %s ya no tiene saldo en CoinEx → orphaned", symbol)
+        if position.get("position_id") is not None:
+            mark_position(position["position_id"], "orphaned", reconciled_balance=0)
+        return True
+
+    _pause(stop_event, delay)
+    return False
+
 
+def _monitor_price(position, stop_event):
+    """
+    Modo client: consulta el precio y vende a mercado en TP/SL. Una
+    vez alcanzado un nivel, la venta se reintenta hasta que sale: el
+    monitor no se suelta con la posición aún abierta.
+    """
+    symbol = position["symbol"]
     tp_price = position["tp_price"]
     sl_price = position["sl_price"]
 
-    print(f"📡 Monitoreando operación en {symbol}...")
+    result = None
+    failures = 0
 
-    while True:
+    while not (stop_event and stop_event.is_set()):
 
-        current_price = get_price(symbol)
+        current_price = get_price(symbol, lane="exit" if result else "poll")
 
         if not current_price:
-            print("⚠ Precio no disponible, reintentando...")
-            time.sleep(3)
+            log.warning("monitor.no_price", "⚠ Precio no disponible, reintentando...", rate=1)
+            _pause(stop_event, 3)
             continue
 
-        # TAKE PROFIT
-        if current_price >= tp_price:
-            print(f"🎯 TP alcanzado en {symbol} | Precio: {current_price}")
+        if result is None:
+            # TAKE PROFIT
+            if current_price >= tp_price:
+                result = "tp_hit"
+                log.info("monitor.tp_hit", "🎯 TP alcanzado en %s | Precio: %s", symbol, current_price, price=current_price)
+
+            # STOP LOSS
+            elif current_price <= sl_price:
+                result = "sl_hit"
+                log.info("monitor.sl_hit", "🛑 STOP LOSS alcanzado en %s | Precio: %s", symbol, current_price, price=current_price)
+
+            else:
+                _pause(stop_event, 2)
+                continue
+
+        if _sell_and_finish(position, current_price, result):
+            if result == "tp_hit":
+                log.info("trade.closed", "🟢 Ganancia registrada", result=result)
+            else:
+                log.info("trade.closed", "🔴 Pérdida controlada registrada", result=result)
+            return
 
-            result = place_market_sell(user_id, symbol, qty)
-            if result:
-                register_trade(user_id, symbol, entry, current_price, qty, "tp_hit")
-                print("🟢 Ganancia registrada")
+        failures += 1
+        if _sell_failed(position, result, failures, stop_event):
             return
 
-        # STOP LOSS
-        if current_price <= sl_price:
-            print(f"🛑 STOP LOSS alcanzado en {symbol} | Precio: {current_price}")
 
-            result = place_market_sell(user_id, symbol, qty)
-            if result:
-                register_trade(user_id, symbol, entry, current_price, qty, "sl_hit")
-                print("🔴 Pérdida controlada registrada")
+def _to_client_mode(position):
+    """El SL deja de estar en CoinEx: el resto del monitoreo es por precio."""
+    position.update(sl_order_id=None, exit_mode="client")
+    if position.get("position_id") is not None:
+        update_position(position["position_id"], sl_order_id=None, exit_mode="client")
+
+
+def _exchange_exit_step(position):
+    """
+    Una ronda del modo exchange. Devuelve "closed" si la posición se
+    cerró, "client" si hay que seguir por precio o None si sigue igual.
+    En la mayoría de rondas solo se pide el precio: el stop se consulta
+    cerca de los niveles o cada EXIT_STOP_CHECK_INTERVAL.
+    """
+    symbol = position["symbol"]
+    current_price = get_price(symbol)
+
+    near_level = (
+        not current_price
+        or current_price <= position["sl_price"]
+        or current_price >= position["tp_price"]
+    )
+    checked_at = position.get("stop_checked_at")
+    due = checked_at is None or clock.monotonic() - checked_at >= EXIT_STOP_CHECK_INTERVAL
+
+    if near_level or due:
+        position["stop_checked_at"] = clock.monotonic()
+        outcome = check_exit_orders(position)
+
+        if outcome:
+            result, exit_price = outcome
+
+            if result == "sl_lost":
+                log.warning("monitor.stop_lost", "⚠️ El stop de %s desapareció sin vender, SL por precio", symbol)
+                _to_client_mode(position)
+                return "client"
+
+            log.info("monitor.sl_hit", "🛑 STOP ejecutado en CoinEx para %s | Precio: %s", symbol, exit_price, price=exit_price)
+            _finish_trade(position, exit_price, result)
+            return "closed"
+
+    if current_price and current_price >= position["tp_price"]:
+        # Primero liberar las monedas del stop. Si no se puede cancelar,
+        # puede que ya se haya disparado: la siguiente ronda lo confirma
+        if cancel_stop(position) is None:
+            log.warning("monitor.cancel_failed", "⚠️ No se pudo cancelar el stop de %s, se reintenta", symbol, rate=1)
+            return None
+
+        log.info("monitor.tp_hit", "🎯 TP alcanzado en %s | Precio: %s", symbol, current_price, price=current_price)
+        _to_client_mode(position)
+
+        if _sell_and_finish(position, current_price, "tp_hit"):
+            log.info("trade.closed", "🟢 Ganancia registrada", result="tp_hit")
+            return "closed"
+        return "client"
+
+    return None
+
+
+def _monitor_exchange_exits(position, stop_event):
+    """
+    Modo exchange: el SL vive en CoinEx y el TP se vigila por precio.
+    Si el stop deja de estar en CoinEx sin haber vendido, se sigue con
+    el monitor por precio.
+    """
+    while not (stop_event and stop_event.is_set()):
+
+        state = _exchange_exit_step(position)
+
+        if state == "closed":
             return
 
-        time.sleep(2)
+        if state == "client":
+            _monitor_price(position, stop_event)
+            return
+
+        _pause(stop_event, EXIT_STATUS_INTERVAL)
+
+
+def monitor_trade(position, stop_event=None):
+    """
+    Monitorea operación hasta cumplir TP o SL.
+    EJECUTADO EN HILO PARA NO BLOQUEAR EL BOT.
+    Solo se da de baja con la posición vendida, entregada (orphaned)
+    o con el monitor detenido; un error inesperado no la suelta.
+    """
+
+    bind(user_id=position["user_id"], symbol=position["symbol"], position_id=position.get("position_id"))
+    log.debug("monitor.start", "📡 Monitoreando operación en %s...", position["symbol"])
+
+    try:
+        while not (stop_event and stop_event.is_set()):
+            try:
+                if position.get("exit_mode") == "exchange":
+                    _monitor_exchange_exits(position, stop_event)
+                else:
+                    _monitor_price(position, stop_event)
+                break
+
+            except Exception as e:
+                log.error("monitor.error", "❌ Error monitoreando %s: %s", position["symbol"], e, rate=5)
+                _pause(stop_event, EXIT_STATUS_INTERVAL)
+
+    finally:
+        with _monitors_lock:
+            _unregister(_monitor_key(position))
+
+
+def _monitor_key(position):
+    return position.get("position_id", id(position))
+
+
+def _unregister(key):
+    """Quita el monitor y la posición del índice por usuario (con el lock)."""
+    entry = open_monitors.pop(key, None)
+    if entry:
+        exposure.release(entry["position"].get("exposure_key"))
+        user_id = entry["position"]["user_id"]
+        held = _user_positions.get(user_id)
+        if held is not None:
+            held.pop(key, None)
+            if not held:
+                del _user_positions[user_id]
+    return entry
+
+
+def monitor_stats():
+    """(monitores abiertos, usuarios con posición) en una sola lectura."""
+    with _monitors_lock:
+        return len(open_monitors), len(_user_positions)
+
+
+def user_positions(user_id):
+    """Posiciones abiertas del usuario (desde memoria)."""
+    with _monitors_lock:
+        return list(_user_positions.get(user_id, {}).values())
+
+
+def start_monitor(position):
+    """
+    Lanza monitor_trade en un hilo y lo registra en open_monitors.
+    """
+    stop_event = threading.Event()
+    thread = threading.Thread(target=monitor_trade, args=(position, stop_event), daemon=True)
+
+    key = _monitor_key(position)
+
+    with _monitors_lock:
+        open_monitors[key] = {"position": position, "stop": stop_event, "thread": thread}
+        _user_positions.setdefault(position["user_id"], {})[key] = position
+
+    thread.start()
+    return thread
+
+
+def stop_monitor(position_id):
+    with _monitors_lock:
+        entry = _unregister(position_id)
+    if entry:
+        entry["stop"].set()
+
+
+def stop_all_monitors(timeout=5):
+    """Detiene todos los monitores y espera (hasta `timeout` s) a sus hilos."""
+    with _monitors_lock:
+        entries = [_unregister(key) for key in list(open_monitors)]
+
+    for entry in entries:
+        entry["stop"].set()
+
+    deadline = time.monotonic() + timeout
+    for entry in entries:
+        entry["thread"].join(max(deadline - time.monotonic(), 0))
+
+
+# ======================================================
+# RETOMAR POSICIONES TRAS UN REINICIO
+# ======================================================
+
+def resume_open_positions(reconcile=True):
+    """
+    Carga TODAS las posiciones abiertas con una sola consulta y
+    vuelve a registrarlas en el monitor. La reconciliación contra
+    los saldos del exchange corre después, en segundo plano.
+    """
+    start = time.monotonic()
+
+    positions = get_open_positions()
+
+    # Índice de exposición desde la misma consulta
+    exposure.rebuild(positions)
+
+    for position in positions:
+        if position["position_id"] not in open_monitors:
+            start_monitor(position)
+
+    elapsed = time.monotonic() - start
+    metrics.record_latency("positions.recovery", elapsed)
+    log.info("positions.resumed", "♻️ %d posiciones retomadas en %.0f ms",
+             len(positions), elapsed * 1000, positions=len(positions))
+
+    if reconcile and positions:
+        threading.Thread(target=reconcile_positions, args=(positions,), daemon=True).start()
+
+    return positions
+
+
+def _base_asset(symbol):
+    info = get_market(symbol)
+    if info and info.get("base_ccy"):
+        return info["base_ccy"]
+    return symbol[:-4] if symbol.endswith("USDT") else symbol
+
+
+def reconcile_positions(positions):
+    """
+    Compara cada posición con el saldo real del usuario (1 petición
+    por usuario). Si el exchange ya no tiene las monedas, la posición
+    se marca 'orphaned' y se deja de monitorear. A los usuarios paper
+    del simulador en proceso se les devuelven las monedas en su lugar.
+    """
+    by_user = {}
+    for position in positions:
+        by_user.setdefault(position["user_id"], []).append(position)
+
+    orphaned = 0
+
+    for user_id, held in by_user.items():
+        # Paper en proceso: el simulador se reinició con el bot y las
+        # posiciones guardadas son lo único que queda de la cuenta
+        holdings = {}
+        for position in held:
+            asset = _base_asset(position["symbol"])
+            holdings[asset] = holdings.get(asset, 0.0) + position["qty"]
+        if restore_paper_holdings(user_id, holdings):
+            continue
+
+        # Saldo fresco; de paso deja el snapshot listo para las entradas
+        balances = balance_cache.refresh(user_id)
+
+        if balances is None:
+            log.warning("positions.reconcile_pending", "⚠️ Reconciliación pendiente para %s: sin balance", user_id, user_id=user_id)
+            continue
+
+        # Varias posiciones pueden compartir el mismo activo
+        remaining = {
+            asset: info["available"] + info["frozen"]
+            for asset, info in balances.items()
+        }
+
+        for position in held:
+            asset = _base_asset(position["symbol"])
+            needed = position["qty"] * (1 - RECONCILE_TOLERANCE)
+
+            if remaining.get(asset, 0) >= needed:
+                remaining[asset] -= position["qty"]
+                continue
+
+            stop_monitor(position["position_id"])
+            # El monitor retomado pudo cerrarla antes (stop disparado
+            # con el bot caído): entonces no es huérfana
+            if not mark_position(position["position_id"], "orphaned", reconciled_balance=remaining.get(asset, 0)):
+                continue
+
+            orphaned += 1
+            log.warning(
+                "positions.orphaned", "⚠️ Posición %s de %s sin saldo en CoinEx → orphaned",
+                position["symbol"], user_id, user_id=user_id, symbol=position["symbol"]
+            )
+
+    log.info("positions.reconciled", "✅ Reconciliación completa | Huérfanas: %d", orphaned, orphaned=orphaned)
+
+
+# ======================================================
+# REPARTO DEL CAPITAL ENTRE OPORTUNIDADES
+# ======================================================
+
+def allocate(capital, held, opportunities, max_positions=MAX_ACTIVE_PAIRS, mode=ALLOCATION_MODE, available=None):
+    """
+    Reparte el capital libre del usuario entre las mejores oportunidades
+    (ya ordenadas por fuerza) que no tenga abiertas.
+    - capital libre = capital − nocional de las posiciones abiertas
+      (acotado por el saldo USDT disponible, si se conoce)
+    - huecos = max_positions − abiertas, sin bajar de MIN_ORDER_USDT
+      por posición
+    - "slots": el mismo importe por hueco libre
+    - "strength": el presupuesto de los elegidos, según su fuerza
+    Devuelve [(oportunidad, usdt)].
+    """
+    in_use = sum(p["entry_price"] * p["qty"] for p in held)
+    free = capital - in_use
+    if available is not None:
+        free = min(free, available)
+
+    slots = min(max_positions - len(held), int(free // (MIN_ORDER_USDT * ALLOCATION_MARGIN))) if free > 0 else 0
+    if slots <= 0:
+        return []
+
+    symbols = {p["symbol"] for p in held}
+    chosen = [op for op in opportunities if op["symbol"] not in symbols][:slots]
+    if not chosen:
+        return []
+
+    per_slot = free / slots
+
+    if mode != "strength":
+        return [(op, per_slot) for op in chosen]
+
+    # Por fuerza: cada una entre MIN_ORDER_USDT y el doble de un hueco
+    budget = per_slot * len(chosen)
+    total = sum(op["strength"] for op in chosen) or 1
+    plan = []
+    for op in chosen:
+        amount = min(budget * op["strength"] / total, per_slot * 2)
+        if amount >= MIN_ORDER_USDT * ALLOCATION_MARGIN:
+            plan.append((op, amount))
+    return plan
+
+
+def _enter(user_id, opportunity, amount, mode):
+    """Compra + SL en el exchange + monitor. Corre en _entry_pool."""
+    symbol = opportunity["symbol"]
+    plan = opportunity["trade_plan"]
+
+    with context(user_id=user_id, symbol=symbol):
+        log.info("cycle.opportunity", "🔥 Oportunidad detectada: %s | Fuerza: %s | %.2f USDT",
+                 symbol, plan["strength"], amount, strength=plan["strength"], usdt=round(amount, 4))
+
+        position = open_trade(user_id, symbol, plan, capital=amount, mode=mode)
+
+        if not position:
+            log.warning("cycle.open_failed", "❌ No se pudo abrir la operación.")
+            return None
+
+        # SL en el exchange (si está activado)
+        if EXIT_MODE == "exchange":
+            fields = place_exit_orders(position)
+            position.update(fields)
+            if position.get("position_id") is not None:
+                update_position(position["position_id"], **fields)
+
+        # MONITOREO EN HILO PARA EVITAR BLOQUEAR EL BOT
+        start_monitor(position)
+
+        log.debug("cycle.monitoring", "📡 Monitoreo iniciado en segundo plano.")
+        return position
 
 
 # ======================================================
@@ -129,33 +639,40 @@ def trading_cycle(user_id):
     """
     Ciclo:
     1. Escaneo
-    2. Detectar oportunidad
-    3. Abrir trade
+    2. Repartir el capital libre entre las mejores oportunidades
+    3. Abrir los trades (en paralelo)
     4. Monitorear TP/SL
     """
 
-    print(f"\n🚀 INICIANDO CICLO DE TRADING PARA USER {user_id}")
+    log.debug("cycle.start", "🚀 INICIANDO CICLO DE TRADING PARA USER %s", user_id)
+
+    held = user_positions(user_id)
+
+    if len(held) >= MAX_ACTIVE_PAIRS:
+        log.debug("cycle.full", "⚪ Máximo de posiciones abiertas (%d).", len(held))
+        return []
 
     opportunities = scan_market()
 
     if not opportunities:
-        print("⚪ No hay oportunidades en el mercado.")
-        return
+        log.debug("cycle.no_opportunity", "⚪ No hay oportunidades en el mercado.")
+        return []
 
-    best = opportunities[0]
-    symbol = best["symbol"]
-    plan = best["trade_plan"]
+    plan = allocate(
+        get_user_capital(user_id),
+        held,
+        opportunities,
+        available=balance_cache.get_available(user_id)
+    )
 
-    print(f"🔥 Oportunidad detectada: {symbol} | Fuerza: {plan['strength']}")
+    if not plan:
+        log.debug("cycle.no_capital", "⚪ Sin capital libre o sin pares nuevos para operar.")
+        return []
 
-    position = open_trade(user_id, symbol, plan)
+    # Libros de todos los elegidos en una tanda, antes de las órdenes
+    depth_cache.prefetch([op["symbol"] for op, _ in plan])
 
-    if not position:
-        print("❌ No se pudo abrir la operación.")
-        return
-
-    # MONITOREO EN HILO PARA EVITAR BLOQUEAR EL BOT
-    thread = threading.Thread(target=monitor_trade, args=(position,), daemon=True)
-    thread.start()
+    mode = get_trading_mode(user_id)
+    futures = [_entry_pool.submit(_enter, user_id, op, amount, mode) for op, amount in plan]
 
-    print("📡 Monitoreo iniciado en segundo plano.")
+    return [p for p in (f.result() for f in futures) if p]
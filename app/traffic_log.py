@@ -0,0 +1,226 @@
+"""
+Grabación y reproducción del tráfico con CoinEx.
+
+COINEX_TRAFFIC_MODE=record → cada petición de make_request se añade al
+log (JSONL, una línea por petición, sin cabeceras ni firmas).
+COINEX_TRAFFIC_MODE=replay → las respuestas salen del log, sin red:
+a velocidad original (COINEX_REPLAY_SPEED=1), acelerada (>1) o lo más
+rápido posible (0).
+
+Resumen de un log:
+    python -m app.traffic_log coinex_traffic.jsonl
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from app.klines import loads
+from app.config import COINEX_TRAFFIC_MODE, COINEX_TRAFFIC_LOG, COINEX_REPLAY_SPEED
+
+LOG_VERSION = 1
+
+
+def request_key(method, endpoint, params):
+    return method, endpoint, json.dumps(params or {}, sort_keys=True, default=str)
+
+
+def read_entries(path):
+    """
+    Peticiones del log en orden. Cada sesión de grabación (cabecera
+    {"v", "start"}) cuenta `t` desde su propio inicio: se desplaza para
+    que empiece donde terminó la anterior y no se mezclen.
+    """
+    offset = end = 0.0
+
+    with open(path, "rb") as f:
+        for line in f:
+            entry = loads(line)
+            if "v" in entry:
+                offset = end
+                continue
+            entry["t"] += offset
+            end = max(end, entry["t"] + entry["dt"])
+            yield entry
+
+
+# ======================================================
+# GRABACIÓN
+# ======================================================
+
+class TrafficRecorder:
+    """
+    Log append-only; cada sesión empieza con una cabecera
+    {"v": versión, "start": epoch}. Cada línea después:
+    {"t": s desde el inicio de la sesión, "dt": duración, "m", "e", "p", "s": status, "r": json}
+    s=0 y r=null si no hubo respuesta (timeout, conexión).
+    """
+
+    replaying = False
+
+    def __init__(self, path):
+        self.path = path
+        self.start = time.time()
+        self.lock = threading.Lock()
+        self.file = None
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self._write({"v": LOG_VERSION, "start": self.start})
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+        self.file.flush()
+
+    def record(self, method, endpoint, params, status, data, started, elapsed):
+        entry = {
+            "t": round(started - self.start, 6),
+            "dt": round(elapsed, 6),
+            "m": method,
+            "e": endpoint,
+            "p": params or {},
+            "s": status,
+            "r": data
+        }
+        with self.lock:
+            if self.file is None:
+                self._open()
+            self._write(entry)
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+
+# ======================================================
+# REPRODUCCIÓN
+# ======================================================
+
+class TrafficReplayer:
+    """
+    Devuelve las respuestas grabadas en el mismo orden por petición
+    idéntica (método, endpoint, params). Si una petición no se grabó con
+    esos params se usa la siguiente del mismo endpoint; agotadas, se
+    repite la última. speed > 0 respeta los tiempos del log.
+    """
+
+    replaying = True
+
+    def __init__(self, path, speed=1.0):
+        self.path = path
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.exact = None
+        self.by_endpoint = None
+        self.last = {}
+        self.start = None
+        self.served = 0
+        self.misses = 0
+
+    def _load(self):
+        exact, by_endpoint = {}, {}
+
+        for entry in read_entries(self.path):
+            exact.setdefault(request_key(entry["m"], entry["e"], entry["p"]), deque()).append(entry)
+            by_endpoint.setdefault((entry["m"], entry["e"]), deque()).append(entry)
+
+        self.exact, self.by_endpoint = exact, by_endpoint
+        self.start = time.time()
+
+    @staticmethod
+    def _pop_unused(queue):
+        while queue:
+            entry = queue.popleft()
+            if not entry.get("_used"):
+                entry["_used"] = True
+                return entry
+        return None
+
+    def _next(self, method, endpoint, params):
+        key = request_key(method, endpoint, params)
+        entry = self._pop_unused(self.exact.get(key))
+
+        if entry is None:
+            self.misses += 1
+            entry = (
+                self._pop_unused(self.by_endpoint.get((method, endpoint)))
+                or self.last.get(key)
+                or self.last.get((method, endpoint))
+            )
+
+        if entry is not None:
+            self.last[key] = self.last[(method, endpoint)] = entry
+        return entry
+
+    def replay(self, method, endpoint, params):
+        with self.lock:
+            if self.exact is None:
+                self._load()
+            entry = self._next(method, endpoint, params)
+            self.served += 1
+
+        if entry is None:
+            return 0, None
+
+        if self.speed > 0:
+            ready_at = self.start + (entry["t"] + entry["dt"]) / self.speed
+            delay = ready_at - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+        return entry["s"], entry["r"]
+
+
+# ======================================================
+# INSTANCIA SEGÚN CONFIGURACIÓN
+# ======================================================
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log():
+    """Recorder / replayer según COINEX_TRAFFIC_MODE, o None (off)."""
+    global _log
+
+    if _log is None and COINEX_TRAFFIC_MODE in ("record", "replay"):
+        with _log_lock:
+            if _log is None:
+                if COINEX_TRAFFIC_MODE == "record":
+                    _log = TrafficRecorder(COINEX_TRAFFIC_LOG)
+                else:
+                    _log = TrafficReplayer(COINEX_TRAFFIC_LOG, COINEX_REPLAY_SPEED)
+
+    return _log
+
+
+def set_log(log):
+    """Activa un recorder / replayer concreto (None = apagado)."""
+    global _log
+    _log = log
+
+
+def summarize(path):
+    endpoints = Counter()
+    errors = 0
+    first = last = None
+
+    for entry in read_entries(path):
+        endpoints[(entry["m"], entry["e"])] += 1
+        errors += entry["s"] == 0 or entry["s"] >= 400
+        first = entry["t"] if first is None else min(first, entry["t"])
+        last = entry["t"] + entry["dt"] if last is None else max(last, entry["t"] + entry["dt"])
+
+    total = sum(endpoints.values())
+    span = (last - first) if total else 0
+    print(f"📼 {path}: {total} peticiones en {span:.1f}s | errores: {errors}")
+    for (method, endpoint), count in endpoints.most_common():
+        print(f"{count:>8}  {method:<5}{endpoint}")
+
+
+if __name__ == "__main__":
+    summarize(sys.argv[1] if len(sys.argv) > 1 else COINEX_TRAFFIC_LOG)
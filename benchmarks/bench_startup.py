@@ -0,0 +1,87 @@
+"""
+Benchmark de arranque en frío de TradingX.
+
+Mide, en un proceso Python nuevo por muestra, cuánto tarda en importarse
+cada punto de entrada (worker y herramientas offline). Ningún import debe
+abrir conexiones ni exigir variables de entorno: por eso se ejecuta con
+MONGODB_URI / SECRET_ENCRYPTION_KEY / TELEGRAM_BOT_TOKEN vacíos.
+
+Uso:
+    python benchmarks/bench_startup.py [--runs 7] [--budget-ms 400]
+
+Sale con código 1 si algún módulo supera su presupuesto.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (módulo, presupuesto en ms) — None usa el presupuesto global
+TARGETS = [
+    ("app.config", 50),
+    ("app.strategy_breakout", None),
+    ("app.scanner", None),
+    ("app.scheduler", None),
+    ("app.bot", None),
+]
+
+SNIPPET = (
+    "import time; t = time.perf_counter(); import {module}; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def measure(module, runs):
+    env = dict(os.environ)
+    for var in ("MONGODB_URI", "MONGO_URI", "SECRET_ENCRYPTION_KEY", "TELEGRAM_BOT_TOKEN"):
+        env.pop(var, None)
+
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", SNIPPET.format(module=module)],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr else "error"
+            return None, error
+        samples.append(float(proc.stdout.strip().splitlines()[-1]))
+
+    return samples, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=400.0)
+    args = parser.parse_args()
+
+    failed = False
+
+    print(f"{'módulo':<28}{'mediana ms':>12}{'máx ms':>10}{'budget':>10}")
+    for module, budget in TARGETS:
+        budget = budget or args.budget_ms
+        samples, error = measure(module, args.runs)
+
+        if samples is None:
+            print(f"{module:<28}  ❌ {error}")
+            failed = True
+            continue
+
+        median = statistics.median(samples)
+        status = "✅" if median <= budget else "❌"
+        failed = failed or median > budget
+        print(f"{module:<28}{median:>12.1f}{max(samples):>10.1f}{budget:>10.0f} {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Prueba de carga de extremo a extremo del scheduler.
+
+Para cada N de usuarios: siembra N usuarios sintéticos (API keys
+encriptadas, capital, trading activo) en un Mongo en memoria
+(mongomock), apunta coinex_api al exchange simulado y corre
+scheduler_loop durante un tiempo fijo. Reporta lag de tick, ciclos,
+hilos vivos, memoria RSS, peticiones/s al exchange y latencia de
+órdenes.
+
+Uso:
+    python benchmarks/load_test.py [--users 10,100,500,1000] [--duration 30] \
+        [--interval 1] [--symbols 50] [--latency 0.005,0.02] [--rate-limit 0]
+
+Requiere mongomock (pip install mongomock); no es dependencia del bot.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if not os.getenv("SECRET_ENCRYPTION_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["SECRET_ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+
+from app import (
+    coinex_api, database, encryption, logger, metrics, scheduler, trading_engine,
+    scanner, indicators, balance_cache, depth_cache
+)
+from app.eval_memo import eval_memo
+from app.scan_priority import scan_priority
+from app.sim_exchange import SimExchange, SimTransport, SyntheticFeed
+from app.perf import rss_mb
+
+TRANSPORT_NAME = "sim"
+ORDER_METRIC = TRANSPORT_NAME + "/spot/order/put_market"
+
+
+# ======================================================
+# MEDICIONES DEL PROCESO
+# ======================================================
+
+class Sampler(threading.Thread):
+    """Guarda el máximo de hilos y RSS durante la corrida."""
+
+    def __init__(self, every=0.25):
+        super().__init__(daemon=True)
+        self.every = every
+        self.stop_event = threading.Event()
+        self.max_threads = 0
+        self.max_rss = 0.0
+
+    def run(self):
+        while not self.stop_event.wait(self.every):
+            self.max_threads = max(self.max_threads, threading.active_count())
+            self.max_rss = max(self.max_rss, rss_mb())
+
+
+# ======================================================
+# PREPARAR UNA CORRIDA
+# ======================================================
+
+def reset_state():
+    """
+    Estado en memoria de la corrida anterior: sin esto, cada N hereda
+    memos, indicadores, saldos y el último escaneo del N previo.
+    """
+    metrics.reset()
+    eval_memo.clear()
+    scanner.reset()
+    scan_priority.reset()
+    indicators.reset()
+    balance_cache.reset()
+    depth_cache.reset()
+
+
+def seed_users(n, capital):
+    import mongomock
+
+    database.init(mongomock.MongoClient())
+    database.ensure_indexes()
+
+    for i in range(n):
+        user_id = 100000 + i
+        database.create_user(user_id, f"load{i}")
+        database.save_api_keys(user_id, f"key{i}", f"secret{i}")
+        database.save_user_capital(user_id, capital)
+        database.activate_trading(user_id)
+
+
+def build_exchange(args):
+    lo, hi = (float(x) for x in args.latency.split(","))
+    symbols = [f"SIM{i:03d}USDT" for i in range(args.symbols)]
+
+    # Una hora de historial para que los indicadores estén listos
+    feed = SyntheticFeed(symbols, seed=args.seed, volatility=args.volatility,
+                         volume=args.volume, start=time.time() - 3600)
+    feed.advance(time.time())
+
+    sim = SimExchange(feed, start_balance=args.capital * 10, latency=(lo, hi),
+                      rate_limit=args.rate_limit or None, seed=args.seed)
+
+    for i in range(args.users_max):
+        sim.ensure_account(f"key{i}", f"secret{i}")
+
+    coinex_api.set_transport(SimTransport(sim, name=TRANSPORT_NAME))
+    return sim
+
+
+# ======================================================
+# UNA CORRIDA CON N USUARIOS
+# ======================================================
+
+def run_once(n, args):
+    reset_state()
+    seed_users(n, args.capital)
+    sim = build_exchange(args)
+
+    sampler = Sampler()
+    stop_event = threading.Event()
+    loop = threading.Thread(
+        target=scheduler.scheduler_loop,
+        kwargs={"interval_seconds": args.interval, "stop_event": stop_event},
+        daemon=True
+    )
+
+    requests_before = sim.requests
+    start = time.monotonic()
+    sampler.start()
+
+    loop.start()
+    time.sleep(args.duration)
+    stop_event.set()
+    loop.join(args.interval + 5)
+
+    elapsed = time.monotonic() - start
+    threads_alive = threading.active_count()
+    requests = sim.requests - requests_before
+
+    # Dejar terminar los ciclos en curso antes de la siguiente N
+    for th in list(scheduler.active_threads.values()):
+        th.join(5)
+    trading_engine.stop_all_monitors()
+
+    sampler.stop_event.set()
+    sampler.join()
+
+    snap = metrics.snapshot()
+    counters = snap["counters"]
+    lag = snap["latencies"].get("scheduler.tick_lag", {})
+
+    def pct(name, q):
+        value = metrics.percentile(name, q)
+        return value * 1000 if value is not None else float("nan")
+
+    return {
+        "users": n,
+        "ticks": counters.get("scheduler.cycles", 0),
+        "user_cycles": counters.get("scheduler.user_cycles", 0),
+        "overruns": counters.get("scheduler.overruns", 0),
+        "user_overruns": counters.get("scheduler.overrun_users", 0),
+        "lag_p50_ms": lag.get("p50", float("nan")) * 1000,
+        "lag_p99_ms": lag.get("p99", float("nan")) * 1000,
+        "threads": threads_alive,
+        "max_threads": sampler.max_threads,
+        "rss_mb": sampler.max_rss,
+        "req_s": requests / elapsed,
+        "orders": sim.placed,
+        "order_p50_ms": pct(ORDER_METRIC, 50),
+        "order_p99_ms": pct(ORDER_METRIC, 99),
+        "exit_wait_p99_ms": pct("lane.exit.wait", 99),
+        "scan_wait_p99_ms": pct("lane.scan.wait", 99),
+        "errors": counters.get("coinex.errors", 0),
+    }
+
+
+# ======================================================
+# BARRIDO DE N
+# ======================================================
+
+# (campo, encabezado, formato)
+COLUMNS = [
+    ("users", "users", "{:>7}"),
+    ("ticks", "ticks", "{:>7}"),
+    ("user_cycles", "cycles", "{:>8}"),
+    ("overruns", "ovr", "{:>5}"),
+    ("user_overruns", "usr ovr", "{:>8}"),
+    ("lag_p50_ms", "lag p50", "{:>9.1f}"),
+    ("lag_p99_ms", "lag p99", "{:>9.1f}"),
+    ("threads", "threads", "{:>8}"),
+    ("max_threads", "max thr", "{:>8}"),
+    ("rss_mb", "RSS MB", "{:>8.1f}"),
+    ("req_s", "req/s", "{:>8.1f}"),
+    ("orders", "orders", "{:>7}"),
+    ("order_p50_ms", "ord p50", "{:>9.1f}"),
+    ("order_p99_ms", "ord p99", "{:>9.1f}"),
+    ("exit_wait_p99_ms", "exit wq", "{:>9.1f}"),
+    ("scan_wait_p99_ms", "scan wq", "{:>9.1f}"),
+    ("errors", "errors", "{:>7}"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del scheduler")
+    parser.add_argument("--users", default="10,100,500,1000", help="Lista de N a barrer")
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos por corrida")
+    parser.add_argument("--interval", type=float, default=1.0, help="Periodo del scheduler (s)")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--capital", type=float, default=20.0)
+    parser.add_argument("--latency", default="0.005,0.02", help="mín,máx del exchange (s)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="peticiones/s por key (0 = sin límite)")
+    parser.add_argument("--volatility", type=float, default=0.004)
+    parser.add_argument("--volume", type=float, default=30000.0, help="Volumen medio por minuto")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="Mostrar los logs del bot")
+    args = parser.parse_args()
+
+    sweep = [int(n) for n in args.users.split(",")]
+    args.users_max = max(sweep)
+
+    encryption.init()
+
+    # Logs del bot: a stdout con --verbose, descartados si no
+    logger.setup(stream=None if args.verbose else open(os.devnull, "w"))
+
+    print("".join(f"{header:>{len(fmt.format(0))}}" for _, header, fmt in COLUMNS))
+
+    for n in sweep:
+        row = run_once(n, args)
+        line = "".join(fmt.format(row[key]) for key, _, fmt in COLUMNS)
+        broken = row["overruns"] or row["user_overruns"] or row["lag_p99_ms"] > args.interval * 1000
+        print(line + ("  ⚠️ no escala" if broken else ""), flush=True)
+
+
+if __name__ == "__main__":
+    main()
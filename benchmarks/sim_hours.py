@@ -0,0 +1,168 @@
+"""
+Horas simuladas del bot en segundos de reloj real.
+
+Pone un VirtualClock como reloj global, siembra usuarios en un Mongo
+en memoria (mongomock), apunta coinex_api al exchange simulado en
+proceso y avanza --hours de tiempo virtual con fast_forward(): ticks
+del scheduler, escaneos, entradas y monitores corren a su ritmo
+virtual sin esperas reales. Una hora simulada con los valores por
+defecto tarda unos pocos segundos.
+
+Uso:
+    python benchmarks/sim_hours.py [--hours 1] [--users 5] [--symbols 10] \
+        [--capital 20] [--volatility 0.006] [--seed 2] [--max-wall 0]
+
+Con --max-wall > 0 sale con código 1 si tarda más de esos segundos.
+simulate() es la misma corrida como función (tests/test_sim_hours.py).
+Requiere mongomock (pip install mongomock); no es dependencia del bot.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if not os.getenv("SECRET_ENCRYPTION_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["SECRET_ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+
+from app import (
+    clock, coinex_api, database, encryption, logger, metrics, scheduler, trading_engine,
+    scanner, indicators, balance_cache, depth_cache, exposure, market_meta, lanes
+)
+from app.eval_memo import eval_memo
+from app.scan_priority import scan_priority
+from app.sim_exchange import SimExchange, SimTransport, SyntheticFeed
+
+# Arranque fijo: corridas con la misma semilla son comparables
+START = 1_700_000_000
+
+
+def reset_state():
+    """Estado en memoria de corridas anteriores del mismo proceso (tests)."""
+    metrics.reset()
+    eval_memo.clear()
+    scanner.reset()
+    scan_priority.reset()
+    indicators.reset()
+    balance_cache.reset()
+    depth_cache.reset()
+    # Los mercados simulados se cargan en el primer ciclo, ya en tiempo virtual
+    market_meta.reset()
+    # Con el mismo START, las entradas de la corrida anterior seguirían vigentes
+    coinex_api.reset_market_data()
+    lanes.reset()
+    exposure.rebuild([])
+
+
+def build(virtual, users, symbols, capital, volatility, volume, seed):
+    import mongomock
+
+    database.init(mongomock.MongoClient())
+    database.ensure_indexes()
+
+    symbols = [f"SIM{i:03d}USDT" for i in range(symbols)]
+
+    # Una hora de historial para que los indicadores estén listos
+    feed = SyntheticFeed(symbols, seed=seed, volatility=volatility,
+                         volume=volume, start=virtual.time() - 3600)
+    sim = SimExchange(feed, start_balance=capital * 10, seed=seed)
+
+    for i in range(users):
+        user_id = 200000 + i
+        database.create_user(user_id, f"sim{i}")
+        database.save_api_keys(user_id, f"key{i}", f"secret{i}")
+        database.save_user_capital(user_id, capital)
+        database.activate_trading(user_id)
+        sim.ensure_account(f"key{i}", f"secret{i}")
+
+    coinex_api.set_transport(SimTransport(sim, name="sim"))
+    return sim
+
+
+def simulate(hours=1.0, users=5, symbols=10, capital=20.0, volatility=0.006,
+             volume=30000.0, seed=2):
+    """
+    Corre `hours` horas virtuales del scheduler y devuelve los contadores
+    de la corrida. Deja el reloj y el transporte como estaban.
+    """
+    previous_clock = clock.get_clock()
+    previous_transport = coinex_api.get_transport()
+
+    virtual = clock.VirtualClock(start=START)
+    clock.set_clock(virtual)
+
+    try:
+        reset_state()
+        sim = build(virtual, users, symbols, capital, volatility, volume, seed)
+
+        stop_event = threading.Event()
+        loop = threading.Thread(target=scheduler.scheduler_loop, kwargs={"stop_event": stop_event}, daemon=True)
+
+        started = time.monotonic()
+        loop.start()
+
+        # Sin nadie durmiendo, fast_forward() saltaría directo al final
+        virtual.wait_sleeping(loop)
+        wakeups = virtual.fast_forward(hours * 3600)
+        wall = time.monotonic() - started
+
+        counters = metrics.snapshot()["counters"]
+        result = {
+            "wall": wall,
+            "wakeups": wakeups,
+            "ticks": counters.get("scheduler.cycles", 0),
+            "user_cycles": counters.get("scheduler.user_cycles", 0),
+            "user_overruns": counters.get("scheduler.overrun_users", 0),
+            "orders": sim.placed,
+            "trades": database.get_trades_col().count_documents({}),
+            "open": len(trading_engine.open_monitors),
+        }
+
+        # Parar scheduler y monitores; el minuto extra deja terminar a
+        # los hilos que aún duermen en el reloj virtual
+        stop_event.set()
+        trading_engine.stop_all_monitors()
+        virtual.fast_forward(60)
+        loop.join(5)
+
+        return result
+
+    finally:
+        clock.set_clock(previous_clock)
+        coinex_api.set_transport(previous_transport)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Horas simuladas con reloj virtual")
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--capital", type=float, default=20.0)
+    parser.add_argument("--volatility", type=float, default=0.006)
+    parser.add_argument("--volume", type=float, default=30000.0, help="Volumen medio por minuto")
+    parser.add_argument("--seed", type=int, default=2)
+    parser.add_argument("--max-wall", type=float, default=0.0, help="Presupuesto de reloj real (s, 0 = sin límite)")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar los logs del bot")
+    args = parser.parse_args()
+
+    encryption.init()
+    logger.setup(stream=None if args.verbose else open(os.devnull, "w"))
+
+    r = simulate(args.hours, args.users, args.symbols, args.capital, args.volatility, args.volume, args.seed)
+
+    print(f"⏩ {args.hours:g} h simuladas en {r['wall']:.1f} s reales "
+          f"({args.hours * 3600 / r['wall']:.0f}x) | despertares: {r['wakeups']}")
+    print(f"   ticks: {r['ticks']} | ciclos de usuario: {r['user_cycles']} | órdenes: {r['orders']} | "
+          f"trades cerrados: {r['trades']} | posiciones abiertas: {r['open']}")
+
+    if args.max_wall and r["wall"] > args.max_wall:
+        print(f"❌ {r['wall']:.1f} s > presupuesto de {args.max_wall:g} s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,36 @@
 import threading
+from app import database, encryption
 from app.bot import run_bot
 from app.scheduler import start_scheduler
+from app.trading_engine import resume_open_positions
+from app.balance_cache import start_refresher
 
 if __name__ == "__main__":
     print("🚀 Iniciando TradingX...")
 
+    # ==========================================
+    # 0️⃣ INICIALIZACIÓN EXPLÍCITA (CLAVE + MONGO)
+    # ==========================================
+    # Los módulos no abren conexiones al importarse; aquí se
+    # valida la configuración y se crea el cliente una sola vez.
+    encryption.init()
+    database.init()
+    database.ensure_indexes()
+    print("⚙️ Configuración CoinEx V2 cargada correctamente.")
+
+    # ==========================================
+    # 0️⃣.1 RETOMAR POSICIONES ABIERTAS
+    # ==========================================
+    try:
+        resume_open_positions()
+    except Exception as e:
+        print(f"❌ Error retomando posiciones abiertas: {e}")
+
+    # ==========================================
+    # 0️⃣.2 CORRECCIÓN PERIÓDICA DE SALDOS
+    # ==========================================
+    start_refresher()
+
     # ==========================================
     # 1️⃣ INICIAR SCHEDULER EN SEGUNDO PLANO
     # ==========================================
@@ -0,0 +1,84 @@
+"""Reparto del capital libre entre oportunidades (huecos y fuerza)."""
+
+import os
+
+import pytest
+
+if not os.getenv("SECRET_ENCRYPTION_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["SECRET_ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+
+from app import trading_engine
+from app.trading_engine import allocate
+
+# Mínimo por posición con el margen de truncado: 5 × 1.02
+MIN = 5.1
+
+
+@pytest.fixture(autouse=True)
+def min_order(monkeypatch):
+    monkeypatch.setattr(trading_engine, "MIN_ORDER_USDT", 5.0)
+
+
+def _op(symbol, strength=1.0):
+    return {"symbol": symbol, "strength": strength}
+
+
+def _held(symbol, notional):
+    return {"symbol": symbol, "entry_price": 1.0, "qty": notional}
+
+
+def _amounts(plan):
+    return [(op["symbol"], round(usdt, 6)) for op, usdt in plan]
+
+
+def test_slots_split_free_capital_evenly():
+    plan = allocate(30.0, [], [_op("A"), _op("B"), _op("C")], max_positions=3, mode="slots")
+    assert _amounts(plan) == [("A", 10.0), ("B", 10.0), ("C", 10.0)]
+
+
+def test_slots_skip_symbols_already_held():
+    held = [_held("A", 10.0)]
+    plan = allocate(30.0, held, [_op("A"), _op("B"), _op("C")], max_positions=3, mode="slots")
+    assert _amounts(plan) == [("B", 10.0), ("C", 10.0)]
+
+
+def test_slots_are_limited_by_the_minimum_order():
+    # 12 USDT no llegan para tres posiciones de 5.1: solo dos huecos
+    plan = allocate(12.0, [], [_op("A"), _op("B"), _op("C")], max_positions=3, mode="slots")
+    assert _amounts(plan) == [("A", 6.0), ("B", 6.0)]
+
+
+def test_exactly_the_minimum_order_fits_one_slot():
+    assert _amounts(allocate(MIN, [], [_op("A")], max_positions=3, mode="slots")) == [("A", MIN)]
+    assert allocate(MIN - 0.01, [], [_op("A")], max_positions=3, mode="slots") == []
+
+
+def test_available_balance_caps_free_capital():
+    plan = allocate(30.0, [], [_op("A"), _op("B")], max_positions=2, mode="slots", available=11.0)
+    assert _amounts(plan) == [("A", 5.5), ("B", 5.5)]
+
+
+def test_no_slots_when_full_or_capital_in_use():
+    assert allocate(100.0, [_held("A", 10.0)], [_op("B")], max_positions=1, mode="slots") == []
+    assert allocate(10.0, [_held("A", 10.0)], [_op("B")], max_positions=3, mode="slots") == []
+    assert allocate(30.0, [], [], max_positions=3, mode="slots") == []
+
+
+def test_strength_weights_the_budget_of_the_chosen():
+    plan = allocate(30.0, [], [_op("A", 2.0), _op("B", 1.0), _op("C", 1.0)],
+                    max_positions=3, mode="strength")
+    assert _amounts(plan) == [("A", 15.0), ("B", 7.5), ("C", 7.5)]
+
+
+def test_strength_caps_at_twice_a_slot():
+    plan = allocate(80.0, [], [_op("A", 6.0), _op("B", 1.0), _op("C", 1.0)],
+                    max_positions=4, mode="strength")
+    # Presupuesto de tres huecos de 20: A pediría 45, se queda en 2 × 20
+    assert _amounts(plan) == [("A", 40.0), ("B", 7.5), ("C", 7.5)]
+
+
+def test_strength_drops_shares_below_the_minimum_order():
+    plan = allocate(20.0, [], [_op("A", 3.0), _op("B", 1.0)], max_positions=2, mode="strength")
+    # B: 20 × 1/4 = 5 < 5.1, no se envía
+    assert _amounts(plan) == [("A", 15.0)]
@@ -0,0 +1,91 @@
+"""Cliente CoinEx: carriles y circuit breaker contra el exchange simulado."""
+
+import time
+
+from app import coinex_api, lanes, metrics
+from app.circuit_breaker import get_breaker
+from app.sim_exchange import SimExchange, SimTransport, SyntheticFeed
+
+
+def _transport(name):
+    return SimTransport(SimExchange(SyntheticFeed(["BTCUSDT"], seed=1)), name=name)
+
+
+def test_lane_timeout_keeps_half_open_trial(monkeypatch):
+    transport = _transport("breaker-lane")
+    breaker = get_breaker("breaker-lane/time[poll]", reset_timeout=0.0)
+    breaker.state = "half_open"
+
+    # Sin hueco en el carril: la petición no sale y la prueba sigue libre
+    monkeypatch.setattr(lanes, "acquire", lambda name, timeout=None: None)
+    assert coinex_api.make_request("GET", "/time", transport=transport, lane="poll") is None
+    monkeypatch.undo()
+
+    assert coinex_api.make_request("GET", "/time", transport=transport, lane="poll")["code"] == 0
+    assert breaker.state == "closed"
+
+
+def test_exit_lane_is_never_rejected():
+    transport = _transport("breaker-exit")
+
+    for lane in ("entry", "exit"):
+        breaker = get_breaker(f"breaker-exit/time[{lane}]")
+        breaker.state = "open"
+        breaker.opened_at = float("inf")
+
+    assert coinex_api.make_request("GET", "/time", transport=transport, lane="entry") is None
+    assert coinex_api.make_request("GET", "/time", transport=transport, lane="exit")["code"] == 0
+
+
+# ======================================================
+# PETICIONES CON COBERTURA (HEDGED)
+# ======================================================
+
+class SlowTransport:
+    """Responde al ticker tras `delay` s reales y cuenta los envíos."""
+
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+        self.sends = 0
+
+    def send(self, method, endpoint, params, headers, lane=None):
+        self.sends += 1
+        time.sleep(self.delay)
+        return 200, {"code": 0, "data": [{"market": "BTCUSDT", "last": "1"}]}
+
+
+def _counter(name):
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def test_single_and_bulk_tickers_keep_separate_latencies():
+    transport = _transport("hedge-shape")
+    coinex_api.make_request("GET", "/spot/market/ticker", params={"market": "BTCUSDT"},
+                            transport=transport, lane="poll")
+    coinex_api.make_request("GET", "/spot/market/ticker", transport=transport, lane="scan")
+
+    latencies = metrics.snapshot()["latencies"]
+    assert "hedge-shape/spot/market/ticker?market" in latencies
+    assert "hedge-shape/spot/market/ticker?" in latencies
+
+
+def test_hedge_needs_its_own_lane_slot(monkeypatch):
+    transport = SlowTransport("hedge-slot", delay=0.05)
+    lane = lanes.get_lane("poll")
+    free = lane.slots._value
+
+    real_acquire = lanes.acquire
+    monkeypatch.setattr(coinex_api, "_hedge_delay", lambda metric: 0.001)
+    # Hueco para la petición, ninguno para el duplicado
+    monkeypatch.setattr(lanes, "acquire", lambda name, timeout=None: real_acquire(name) if timeout is None else None)
+
+    skipped = _counter("coinex.hedge_skipped")
+    assert coinex_api.make_request("GET", "/spot/market/ticker", params={"market": "BTCUSDT"},
+                                   transport=transport, lane="poll")["code"] == 0
+
+    assert transport.sends == 1
+    assert _counter("coinex.hedge_skipped") == skipped + 1
+    # La conexión vuelve al carril cuando termina el envío
+    time.sleep(0.01)
+    assert lane.slots._value == free
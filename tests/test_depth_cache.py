@@ -0,0 +1,62 @@
+"""Libro de órdenes: estimación de compras a mercado por acumulados."""
+
+import pytest
+
+from app.depth_cache import OrderBook
+
+# Asks: 1 @ 10, 1 @ 11, 2 @ 12 → coste acumulado 10, 21, 45
+ASKS = [(10.0, 1.0), (11.0, 1.0), (12.0, 2.0)]
+
+
+@pytest.fixture
+def book():
+    return OrderBook("BTCUSDT", ASKS, [(9.0, 3.0)])
+
+
+def test_buy_inside_the_first_level(book):
+    assert book.estimate_buy(5.0) == (0.5, 10.0, True)
+
+
+def test_buy_ending_exactly_on_a_level(book):
+    assert book.estimate_buy(10.0) == (1.0, 10.0, True)
+    assert book.estimate_buy(21.0) == (2.0, 10.5, True)
+
+
+def test_buy_across_levels(book):
+    qty, avg, complete = book.estimate_buy(33.0)
+    assert complete
+    assert qty == pytest.approx(3.0)
+    assert avg == pytest.approx(11.0)
+
+
+def test_buy_larger_than_the_book(book):
+    assert book.estimate_buy(100.0) == (4.0, 11.25, False)
+
+
+def test_empty_book_and_empty_order():
+    empty = OrderBook("BTCUSDT", [], [])
+    assert empty.best_ask is None and empty.best_bid is None
+    assert empty.estimate_buy(10.0) == (0.0, None, False)
+    assert empty.max_buy_notional(100.0) == 0.0
+
+    assert OrderBook("BTCUSDT", ASKS, []).estimate_buy(0.0) == (0.0, None, False)
+
+
+def test_max_notional_below_the_best_ask(book):
+    assert book.max_buy_notional(9.99) == 0.0
+
+
+def test_max_notional_at_a_level_boundary(book):
+    # El precio medio toca el tope justo al terminar un nivel
+    assert book.max_buy_notional(10.0) == pytest.approx(10.0)
+    assert book.max_buy_notional(10.5) == pytest.approx(21.0)
+
+
+def test_max_notional_inside_a_level(book):
+    notional = book.max_buy_notional(11.0)
+    assert notional == pytest.approx(33.0)
+    assert book.estimate_buy(notional)[1] == pytest.approx(11.0)
+
+
+def test_max_notional_takes_the_whole_book(book):
+    assert book.max_buy_notional(20.0) == pytest.approx(45.0)
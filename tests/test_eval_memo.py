@@ -0,0 +1,22 @@
+"""Memo de evaluaciones: una señal por vela, también con respuestas atrasadas."""
+
+from app.eval_memo import EvaluationMemo
+
+
+def test_signal_only_once_per_candle():
+    memo = EvaluationMemo()
+
+    assert memo.put("BTCUSDT", "5min", 1000, {}, True)
+    assert not memo.put("BTCUSDT", "5min", 1000, {}, False)
+    assert memo.get("BTCUSDT", "5min")[2] is True
+
+
+def test_stale_candle_does_not_rewind():
+    memo = EvaluationMemo()
+    memo.put("BTCUSDT", "5min", 2000, {"volume": 2}, False)
+
+    # Respuesta atrasada con la vela anterior: ni señal ni retroceso
+    assert not memo.put("BTCUSDT", "5min", 1000, {"volume": 1}, True)
+    assert memo.get("BTCUSDT", "5min")[:2] == (2000, {"volume": 2})
+
+    assert memo.put("BTCUSDT", "5min", 3000, {}, False)
@@ -0,0 +1,235 @@
+"""
+Salidas en modo exchange contra el exchange simulado: SL como stop en
+CoinEx, TP vigilado por precio y nunca dos órdenes sobre las mismas
+monedas.
+"""
+
+import os
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+if not os.getenv("SECRET_ENCRYPTION_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["SECRET_ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+
+from app import coinex_api, database, balance_cache, trading_engine
+from app.exit_orders import place_exit_orders, check_exit_orders
+from app.sim_exchange import SimExchange, SimTransport
+
+USER_ID = 4242
+SYMBOL = "BTCUSDT"
+
+
+class ManualFeed:
+    """Precio fijado por el test; sin velas."""
+
+    def __init__(self, prices):
+        self.prices = dict(prices)
+
+    def symbols(self):
+        return list(self.prices)
+
+    def advance(self, now):
+        pass
+
+    def price(self, symbol):
+        return self.prices.get(symbol)
+
+    def candles(self, symbol, limit):
+        return []
+
+
+@pytest.fixture
+def sim(request):
+    database.init(mongomock.MongoClient())
+    database.create_user(USER_ID, "exits")
+    database.save_api_keys(USER_ID, "key", "secret")
+
+    feed = ManualFeed({SYMBOL: 100.0})
+    exchange = SimExchange(feed, start_balance=0.0, fee_rate=0.0)
+    exchange.ensure_account("key", "secret")["balances"]["BTC"] = [1.0, 0.0]
+
+    previous = coinex_api.get_transport()
+    # Nombre propio por test: la micro-caché de market data va por transporte
+    coinex_api.set_transport(SimTransport(exchange, name=f"sim-{request.node.name}"))
+    balance_cache.invalidate(USER_ID)
+
+    yield exchange
+
+    coinex_api.set_transport(previous)
+    balance_cache.invalidate(USER_ID)
+
+
+@pytest.fixture
+def position(sim):
+    position = {
+        "user_id": USER_ID,
+        "symbol": SYMBOL,
+        "entry_price": 100.0,
+        "qty": 1.0,
+        "tp_price": 110.0,
+        "sl_price": 95.0
+    }
+    position.update(place_exit_orders(position))
+    return position
+
+
+def _coins(sim):
+    return sim.accounts["key"]["balances"]["BTC"]
+
+
+def _sells(sim):
+    return [o for o in sim.orders.values() if o["side"] == "sell" and o["status"] == "filled"]
+
+
+def _tick():
+    """Una petición cualquiera: el exchange casa las órdenes en reposo."""
+    coinex_api.get_balances(USER_ID)
+
+
+def _results():
+    return [t["result"] for t in database.get_trades_col().find({"user_id": USER_ID})]
+
+
+def test_only_stop_is_placed(sim, position):
+    assert position["exit_mode"] == "exchange"
+    assert "tp_order_id" not in position
+    assert len(sim.stop_orders) == 1
+    # Ninguna orden congela las monedas que necesita el stop
+    assert _coins(sim) == [1.0, 0.0]
+
+
+def test_tp_hit_cancels_stop_and_sells(sim, position):
+    sim.feed.prices[SYMBOL] = 111.0
+
+    assert trading_engine._exchange_exit_step(position) == "closed"
+    assert not sim.stop_orders
+    assert len(_sells(sim)) == 1
+    assert _coins(sim)[0] == pytest.approx(0.0)
+    assert _results() == ["tp_hit"]
+
+
+def test_sl_hit_is_confirmed_by_balance(sim, position):
+    sim.feed.prices[SYMBOL] = 94.0
+
+    assert trading_engine._exchange_exit_step(position) == "closed"
+    assert len(_sells(sim)) == 1
+    assert _coins(sim)[0] == pytest.approx(0.0)
+    assert _results() == ["sl_hit"]
+
+
+def test_sl_hit_records_the_stop_fill_price(sim, position):
+    # El stop vende a 94 y el precio rebota antes de la siguiente ronda
+    sim.feed.prices[SYMBOL] = 94.0
+    _tick()
+    sim.feed.prices[SYMBOL] = 97.0
+
+    assert trading_engine._exchange_exit_step(position) == "closed"
+    trade = database.get_trades_col().find_one({"user_id": USER_ID})
+    assert trade["result"] == "sl_hit"
+    assert trade["exit_price"] == pytest.approx(94.0)
+
+
+def test_steady_state_only_polls_the_price(sim, position, monkeypatch):
+    checks = []
+    monkeypatch.setattr(trading_engine, "check_exit_orders", lambda p: checks.append(p) or None)
+    monkeypatch.setattr(trading_engine, "get_price", lambda symbol: sim.feed.prices[symbol])
+
+    # Primera ronda: consulta el stop; después, solo precio hasta el intervalo
+    for _ in range(5):
+        assert trading_engine._exchange_exit_step(position) is None
+    assert len(checks) == 1
+
+    sim.feed.prices[SYMBOL] = 95.0
+    trading_engine._exchange_exit_step(position)
+    assert len(checks) == 2
+
+
+def test_missing_stop_without_sale_is_not_a_fill(sim, position):
+    # El stop desaparece (cancelado a mano) y las monedas siguen ahí
+    sim.stop_orders.clear()
+
+    assert check_exit_orders(position) == ("sl_lost", None)
+    assert trading_engine._exchange_exit_step(position) == "client"
+    assert position["exit_mode"] == "client"
+    assert not _results()
+
+
+def test_both_levels_crossed_sl_first(sim, position):
+    # El stop se dispara entre dos consultas y luego el precio pasa el TP
+    sim.feed.prices[SYMBOL] = 94.0
+    _tick()
+    assert not sim.stop_orders
+    sim.feed.prices[SYMBOL] = 111.0
+
+    assert trading_engine._exchange_exit_step(position) == "closed"
+    assert len(_sells(sim)) == 1
+    assert _results() == ["sl_hit"]
+
+
+def test_both_levels_crossed_tp_first(sim, position):
+    sim.feed.prices[SYMBOL] = 111.0
+    assert trading_engine._exchange_exit_step(position) == "closed"
+
+    # El precio cae bajo el SL después: no queda stop que venda otra vez
+    sim.feed.prices[SYMBOL] = 94.0
+    _tick()
+
+    assert len(_sells(sim)) == 1
+    assert _coins(sim)[0] == pytest.approx(0.0)
+    assert _results() == ["tp_hit"]
+
+
+# ======================================================
+# VENTA FALLIDA EN EL MONITOR POR PRECIO
+# ======================================================
+
+@pytest.fixture
+def client_position(sim, monkeypatch):
+    # Sin esperas reales entre reintentos
+    monkeypatch.setattr(trading_engine, "_pause", lambda stop_event, seconds: None)
+
+    position = {
+        "user_id": USER_ID,
+        "symbol": SYMBOL,
+        "entry_price": 100.0,
+        "qty": 1.0,
+        "tp_price": 110.0,
+        "sl_price": 95.0,
+        "exit_mode": "client"
+    }
+    position["position_id"] = database.create_position(position)
+    return position
+
+
+def test_failed_sell_is_retried_until_it_fills(sim, client_position, monkeypatch):
+    attempts = []
+    real_sell = trading_engine.place_market_sell
+
+    def flaky_sell(*args):
+        attempts.append(args)
+        return real_sell(*args) if len(attempts) > 2 else None
+
+    monkeypatch.setattr(trading_engine, "place_market_sell", flaky_sell)
+    sim.feed.prices[SYMBOL] = 94.0
+
+    trading_engine._monitor_price(client_position, None)
+
+    assert len(attempts) == 3
+    assert len(_sells(sim)) == 1
+    assert _results() == ["sl_hit"]
+
+
+def test_position_sold_elsewhere_is_handed_off(sim, client_position, monkeypatch):
+    # Las monedas ya no están: la venta nunca sale y la posición se entrega
+    monkeypatch.setattr(trading_engine, "place_market_sell", lambda *args: None)
+    _coins(sim)[0] = 0.0
+    sim.feed.prices[SYMBOL] = 94.0
+
+    trading_engine._monitor_price(client_position, None)
+
+    stored = database.get_positions_col().find_one({"_id": client_position["position_id"]})
+    assert stored["status"] == "orphaned"
+    assert not _results()
@@ -0,0 +1,65 @@
+"""Exportación incremental: la marca no deja atrás documentos tardíos."""
+
+import csv
+import datetime
+import glob
+import os
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+if not os.getenv("SECRET_ENCRYPTION_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["SECRET_ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+
+from app import database
+from app.config import EXPORT_SAFETY_LAG
+from app.export_trades import export_all
+
+NOW = datetime.datetime(2024, 5, 1, 12, 0, 0)
+
+
+def _trade(seconds_ago, profit):
+    database.get_trades_col().insert_one({
+        "user_id": 1,
+        "symbol": "BTCUSDT",
+        "entry_price": 100.0,
+        "exit_price": 100.0 + profit,
+        "qty": 1.0,
+        "profit_usdt": profit,
+        "result": "tp_hit",
+        "timestamp": NOW - datetime.timedelta(seconds=seconds_ago)
+    })
+
+
+def _exported_profits(out_dir):
+    profits = []
+    for path in glob.glob(os.path.join(out_dir, "trades", "*", "*.csv")):
+        with open(path) as f:
+            profits += [float(row["profit_usdt"]) for row in csv.DictReader(f)]
+    return sorted(profits)
+
+
+@pytest.fixture
+def db():
+    database.init(mongomock.MongoClient())
+
+
+def test_late_commit_with_older_timestamp_is_exported(db, tmp_path):
+    out = str(tmp_path)
+
+    # Uno ya asentado y otro reciente, dentro del margen
+    _trade(EXPORT_SAFETY_LAG + 60, 1.0)
+    _trade(10, 3.0)
+    assert export_all(out, ("trades",), fmt="csv", now=NOW) == {"trades": 1}
+
+    # Llega tarde uno con marca anterior al reciente
+    _trade(20, 2.0)
+
+    later = NOW + datetime.timedelta(seconds=EXPORT_SAFETY_LAG)
+    assert export_all(out, ("trades",), fmt="csv", now=later) == {"trades": 2}
+    assert _exported_profits(out) == [1.0, 2.0, 3.0]
+
+    # Nada se repite en la siguiente corrida
+    assert export_all(out, ("trades",), fmt="csv", now=later) == {"trades": 0}
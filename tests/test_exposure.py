@@ -0,0 +1,103 @@
+"""Índice de exposición: reservas, liberaciones y reconstrucción."""
+
+import pytest
+
+from app import exposure
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(exposure, "MAX_ACTIVE_PAIRS", 3)
+    monkeypatch.setattr(exposure, "EXPOSURE_MAX_SYMBOL_USDT", 100.0)
+    monkeypatch.setattr(exposure, "EXPOSURE_MAX_TOTAL_USDT", 150.0)
+    monkeypatch.setattr(exposure, "EXPOSURE_MAX_POSITIONS", 0)
+    exposure.rebuild([])
+    yield
+    exposure.rebuild([])
+
+
+def test_paper_positions_do_not_use_the_live_caps():
+    key, reason = exposure.reserve(1, "BTCUSDT", 100.0, "paper")
+    assert key and reason is None
+
+    # El símbolo está lleno en paper, no en real
+    assert exposure.reserve(2, "BTCUSDT", 1.0, "paper")[0] is None
+    assert exposure.reserve(3, "BTCUSDT", 100.0, "live")[0] is not None
+
+    total, positions, top = exposure.totals()
+    assert (total, positions, top) == (100.0, 1, ("BTCUSDT", 100.0))
+    assert exposure.totals("paper")[0] == 100.0
+
+    exposure.release(key)
+    assert exposure.totals("paper") == (0.0, 0, (None, 0.0))
+
+
+def test_rebuild_keeps_modes_apart():
+    positions = [
+        {"position_id": "a", "user_id": 1, "symbol": "BTCUSDT", "entry_price": 10.0, "qty": 5.0},
+        {"position_id": "b", "user_id": 2, "symbol": "BTCUSDT", "entry_price": 10.0, "qty": 8.0, "mode": "paper"},
+    ]
+
+    assert exposure.rebuild(positions) == 50.0
+    assert positions[1]["exposure_key"] == "b"
+    assert exposure.totals("paper")[0] == 80.0
+
+
+# ======================================================
+# LÍMITES, LIBERACIONES Y RECONSTRUCCIÓN
+# ======================================================
+
+def test_symbol_cap_hit_exactly():
+    assert exposure.reserve(1, "BTCUSDT", 60.0)[0]
+    assert exposure.reserve(2, "BTCUSDT", 40.0)[0]
+
+    key, reason = exposure.reserve(3, "BTCUSDT", 0.01)
+    assert key is None and "BTCUSDT" in reason
+    assert exposure.totals()[:2] == (100.0, 2)
+
+
+def test_total_cap_hit_exactly():
+    assert exposure.reserve(1, "BTCUSDT", 100.0)[0]
+    assert exposure.reserve(2, "ETHUSDT", 50.0)[0]
+
+    key, reason = exposure.reserve(3, "SOLUSDT", 0.01)
+    assert key is None and "total" in reason
+
+
+def test_position_caps(monkeypatch):
+    for symbol in ("A", "B", "C"):
+        assert exposure.reserve(1, symbol, 1.0)[0]
+    assert exposure.reserve(1, "D", 1.0)[0] is None
+
+    monkeypatch.setattr(exposure, "EXPOSURE_MAX_POSITIONS", 4)
+    assert exposure.reserve(2, "D", 1.0)[0]
+    assert exposure.reserve(3, "E", 1.0)[0] is None
+
+
+def test_release_frees_the_cap_and_is_idempotent():
+    key, _ = exposure.reserve(1, "BTCUSDT", 100.0)
+    assert exposure.reserve(2, "BTCUSDT", 1.0)[0] is None
+
+    exposure.release(key)
+    exposure.release(key)
+    exposure.release(("r", -1))
+
+    assert exposure.totals() == (0.0, 0, (None, 0.0))
+    assert exposure.reserve(2, "BTCUSDT", 100.0)[0]
+
+
+def test_rebuild_replaces_reservations_and_keys_release():
+    exposure.reserve(9, "ETHUSDT", 50.0)
+
+    positions = [
+        {"position_id": "a", "user_id": 1, "symbol": "BTCUSDT", "entry_price": 20.0, "qty": 2.0},
+        {"position_id": "b", "user_id": 1, "symbol": "BTCUSDT", "entry_price": 30.0, "qty": 1.0},
+    ]
+    assert exposure.rebuild(positions) == 70.0
+    assert exposure.totals() == (70.0, 2, ("BTCUSDT", 70.0))
+
+    # Solo caben 30 más en el símbolo
+    assert exposure.reserve(2, "BTCUSDT", 30.01)[0] is None
+
+    exposure.release(positions[0]["exposure_key"])
+    assert exposure.totals() == (30.0, 1, ("BTCUSDT", 30.0))
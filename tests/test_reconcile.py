@@ -0,0 +1,90 @@
+"""Reconciliación del arranque: simulador paper y carreras con el monitor."""
+
+import os
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+if not os.getenv("SECRET_ENCRYPTION_KEY"):
+    from cryptography.fernet import Fernet
+    os.environ["SECRET_ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+
+from app import coinex_api, database, trading_engine
+from app.sim_exchange import SimExchange, SimTransport, SyntheticFeed
+
+USER_ID = 5151
+
+
+def test_restarted_paper_sim_gets_the_coins_back():
+    database.init(mongomock.MongoClient())
+    database.create_user(USER_ID, "paper")
+    database.save_api_keys(USER_ID, "pkey", "psecret")
+    database.set_trading_mode(USER_ID, "paper")
+
+    position = {"user_id": USER_ID, "symbol": "BTCUSDT", "entry_price": 100.0, "qty": 0.5,
+                "tp_price": 110.0, "sl_price": 95.0}
+    position["position_id"] = database.create_position(position)
+
+    # El simulador acaba de arrancar: la cuenta paper está vacía
+    sim = SimExchange(SyntheticFeed(["BTCUSDT"], seed=1))
+    previous = coinex_api._paper_transport, coinex_api.get_transport()
+    coinex_api.set_paper_transport(SimTransport(sim, name="paper-restart"))
+    coinex_api.set_transport(SimTransport(sim, name="paper-restart-live"))
+
+    try:
+        trading_engine.reconcile_positions([position])
+    finally:
+        coinex_api.set_paper_transport(previous[0])
+        coinex_api.set_transport(previous[1])
+
+    assert sim.accounts["pkey"]["balances"]["BTC"][0] == pytest.approx(0.5)
+    assert database.count_open_positions(USER_ID) == 1
+
+
+# ======================================================
+# RECONCILIACIÓN Y MONITOR SOBRE LA MISMA POSICIÓN
+# ======================================================
+
+LIVE_USER = 5252
+
+
+@pytest.fixture
+def fired_stop(request):
+    """Usuario real cuyo stop vendió con el bot caído: sin monedas."""
+    database.init(mongomock.MongoClient())
+    database.create_user(LIVE_USER, "live")
+    database.save_api_keys(LIVE_USER, "lkey", "lsecret")
+
+    sim = SimExchange(SyntheticFeed(["BTCUSDT"], seed=1))
+    sim.ensure_account("lkey", "lsecret")
+    previous = coinex_api.get_transport()
+    coinex_api.set_transport(SimTransport(sim, name=f"sim-{request.node.name}"))
+
+    position = {"user_id": LIVE_USER, "symbol": "BTCUSDT", "entry_price": 100.0, "qty": 0.5,
+                "tp_price": 110.0, "sl_price": 95.0}
+    position["position_id"] = database.create_position(position)
+
+    yield position
+
+    coinex_api.set_transport(previous)
+
+
+def _status(position):
+    return database.get_positions_col().find_one({"_id": position["position_id"]})["status"]
+
+
+def test_monitor_close_wins_over_reconcile(fired_stop):
+    assert trading_engine._finish_trade(fired_stop, 94.0, "sl_hit")
+    trading_engine.reconcile_positions([fired_stop])
+
+    assert _status(fired_stop) == "closed"
+    assert database.get_trades_col().count_documents({"user_id": LIVE_USER}) == 1
+
+
+def test_reconcile_orphan_wins_over_monitor(fired_stop):
+    trading_engine.reconcile_positions([fired_stop])
+    assert not trading_engine._finish_trade(fired_stop, 94.0, "sl_hit")
+
+    assert _status(fired_stop) == "orphaned"
+    assert database.get_trades_col().count_documents({"user_id": LIVE_USER}) == 0
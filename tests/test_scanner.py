@@ -0,0 +1,28 @@
+"""Escáner: la prioridad cuenta cada vela una sola vez."""
+
+from app import scanner
+
+
+class RecordingPriority:
+    def __init__(self):
+        self.updates = []
+
+    def update(self, symbol, volume, volatility, near_miss):
+        self.updates.append(symbol)
+
+
+def test_memo_hits_do_not_update_priority(monkeypatch):
+    candle = {"volume": 10.0, "volatility": 0.01, "strength": 0.5}
+    signals = iter([
+        {"signal": False, "metrics": candle, "fresh": True},
+        {"signal": False, "metrics": candle, "fresh": False},
+        {"signal": False, "metrics": candle, "fresh": False},
+    ])
+    priority = RecordingPriority()
+    monkeypatch.setattr(scanner, "get_trade_signal", lambda symbol: next(signals))
+    monkeypatch.setattr(scanner, "scan_priority", priority)
+
+    for _ in range(3):
+        scanner.evaluate_pairs(["BTCUSDT"])
+
+    assert priority.updates == ["BTCUSDT"]
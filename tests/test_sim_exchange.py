@@ -0,0 +1,94 @@
+"""Exchange simulado: órdenes en reposo, historial acotado y precios sin lock."""
+
+import hashlib
+
+from app import clock
+from app.sim_exchange import SimExchange
+
+
+class LockCheckingFeed:
+    """Anota cada precio pedido y si se pidió con el lock tomado."""
+
+    def __init__(self, sim_ref, prices):
+        self.sim_ref = sim_ref
+        self.prices = dict(prices)
+        self.calls = []
+
+    def symbols(self):
+        return list(self.prices)
+
+    def advance(self, now):
+        pass
+
+    def price(self, symbol):
+        lock = self.sim_ref[0].lock
+        held = lock._is_owned()
+        self.calls.append((symbol, held))
+        return self.prices.get(symbol)
+
+    def candles(self, symbol, limit):
+        return []
+
+
+def _sim(prices, **kwargs):
+    ref = []
+    feed = LockCheckingFeed(ref, prices)
+    sim = SimExchange(feed, start_balance=1000.0, fee_rate=0.0, **kwargs)
+    ref.append(sim)
+    sim.ensure_account("key", "secret")["balances"]["BTC"] = [1.0, 0.0]
+    return sim
+
+
+def _call(sim, method, endpoint, params=None):
+    params = params or {}
+    timestamp = str(int(clock.now() * 1000))
+    sorted_params = "&".join(f"{k}={params[k]}" for k in sorted(params))
+    sign = hashlib.md5(("secret" + method + endpoint + sorted_params + timestamp).encode()).hexdigest()
+    headers = {"X-COINEX-KEY": "key", "X-COINEX-TIMESTAMP": timestamp, "X-COINEX-SIGN": sign}
+    return sim.handle(method, endpoint, params, headers)[1]
+
+
+def test_prices_are_fetched_once_per_symbol_outside_the_lock():
+    sim = _sim({"BTCUSDT": 100.0})
+    _call(sim, "POST", "/spot/order", {"market": "BTCUSDT", "side": "sell", "amount": "0.5", "price": "120"})
+    _call(sim, "POST", "/spot/stop-order",
+          {"market": "BTCUSDT", "side": "sell", "amount": "0.5", "trigger_price": "90"})
+
+    sim.feed.calls.clear()
+    assert _call(sim, "POST", "/spot/balance/query")["code"] == 0
+
+    assert sim.feed.calls == [("BTCUSDT", False)]
+
+
+def test_filled_orders_leave_the_open_set_and_history_is_bounded():
+    sim = _sim({"BTCUSDT": 100.0}, order_history=3)
+    order = _call(sim, "POST", "/spot/order",
+                  {"market": "BTCUSDT", "side": "sell", "amount": "0.5", "price": "110"})["data"]
+    assert list(sim.open_orders) == [order["order_id"]]
+
+    sim.feed.prices["BTCUSDT"] = 111.0
+    _call(sim, "POST", "/spot/balance/query")
+    assert not sim.open_orders
+
+    for _ in range(5):
+        _call(sim, "POST", "/spot/order/put_market", {"market": "BTCUSDT", "side": "sell", "amount": "0.01"})
+
+    assert len(sim.orders) == 3
+    assert sim.placed == 6
+    assert _call(sim, "GET", "/spot/order-status", {"order_id": order["order_id"]})["code"] == 3600
+
+
+def test_stop_params_are_validated():
+    sim = _sim({"BTCUSDT": 100.0})
+
+    bad = [
+        {"market": "NOPEUSDT", "side": "sell", "amount": "1", "trigger_price": "90"},
+        {"market": "BTCUSDT", "side": "hold", "amount": "1", "trigger_price": "90"},
+        {"market": "BTCUSDT", "side": "sell", "amount": "0", "trigger_price": "90"},
+        {"market": "BTCUSDT", "side": "sell", "amount": "x", "trigger_price": "90"},
+        {"market": "BTCUSDT", "side": "sell", "amount": "1", "trigger_price": "0"},
+    ]
+    for params in bad:
+        assert _call(sim, "POST", "/spot/stop-order", params)["code"] != 0
+
+    assert not sim.stop_orders
@@ -0,0 +1,31 @@
+"""Un cuarto de hora virtual del bot completo en segundos reales."""
+
+import importlib.util
+import os
+
+import pytest
+
+pytest.importorskip("mongomock")
+
+_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "sim_hours.py")
+
+
+@pytest.fixture(scope="module")
+def sim_hours():
+    spec = importlib.util.spec_from_file_location("sim_hours", _PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_quarter_hour_is_deterministic(sim_hours):
+    result = sim_hours.simulate(hours=0.25)
+
+    # Un tick por vela de 1 min y un ciclo por usuario en cada tick
+    assert result["ticks"] == 15
+    assert result["user_cycles"] == 75
+    assert result["user_overruns"] == 0
+
+    # Misma semilla, mismo resultado
+    assert (result["orders"], result["trades"], result["open"]) == (45, 15, 15)
+    assert result["wall"] < 30
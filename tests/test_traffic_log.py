@@ -0,0 +1,27 @@
+"""Grabación y reproducción del tráfico con CoinEx."""
+
+from app.traffic_log import TrafficRecorder, TrafficReplayer, read_entries
+
+
+def _record_session(path, start, requests):
+    recorder = TrafficRecorder(path)
+    recorder.start = start
+    for t, price in requests:
+        recorder.record("GET", "/spot/market/ticker", {"market": "BTCUSDT"}, 200,
+                        {"code": 0, "data": [{"last": price}]}, start + t, 0.01)
+    recorder.close()
+
+
+def test_sessions_are_replayed_back_to_back(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    _record_session(path, 1000.0, [(0.0, "1"), (5.0, "2")])
+    _record_session(path, 9000.0, [(0.0, "3"), (1.0, "4")])
+
+    times = [entry["t"] for entry in read_entries(path)]
+    assert times == sorted(times)
+    assert times[2] >= 5.0
+
+    replayer = TrafficReplayer(path, speed=0)
+    prices = [replayer.replay("GET", "/spot/market/ticker", {"market": "BTCUSDT"})[1]["data"][0]["last"]
+              for _ in range(4)]
+    assert prices == ["1", "2", "3", "4"]